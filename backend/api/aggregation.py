@@ -0,0 +1,138 @@
+# api/aggregation.py
+import os
+import shutil
+import tempfile
+
+import h5py
+import numpy as np
+
+from . import weight_cache
+from .download_pipeline import prefetch_contributions
+
+
+def _weight_root(h5file):
+    # Full Keras model files keep the weights under `model_weights`
+    return h5file['model_weights'] if 'model_weights' in h5file else h5file
+
+
+def _decode(name):
+    return name.decode('utf8') if isinstance(name, bytes) else name
+
+
+def _dataset_names(group):
+    """
+    Return the paths of all weight datasets below a group, in model order.
+
+    Keras records the layer order and each layer's weight order in the
+    `layer_names`/`weight_names` attributes, so files written by separately
+    built models (with different auto-generated layer names) still line up.
+    """
+    if 'layer_names' in group.attrs:
+        names = []
+        for layer_name in group.attrs['layer_names']:
+            layer = group[_decode(layer_name)]
+            names.extend(
+                f'{_decode(layer_name)}/{_decode(weight_name)}'
+                for weight_name in layer.attrs.get('weight_names', [])
+            )
+        return names
+
+    names = []
+    group.visititems(lambda name, obj: names.append(name) if isinstance(obj, h5py.Dataset) else None)
+    return sorted(names)
+
+
+def fedavg(paths, coefficients, output_path):
+    """
+    Write the weighted average of several Keras .h5 weight files.
+
+    The first file is copied as a template for the output, then every weight
+    tensor is averaged one layer at a time: each contribution's tensor is
+    read into a reusable buffer, scaled and added to the accumulator in
+    place. Only one layer of one contribution plus one accumulator is ever
+    held in memory.
+    """
+    if len(paths) != len(coefficients):
+        raise ValueError('Each contribution needs exactly one coefficient')
+
+    total = float(sum(coefficients))
+    if total <= 0:
+        raise ValueError('Contribution coefficients must sum to a positive value')
+    coefficients = [float(c) / total for c in coefficients]
+
+    shutil.copyfile(paths[0], output_path)
+
+    sources = [h5py.File(weight_cache.open_mapped(path), 'r') for path in paths]
+    try:
+        with h5py.File(output_path, 'r+') as output:
+            # Optimizer state is specific to each contribution's training run
+            if 'optimizer_weights' in output:
+                del output['optimizer_weights']
+
+            output_root = _weight_root(output)
+            names = _dataset_names(output_root)
+            source_names = []
+            for source, path in zip(sources, paths):
+                source_names.append(_dataset_names(_weight_root(source)))
+                if len(source_names[-1]) != len(names):
+                    raise ValueError(f'{os.path.basename(path)} does not match the model architecture')
+
+            for index, name in enumerate(names):
+                target = output_root[name]
+                if not np.issubdtype(target.dtype, np.floating):
+                    continue  # e.g. counters, keep the template's value
+
+                accumulator = np.zeros(target.shape, dtype=np.float64)
+                buffer = np.empty(target.shape, dtype=np.float64)
+                for source, dataset_names, coefficient in zip(sources, source_names, coefficients):
+                    dataset = _weight_root(source)[dataset_names[index]]
+                    if dataset.shape != target.shape:
+                        raise ValueError(f'Shape mismatch for {name}: {dataset.shape} != {target.shape}')
+                    dataset.read_direct(buffer)
+                    buffer *= coefficient
+                    accumulator += buffer
+
+                target[...] = accumulator.astype(target.dtype)
+    finally:
+        for source in sources:
+            source.close()
+
+    return output_path
+
+
+def aggregate_contributions(contributions, gdrive_config, contribution_weights=None, progress=None):
+    """
+    Average the .h5 weight files of a set of contributions with FedAvg.
+
+    The files are first collected into the local weight cache in parallel
+    using the given Google Drive config. `contribution_weights` optionally
+    maps contribution_id to its weight in the average (e.g. its number of
+    training samples); contributions are weighted equally otherwise.
+    `progress` is passed on to the download pipeline. Returns
+    the path of a temporary .h5 file holding the aggregated model, which the
+    caller is responsible for removing.
+    """
+    contribution_weights = contribution_weights or {}
+
+    downloads = prefetch_contributions(contributions, gdrive_config, progress=progress)
+    failed = {
+        contribution_id: item['error']
+        for contribution_id, item in downloads.items()
+        if item['status'] == 'failed'
+    }
+    if failed:
+        raise ValueError(f'Failed to download contributions: {failed}')
+
+    paths = [downloads[c.contribution_id]['path'] for c in contributions]
+    coefficients = [
+        contribution_weights.get(str(c.contribution_id), contribution_weights.get(c.contribution_id, 1))
+        for c in contributions
+    ]
+
+    fd, output_path = tempfile.mkstemp(suffix='.h5')
+    os.close(fd)
+    try:
+        return fedavg(paths, coefficients, output_path)
+    except Exception:
+        os.remove(output_path)
+        raise
@@ -0,0 +1,86 @@
+# api/analytics.py
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import Contributions, Models, Users
+
+BUCKETS = ('day', 'week', 'month')
+
+# How far back a trend goes by default for each bucket size
+DEFAULT_TREND_SPAN = {
+    'day': datetime.timedelta(days=30),
+    'week': datetime.timedelta(weeks=26),
+    'month': datetime.timedelta(days=365),
+}
+
+CONTRIBUTION_STATUSES = ('pending', 'approved', 'rejected', 'aggregated')
+
+
+def cached(key, compute):
+    """Return a cached analytics result, computing it at most every ANALYTICS_CACHE_TTL seconds"""
+    return cache.get_or_set(f'analytics:{key}', compute, settings.ANALYTICS_CACHE_TTL)
+
+
+def _status_counts(queryset, field='status', statuses=CONTRIBUTION_STATUSES, pk='contribution_id'):
+    return queryset.aggregate(
+        total=Count(pk),
+        **{status: Count(pk, filter=Q(**{field: status})) for status in statuses}
+    )
+
+
+def _approval_rate(counts):
+    # Share of reviewed contributions that were accepted
+    accepted = counts['approved'] + counts['aggregated']
+    reviewed = accepted + counts['rejected']
+    return round(accepted / reviewed, 4) if reviewed else None
+
+
+def overview():
+    """Platform totals: users by role, contributions and models by status"""
+    users = Users.objects.aggregate(
+        total=Count('user_id'),
+        active=Count('user_id', filter=Q(is_active=True)),
+        **{role: Count('user_id', filter=Q(role__role_name=role)) for role in ('Visitor', 'Member', 'Researcher', 'Admin')}
+    )
+    contributions = _status_counts(Contributions.objects.all())
+    contributions['approval_rate'] = _approval_rate(contributions)
+    models = _status_counts(
+        Models.objects.all(), statuses=('experimental', 'active', 'archived'), pk='model_id'
+    )
+    return {'users': users, 'contributions': contributions, 'models': models}
+
+
+def contribution_trend(bucket, since=None):
+    """
+    Contribution counts by status per `bucket` ('day', 'week' or 'month'),
+    oldest first, for contributions uploaded since `since`.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f'bucket must be one of: {", ".join(BUCKETS)}')
+    since = since or timezone.now() - DEFAULT_TREND_SPAN[bucket]
+
+    rows = (
+        Contributions.objects.filter(upload_date__gte=since)
+        .annotate(period=Trunc('upload_date', bucket))
+        .values('period')
+        .annotate(
+            total=Count('contribution_id'),
+            **{status: Count('contribution_id', filter=Q(status=status)) for status in CONTRIBUTION_STATUSES}
+        )
+        .order_by('period')
+    )
+    return [{**row, 'approval_rate': _approval_rate(row)} for row in rows]
+
+
+def top_researchers(limit):
+    """The `limit` users with the most points"""
+    return list(
+        Users.objects.filter(total_points__gt=0)
+        .order_by('-total_points', 'user_id')
+        .values('user_id', 'username', 'total_points', 'role_id')[:limit]
+    )
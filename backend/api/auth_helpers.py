@@ -1,6 +1,31 @@
 # api/auth_helpers.py
+import functools
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
 from .models import Users, Roles
 
+# Role hierarchy: Admin(4) > Researcher(3) > Member(2) > Visitor(1)
+ROLE_LEVELS = {
+    'Visitor': 1,
+    'Member': 2,
+    'Researcher': 3,
+    'Admin': 4
+}
+
+# The parts of an active user needed for authorization
+ResolvedUser = namedtuple('ResolvedUser', ['user_id', 'role_id', 'role_name'])
+
+# user_id -> (ResolvedUser or None for missing/inactive users, expires_at)
+_role_cache = {}
+_role_cache_lock = threading.Lock()
+
+
 def authenticate_user(username, password):
     """
     Authenticate a user by username and password
@@ -13,30 +38,94 @@ def authenticate_user(username, password):
     except Users.DoesNotExist:
         return None
 
-def check_permission(user_id, required_role):
+def resolve_user(user_id, request=None):
+    """
+    Return the ResolvedUser for an active user, or None if there is none.
+
+    Results are kept for ROLE_CACHE_TTL seconds in the process and, when a
+    request is given, for the rest of that request, so a view checking the
+    same user several times costs at most one query.
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    request_cache = None
+    if request is not None:
+        request_cache = getattr(request, '_resolved_users', None)
+        if request_cache is None:
+            request_cache = request._resolved_users = {}
+        if user_id in request_cache:
+            return request_cache[user_id]
+
+    with _role_cache_lock:
+        cached = _role_cache.get(user_id)
+    if cached and cached[1] > time.monotonic():
+        user = cached[0]
+    else:
+        row = (
+            Users.objects.filter(user_id=user_id, is_active=True)
+            .values_list('role_id', 'role__role_name')
+            .first()
+        )
+        user = ResolvedUser(user_id, *row) if row else None
+        with _role_cache_lock:
+            _role_cache[user_id] = (user, time.monotonic() + settings.ROLE_CACHE_TTL)
+
+    if request_cache is not None:
+        request_cache[user_id] = user
+    return user
+
+def invalidate_user(user_id):
+    """Forget a user's cached role, e.g. after it changed or the user was deleted"""
+    with _role_cache_lock:
+        _role_cache.pop(int(user_id), None)
+
+def clear_role_cache():
+    with _role_cache_lock:
+        _role_cache.clear()
+
+def has_role(user, required_role):
+    """Check if a ResolvedUser has the required role or higher"""
+    if user is None:
+        return False
+    return ROLE_LEVELS.get(user.role_name, 0) >= ROLE_LEVELS.get(required_role, 0)
+
+def check_permission(user_id, required_role, request=None):
     """
     Check if user has required role or higher
     Returns True if user has permission, False otherwise
     
     Role hierarchy: Admin(4) > Researcher(3) > Member(2) > Visitor(1)
     """
-    try:
-        user = Users.objects.get(user_id=user_id, is_active=True)
-        role_mapping = {
-            'Visitor': 1,
-            'Member': 2,
-            'Researcher': 3,
-            'Admin': 4
-        }
-        
-        # Get required role level
-        required_role_level = role_mapping.get(required_role, 0)
-        
-        # Get user's role level
-        user_role_name = user.role.role_name
-        user_role_level = role_mapping.get(user_role_name, 0)
-        
-        # Check if user's role level is greater than or equal to required role level
-        return user_role_level >= required_role_level
-    except Users.DoesNotExist:
-        return False
\ No newline at end of file
+    return has_role(resolve_user(user_id, request), required_role)
+
+def require_user(id_param='user_id', required_role=None):
+    """
+    View decorator resolving the user named by a query or body parameter.
+
+    Responds with 400 if the parameter is missing and, if `required_role` is
+    given, 403 unless the user has that role or higher; otherwise 404 if the
+    user does not exist. The user is attached to the request as
+    `request.resolved_user`. Apply it below @api_view.
+    """
+    label = id_param.replace('_id', '').capitalize()
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            user_id = request.query_params.get(id_param) or request.data.get(id_param)
+            if not user_id:
+                return Response({'message': f'{label} ID required'}, status=status.HTTP_400_BAD_REQUEST)
+
+            user = resolve_user(user_id, request)
+            if required_role is not None and not has_role(user, required_role):
+                return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
+            if user is None:
+                return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+
+            request.resolved_user = user
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,70 @@
+# api/batching.py
+import threading
+
+import numpy as np
+from django.conf import settings
+
+
+class _Batch:
+    def __init__(self):
+        self.inputs = []
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Merges concurrent single-image predictions for the same model into one
+    predict call.
+
+    A request for a model that is not running a batch is predicted at once,
+    on its own, so a lone request never waits. Requests that arrive while a
+    batch of the model is running join the next batch, which runs as soon as
+    the current one finishes; every caller gets its own row.
+    """
+
+    def __init__(self, max_batch_size):
+        self.max_batch_size = max_batch_size
+        self._open = {}  # key -> _Batch still accepting inputs
+        self._running = set()  # keys with a batch in predict_on_batch
+        self._lock = threading.Condition()
+
+    def predict(self, key, model, image_arr):
+        """Predict a single preprocessed image (without batch dimension)"""
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            index = len(batch.inputs)
+            batch.inputs.append(image_arr)
+            if len(batch.inputs) >= self.max_batch_size:
+                # Close the batch so later requests start a new one
+                del self._open[key]
+
+        if leader:
+            with self._lock:
+                # Collect requests only while the model is busy anyway
+                self._lock.wait_for(lambda: key not in self._running)
+                self._running.add(key)
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            try:
+                batch.results = model.predict_on_batch(np.stack(batch.inputs))
+            except Exception as e:
+                batch.error = e
+            finally:
+                with self._lock:
+                    self._running.discard(key)
+                    self._lock.notify_all()
+            batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+
+micro_batcher = MicroBatcher(max_batch_size=settings.PREDICT_BATCH_MAX_SIZE)
@@ -0,0 +1,73 @@
+# api/download_pipeline.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import connections
+
+from . import weight_cache
+from .gdrive_helper import get_direct_download_url
+from .token_cache import token_cache
+
+
+def prefetch_contributions(contributions, gdrive_config, progress=None, max_workers=None):
+    """
+    Download the weight files of several contributions into the local weight
+    cache concurrently.
+
+    The user's cached access token and a pooled HTTP session are shared by a
+    bounded thread pool. `progress`, if given, is
+    called as progress(contribution_id, item) every time an item changes,
+    where item is a dict with `status` ('queued', 'downloading', 'cached',
+    'done' or 'failed') and `bytes` received so far.
+
+    Returns a dict mapping contribution_id to its final item, which also
+    holds the cached file `path` on success or an `error` message.
+    """
+    max_workers = max_workers or settings.DOWNLOAD_MAX_WORKERS
+    headers = {'Authorization': f'Bearer {token_cache.get_access_token(gdrive_config)}'}
+    items = {c.contribution_id: {'status': 'queued', 'bytes': 0} for c in contributions}
+    lock = threading.Lock()
+
+    def update(contribution_id, **changes):
+        with lock:
+            items[contribution_id].update(changes)
+            item = dict(items[contribution_id])
+        if progress:
+            progress(contribution_id, item)
+
+    def download(session, contribution):
+        contribution_id = contribution.contribution_id
+        try:
+            url = get_direct_download_url((contribution.weights or {}).get('weights_url'))
+            if not url:
+                raise ValueError('No weights URL found for contribution')
+
+            entry = weight_cache.lookup(url)
+            if entry is not None:
+                update(contribution_id, status='cached', bytes=entry['size'], path=entry['path'])
+                return
+
+            update(contribution_id, status='downloading')
+            entry = weight_cache.fetch(
+                url,
+                headers=headers,
+                session=session,
+                progress=lambda received: update(contribution_id, bytes=received),
+            )
+            update(contribution_id, status='done', bytes=entry['size'], path=entry['path'])
+        except Exception as e:
+            update(contribution_id, status='failed', error=str(e))
+        finally:
+            # Progress callbacks may have used the database from this thread
+            connections.close_all()
+
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        session.mount('https://', adapter)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for contribution in contributions:
+                executor.submit(download, session, contribution)
+
+    return items
@@ -1,13 +1,19 @@
 # api/gdrive_helper.py
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseUpload
 import io
-import json
 import re
 
+from django.conf import settings
+
+from .token_cache import token_cache
+
+def get_direct_download_url(url):
+    """Convert a Google Drive file URL into a Drive API media download URL"""
+    match = re.search(r'[-\w]{25,}', url or '')
+    if not match:
+        return None
+    return f"https://www.googleapis.com/drive/v3/files/{match.group(0)}?alt=media"
+
 class GoogleDriveHelper:
     def __init__(self, client_id, client_secret, refresh_token):
         self.client_id = client_id
@@ -16,18 +22,21 @@ class GoogleDriveHelper:
         self.service = None
 
     def authenticate(self):
-        creds = Credentials.from_authorized_user_info({
+        # Reuse the user's cached access token and Drive service
+        self.service = token_cache.get_service({
             'client_id': self.client_id,
             'client_secret': self.client_secret,
             'refresh_token': self.refresh_token,
-            'token_uri': 'https://oauth2.googleapis.com/token',
         })
-
-        self.service = build('drive', 'v3', credentials=creds)
         return self.service
 
     def upload_file(self, file_content, filename, folder_url):
-        """Upload a file to Google Drive and return the shareable link"""
+        """
+        Upload a file to Google Drive and return the shareable link.
+
+        `file_content` may be bytes or a seekable file object; file objects
+        are streamed with a resumable upload, one chunk at a time.
+        """
         try:
             # Get folder ID from URL
             folder_id = self._get_folder_id_from_url(folder_url)
@@ -40,13 +49,18 @@ class GoogleDriveHelper:
                 'parents': [folder_id]
             }
 
-            # Create media with larger chunk size for better performance
-            fh = io.BytesIO(file_content)
+            if isinstance(file_content, (bytes, bytearray)):
+                fh = io.BytesIO(file_content)
+            else:
+                fh = file_content
+                fh.seek(0)
+
+            # Only one chunk of the file is held in memory at a time
             media = MediaIoBaseUpload(
                 fh, 
                 mimetype='application/x-hdf5' if filename.endswith('.h5') else 'application/json',
                 resumable=True,
-                chunksize=262144  # 256KB chunks
+                chunksize=settings.GDRIVE_UPLOAD_CHUNK_SIZE
             )
 
             # Upload file
@@ -0,0 +1,71 @@
+# api/inference.py
+"""
+Model building and prediction.
+
+This is the only module that imports TensorFlow. It is imported on first
+use, by the views or by inference service workers, so processes that never
+run a prediction do not load TensorFlow.
+"""
+import json
+
+import numpy as np
+import tensorflow as tf
+from django.conf import settings
+
+from . import weight_cache
+from .batching import micro_batcher
+from .model_cache import get_model
+from .weight_store import is_blob_manifest, load_weights
+
+
+def build_model(model_data):
+    """
+    Build a Keras model from the stored architecture and load its weights
+    """
+    if 'weights_url' in model_data and 'architecture' not in model_data:
+        # Full .h5 model file on Google Drive, loaded from the local weight cache
+        entry = weight_cache.fetch(model_data['weights_url'])
+        model = tf.keras.models.load_model(entry['path'], compile=False)
+        return model, entry['size']
+
+    # Create a Sequential model with the layers from the config
+    model = tf.keras.Sequential()
+
+    # Add layers based on the architecture
+    config = json.loads(model_data['architecture'])
+    for layer_config in config['config']['layers']:
+        if layer_config['class_name'] == 'InputLayer':
+            # Declare the input shape so the model is built before set_weights
+            input_config = layer_config['config']
+            batch_shape = input_config.get('batch_shape') or input_config.get('batch_input_shape')
+            if batch_shape:
+                model.add(tf.keras.Input(shape=tuple(batch_shape[1:])))
+            continue
+
+        # Get layer class from tf.keras.layers
+        layer_class = getattr(tf.keras.layers, layer_config['class_name'])
+        # Create and add layer
+        layer = layer_class.from_config(layer_config['config'])
+        model.add(layer)
+
+    # Load weights, memory-mapped from the weight store when stored as a blob
+    if is_blob_manifest(model_data):
+        weights = load_weights(model_data)
+    else:
+        weights = [np.asarray(w, dtype=np.float32) for w in model_data['weights']]
+    model.set_weights(weights)
+    return model, sum(w.nbytes for w in weights)
+
+
+def predict_one(model_obj, model, image_arr):
+    """Predict one image, merged with concurrent requests for the same model"""
+    return micro_batcher.predict((model_obj.model_id, model_obj.weights_key), model, image_arr)
+
+
+def predict_many(model, images):
+    """Run a stack of images through the model in batches of bounded size"""
+    batch_size = settings.PREDICT_BATCH_MAX_SIZE
+    return np.concatenate([
+        model.predict_on_batch(images[i:i + batch_size])
+        for i in range(0, len(images), batch_size)
+    ])
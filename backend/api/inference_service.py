@@ -0,0 +1,258 @@
+# api/inference_service.py
+"""
+Inference service: a pool of worker processes that build and cache the
+models and run predictions for the API workers over a local socket.
+
+Run it with `manage.py run_inference_service` and set INFERENCE_MODE=service
+so that the prediction views send preprocessed image arrays to it instead of
+loading TensorFlow themselves.
+"""
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connections
+
+
+class InferenceServiceError(Exception):
+    """A prediction failed in the inference service"""
+
+
+class ModelBuildError(InferenceServiceError):
+    """The model could not be built or loaded"""
+
+
+class InferenceUnavailable(InferenceServiceError):
+    """The service is unreachable, overloaded or did not answer in time"""
+
+
+def parse_address(address):
+    """'host:port' for TCP, anything else is a Unix socket path"""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+def service_authkey(address):
+    """
+    The key both ends authenticate with. Connections are unpickled on
+    arrival, so TCP addresses need INFERENCE_SERVICE_AUTHKEY to be set.
+    """
+    if settings.INFERENCE_SERVICE_AUTHKEY:
+        return settings.INFERENCE_SERVICE_AUTHKEY.encode()
+    if not isinstance(parse_address(address), str):
+        raise ImproperlyConfigured('INFERENCE_SERVICE_AUTHKEY must be set to use the inference service over TCP')
+    return settings.SECRET_KEY.encode()
+
+
+def check_worker_memory(workers):
+    """
+    Refuse more workers than the model memory budget allows. Every worker
+    process keeps its own model cache of up to MODEL_CACHE_MAX_BYTES.
+    """
+    needed = workers * settings.MODEL_CACHE_MAX_BYTES
+    if needed > settings.INFERENCE_SERVICE_MODEL_MEMORY:
+        raise ImproperlyConfigured(
+            f'{workers} worker(s) may cache {needed // 2**20} MiB of models, more than '
+            f'INFERENCE_SERVICE_MODEL_MEMORY ({settings.INFERENCE_SERVICE_MODEL_MEMORY // 2**20} MiB)'
+        )
+
+
+def _shutdown_socket(conn):
+    # Wakes up a thread blocked reading from the connection
+    try:
+        sock = socket.socket(fileno=os.dup(conn.fileno()))
+    except OSError:
+        return  # already closed
+    with sock:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def run_request(request):
+    """Run one prediction request in a worker process"""
+    # Loaded once per worker process, which then keeps its models cached
+    from . import inference
+    from .model_cache import with_weights_key
+    from .models import Models
+
+    close_old_connections()
+    try:
+        model_obj = with_weights_key(Models.objects).get(model_id=request['model_id'])
+        model = inference.get_model(model_obj)
+    except Exception as e:
+        return {'error': 'build', 'message': str(e)}
+    return {'scores': inference.predict_many(model, request['images'])}
+
+
+class InferenceServer:
+    """
+    Accepts requests on `address` and runs them on a pool of `workers` processes.
+
+    Each connection carries one request. At most `max_queue` requests are
+    running or waiting at a time; further requests are refused at once so
+    that clients can fail fast instead of piling up. Connections are
+    authenticated on their own thread, so a slow client cannot hold up the
+    others, and dropped if the handshake takes over `handshake_timeout` seconds.
+    """
+
+    def __init__(self, address, authkey, workers, max_queue, handler=run_request, executor=None,
+                 handshake_timeout=10):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.handler = handler
+        self.handshake_timeout = handshake_timeout
+        # Spawned workers import TensorFlow themselves instead of inheriting
+        # a forked copy of this process
+        self.executor = executor or ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._listener = None
+        self._stopping = False
+
+    def serve_forever(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        # Workers open their own database connections
+        connections.close_all()
+        # A Unix socket is created accessible to its owner and group only
+        umask = os.umask(0o117)
+        try:
+            # Without an authkey accept() returns at once; see _authenticate
+            self._listener = Listener(self.address)
+        finally:
+            os.umask(umask)
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    continue  # e.g. the client reset the connection
+                if self._stopping:
+                    conn.close()
+                    break
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            self._listener.close()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop serve_forever() from another thread"""
+        self._stopping = True
+        # Wake up the accept() call with a connection of our own
+        Client(self.address).close()
+
+    def _authenticate(self, conn):
+        """The authkey challenge that Listener.accept() would run, in both directions"""
+        watchdog = threading.Timer(self.handshake_timeout, _shutdown_socket, args=(conn,))
+        watchdog.start()
+        try:
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+            return True
+        except (multiprocessing.AuthenticationError, EOFError, OSError):
+            return False
+        finally:
+            watchdog.cancel()
+
+    def _serve_connection(self, conn):
+        with conn:
+            if not self._authenticate(conn):
+                return
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            if not self._slots.acquire(blocking=False):
+                reply = {'error': 'busy', 'message': 'Inference service is busy'}
+            else:
+                try:
+                    reply = self.executor.submit(self.handler, request).result()
+                except Exception as e:
+                    reply = {'error': 'failed', 'message': str(e)}
+                finally:
+                    self._slots.release()
+
+            try:
+                conn.send(reply)
+            except OSError:
+                pass  # the client timed out and went away
+
+
+class InferenceClient:
+    """
+    Sends prediction requests to the inference service.
+
+    At most `max_pending` requests per process are in flight; beyond that,
+    and when the service is busy, unreachable or slower than `timeout`
+    seconds, InferenceUnavailable is raised.
+    """
+
+    def __init__(self, address, authkey, timeout, max_pending):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def predict(self, model_id, images):
+        """Return the model output for a (n, height, width, channels) array"""
+        if not self._slots.acquire(blocking=False):
+            raise InferenceUnavailable('Too many predictions in progress')
+        try:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+            except OSError as e:
+                raise InferenceUnavailable('Inference service is not reachable') from e
+            with conn:
+                try:
+                    conn.send({'model_id': model_id, 'images': images})
+                    if not conn.poll(self.timeout):
+                        raise InferenceUnavailable('Inference service timed out')
+                    reply = conn.recv()
+                except (EOFError, OSError) as e:
+                    raise InferenceUnavailable('Inference service closed the connection') from e
+        finally:
+            self._slots.release()
+
+        if reply.get('error') == 'build':
+            raise ModelBuildError(reply['message'])
+        if reply.get('error') == 'busy':
+            raise InferenceUnavailable(reply['message'])
+        if 'error' in reply:
+            raise InferenceServiceError(reply['message'])
+        return reply['scores']
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client configured from settings"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient(
+                settings.INFERENCE_SERVICE_ADDRESS,
+                service_authkey(settings.INFERENCE_SERVICE_ADDRESS),
+                settings.INFERENCE_SERVICE_TIMEOUT,
+                settings.INFERENCE_SERVICE_MAX_PENDING,
+            )
+        return _client
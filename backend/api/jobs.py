@@ -0,0 +1,181 @@
+# api/jobs.py
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Jobs
+
+# Job kind -> handler(job) returning the job's JSON result
+JOB_HANDLERS = {}
+
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, payload, user_id=None):
+    """Queue a job for the worker and return it"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    return Jobs.objects.create(kind=kind, payload=payload, created_by_id=user_id)
+
+
+def set_progress(job, **progress):
+    """Merge progress information into a running job"""
+    job.progress = {**(job.progress or {}), **progress}
+    Jobs.objects.filter(job_id=job.job_id).update(progress=job.progress)
+
+
+def spool_upload(uploaded_file):
+    """
+    Keep an uploaded file for a job after the request has finished.
+
+    Temporary uploads are moved into JOB_SPOOL_DIR without copying; uploads
+    held in memory are written out chunk by chunk. Returns the spooled path.
+    """
+    os.makedirs(settings.JOB_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(settings.JOB_SPOOL_DIR, f'{uuid.uuid4().hex}_{os.path.basename(uploaded_file.name)}')
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        shutil.move(uploaded_file.temporary_file_path(), path)
+    else:
+        with open(path, 'wb') as destination:
+            for chunk in uploaded_file.chunks():
+                destination.write(chunk)
+    return path
+
+
+def remove_spooled_file(payload):
+    """Remove the spooled upload of a job's payload, if it has one left"""
+    path = (payload or {}).get('path')
+    if path and os.path.exists(path):
+        os.remove(path)
+
+
+def claim_next_job():
+    """Lock the oldest queued job, mark it running and return it (or None)"""
+    with transaction.atomic():
+        job = (
+            Jobs.objects.select_for_update(skip_locked=True)
+            .filter(status='queued')
+            .order_by('job_id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def reap_stale_jobs(job_ids=None):
+    """
+    Fail running jobs whose worker stopped sending heartbeats.
+
+    A job is stale once its last heartbeat (or its start, for rows without
+    one) is more than JOB_STALE_AFTER seconds old. Stale jobs are failed
+    rather than queued again, since a handler may have partly run, and their
+    spooled uploads are removed. Returns the number of jobs failed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER)
+    stale = Jobs.objects.filter(status='running').filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    if job_ids is not None:
+        stale = stale.filter(job_id__in=job_ids)
+    with transaction.atomic():
+        stale_jobs = list(stale.select_for_update().values_list('job_id', 'payload'))
+        if not stale_jobs:
+            return 0
+        failed = Jobs.objects.filter(job_id__in=[job_id for job_id, _ in stale_jobs]).update(
+            status='failed',
+            error='The job worker stopped responding while running this job',
+            finished_at=timezone.now(),
+        )
+    for _, payload in stale_jobs:
+        remove_spooled_file(payload)
+    return failed
+
+
+class _Heartbeat(threading.Thread):
+    """Record every JOB_HEARTBEAT_INTERVAL seconds that a job is still running"""
+
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                try:
+                    self.beat()
+                except DatabaseError as e:
+                    # A missed beat is retried; the job only goes stale after several
+                    print(f"Heartbeat of job {self.job.job_id} failed: {e}")
+        finally:
+            connection.close()
+
+    def beat(self):
+        Jobs.objects.filter(job_id=self.job.job_id, status='running').update(heartbeat_at=timezone.now())
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """
+    Run a claimed job and record its result or error. A spooled upload in the
+    payload is removed once the handler returns, whether or not it succeeded.
+    """
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    try:
+        result = JOB_HANDLERS[job.kind](job)
+        job.status = 'completed'
+        job.result = result
+    except Exception as e:
+        traceback.print_exc()
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        heartbeat.stop()
+        remove_spooled_file(job.payload)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def run_worker(poll_interval=1.0, once=False):
+    """Process queued jobs until interrupted (or the queue is empty if `once`)"""
+    next_reap = 0
+    while True:
+        close_old_connections()
+        if time.monotonic() >= next_reap:
+            reaped = reap_stale_jobs()
+            if reaped:
+                print(f"Failed {reaped} stale running job(s)")
+            next_reap = time.monotonic() + settings.JOB_HEARTBEAT_INTERVAL
+        job = claim_next_job()
+        if job is not None:
+            print(f"Running job {job.job_id} ({job.kind})")
+            run_job(job)
+            print(f"Job {job.job_id} {job.status}")
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
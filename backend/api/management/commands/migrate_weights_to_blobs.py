@@ -0,0 +1,84 @@
+# api/management/commands/migrate_weights_to_blobs.py
+import json
+import os
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Contributions, Models
+from api.weight_store import has_inline_weights, load_weights, to_manifest, verify_blob
+
+
+class Command(BaseCommand):
+    help = 'Move inline JSON float weights of models and contributions into the weight_blobs table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the rows that would be migrated',
+        )
+        parser.add_argument(
+            '--backup-dir',
+            help='Directory to write the original weights JSON of every migrated row to',
+        )
+        parser.add_argument(
+            '--no-backup',
+            action='store_true',
+            help='Migrate without writing backups',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        backup_dir = options['backup_dir']
+        if not dry_run and not backup_dir and not options['no_backup']:
+            raise CommandError('Pass --backup-dir, or --no-backup to migrate without backups')
+        if backup_dir:
+            os.makedirs(backup_dir, exist_ok=True)
+
+        for model_class, pk_name in ((Models, 'model_id'), (Contributions, 'contribution_id')):
+            migrated = 0
+            # Walk primary keys first so only one row's weights is in memory at a time
+            pks = model_class.objects.order_by(pk_name).values_list(pk_name, flat=True)
+            for pk in pks.iterator():
+                with transaction.atomic():
+                    weights = (
+                        model_class.objects.select_for_update().filter(pk=pk)
+                        .values_list('weights', flat=True).first()
+                    )
+                    if not has_inline_weights(weights):
+                        continue
+
+                    migrated += 1
+                    if dry_run:
+                        self.stdout.write(f'Would migrate {model_class.__name__} {pk}')
+                        continue
+
+                    if backup_dir:
+                        self._backup(backup_dir, f'{model_class._meta.db_table}_{pk}.json', weights)
+                    manifest = to_manifest(weights)
+                    # The row keeps its inline weights unless the stored blob holds exactly them
+                    if not verify_blob(manifest) or not self._matches(manifest, weights):
+                        raise CommandError(f'Stored blob of {model_class.__name__} {pk} does not match its weights')
+                    model_class.objects.filter(pk=pk).update(weights=manifest)
+                self.stdout.write(f"Migrated {model_class.__name__} {pk} -> {manifest['digest']}")
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{model_class.__name__}: {migrated} row(s) {"to migrate" if dry_run else "migrated"}'
+            ))
+
+    @staticmethod
+    def _backup(backup_dir, filename, weights):
+        path = os.path.join(backup_dir, filename)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(weights, f)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def _matches(manifest, weights):
+        stored = load_weights(manifest)
+        return len(stored) == len(weights['weights']) and all(
+            np.array_equal(array, np.asarray(original, dtype=np.float32))
+            for array, original in zip(stored, weights['weights'])
+        )
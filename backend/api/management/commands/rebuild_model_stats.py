@@ -0,0 +1,21 @@
+# api/management/commands/rebuild_model_stats.py
+from django.core.management.base import BaseCommand
+
+from api.model_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the model_stats table from ratings, comments and contributions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model-id',
+            type=int,
+            action='append',
+            dest='model_ids',
+            help='Only rebuild this model (can be repeated); rebuilds every model by default',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild(options['model_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {count} model(s)'))
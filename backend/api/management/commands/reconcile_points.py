@@ -0,0 +1,21 @@
+# api/management/commands/reconcile_points.py
+from django.core.management.base import BaseCommand
+
+from api.points import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute users' total_points from the points ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='Only reconcile this user (can be repeated); reconciles every user by default',
+        )
+
+    def handle(self, *args, **options):
+        count = reconcile(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled points of {count} user(s)'))
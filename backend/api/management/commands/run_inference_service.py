@@ -0,0 +1,47 @@
+# api/management/commands/run_inference_service.py
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from api.inference_service import InferenceServer, check_worker_memory, service_authkey
+
+
+class Command(BaseCommand):
+    help = 'Run the inference worker pool used when INFERENCE_MODE=service'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.INFERENCE_SERVICE_WORKERS,
+            help='Worker processes, each holding its own copy of the models in use',
+        )
+        parser.add_argument(
+            '--address',
+            default=settings.INFERENCE_SERVICE_ADDRESS,
+            help='Unix socket path or host:port to listen on',
+        )
+        parser.add_argument(
+            '--max-queue',
+            type=int,
+            default=settings.INFERENCE_SERVICE_MAX_QUEUE,
+            help='Requests running or waiting before new ones are refused',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            authkey = service_authkey(options['address'])
+            check_worker_memory(options['workers'])
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        server = InferenceServer(
+            options['address'],
+            authkey,
+            workers=options['workers'],
+            max_queue=options['max_queue'],
+        )
+        self.stdout.write(f"Inference service listening on {options['address']} with {options['workers']} worker(s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Inference service stopped')
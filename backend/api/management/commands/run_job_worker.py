@@ -0,0 +1,25 @@
+# api/management/commands/run_job_worker.py
+from django.core.management.base import BaseCommand
+
+from api.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = 'Process queued background jobs (Drive uploads, model aggregation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait before checking an empty queue again',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Job worker started')
+        run_worker(poll_interval=options['poll_interval'], once=options['once'])
@@ -0,0 +1,126 @@
+# api/model_cache.py
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import TextField
+from django.db.models.functions import MD5, Cast
+
+from .prediction_cache import prediction_cache
+
+
+def with_weights_key(queryset):
+    """
+    Defer the weights of a Models queryset and annotate `weights_key`, a digest
+    of the stored weights computed by the database.
+
+    Weights can change without a new version, so models and their predictions
+    are cached by this key. Every process sees a changed model as a new key on
+    its next request, whether or not invalidate_model() ran in that process.
+    """
+    return queryset.defer('weights').annotate(weights_key=MD5(Cast('weights', TextField())))
+
+
+class ModelCache:
+    """
+    Process-wide LRU registry of built, weight-loaded Keras models.
+
+    Entries are keyed by (model_id, weights_key), see with_weights_key(), and
+    evicted least recently used first once either the entry count or the
+    total weight size is exceeded. Storing a model drops the entries of its
+    other weights.
+    """
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (model, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._generations = {}  # model_id -> number of invalidations
+
+    def get(self, model_obj):
+        """Return the built model for a Models row, building it on a miss"""
+        key = (model_obj.model_id, model_obj.weights_key)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+            generation = self._generations.get(model_obj.model_id, 0)
+
+        # Only one thread builds a given model, the others wait for it
+        with build_lock:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry
+            # Imported here so that TensorFlow is only loaded by the first build
+            from .inference import build_model
+            try:
+                model, nbytes = build_model(model_obj.weights)
+            except BaseException:
+                with self._lock:
+                    self._build_locks.pop(key, None)
+                raise
+            with self._lock:
+                # A model invalidated while it was being built is not kept
+                if self._generations.get(model_obj.model_id, 0) == generation:
+                    self._store(key, model, nbytes)
+                # Released only once the model is stored, so no request
+                # arriving in between starts a second build
+                self._build_locks.pop(key, None)
+        return model
+
+    def invalidate(self, model_id):
+        """Drop every cached version of a model"""
+        model_id = int(model_id)
+        with self._lock:
+            self._generations[model_id] = self._generations.get(model_id, 0) + 1
+            self._drop(model_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _drop(self, model_id):
+        for key in [k for k in self._entries if k[0] == model_id]:
+            self._total_bytes -= self._entries.pop(key)[1]
+
+    def _store(self, key, model, nbytes):
+        # Older weights of the same model are not requested any more
+        self._drop(key[0])
+        self._entries[key] = (model, nbytes)
+        self._total_bytes += nbytes
+
+        # Evict least recently used models, but always keep the newest one
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self._total_bytes -= evicted_bytes
+
+
+model_cache = ModelCache(
+    max_entries=settings.MODEL_CACHE_MAX_ENTRIES,
+    max_bytes=settings.MODEL_CACHE_MAX_BYTES,
+)
+
+
+def get_model(model_obj):
+    return model_cache.get(model_obj)
+
+
+def invalidate_model(model_id):
+    """Forget a model and its predictions after it was changed or deleted"""
+    model_cache.invalidate(model_id)
+    prediction_cache.invalidate(model_id)
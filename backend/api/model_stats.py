@@ -0,0 +1,107 @@
+# api/model_stats.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Comments, Contributions, ModelStats, Ratings
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+CONTRIBUTION_STATUSES = ('pending', 'approved', 'rejected', 'aggregated')
+
+
+def _status_field(status):
+    return f'contributions_{status}' if status in CONTRIBUTION_STATUSES else None
+
+
+def _apply(model_id, deltas):
+    """
+    Add `deltas` (field -> increment) to a model's statistics row.
+
+    Must be called after the change it records has been written. A model
+    without a row yet (e.g. one created before statistics existed) is
+    rebuilt from the source tables instead, which already includes the change.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if field and delta}
+    if model_id is None or not deltas:
+        return
+    updated = ModelStats.objects.filter(model_id=model_id).update(
+        updated_at=timezone.now(),
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    if not updated:
+        rebuild([model_id])
+
+
+def record_rating(model_id, rating, previous_rating=None):
+    """Record a new rating, or a user's rating changing from `previous_rating`"""
+    deltas = {f'rating_{rating}': 1, 'rating_sum': rating}
+    if previous_rating is None:
+        deltas['rating_count'] = 1
+    else:
+        deltas[f'rating_{previous_rating}'] = deltas.get(f'rating_{previous_rating}', 0) - 1
+        deltas['rating_sum'] -= previous_rating
+    _apply(model_id, deltas)
+
+
+def record_comment_approval(model_id, was_approved, is_approved):
+    """Record a comment being created, approved or unapproved"""
+    _apply(model_id, {'approved_comment_count': int(bool(is_approved)) - int(bool(was_approved))})
+
+
+def record_contribution_status(model_id, previous_status, status, count=1):
+    """
+    Record `count` contributions of a model changing status.
+
+    Use None as `previous_status` for new contributions and as `status` for
+    deleted ones.
+    """
+    if previous_status == status:
+        return
+    deltas = {}
+    if _status_field(previous_status):
+        deltas[_status_field(previous_status)] = -count
+    if _status_field(status):
+        deltas[_status_field(status)] = count
+    _apply(model_id, deltas)
+
+
+def rebuild(model_ids=None):
+    """
+    Recompute the statistics of some models (or all models) from the
+    Ratings, Comments and Contributions tables. Returns the number of rows written.
+    """
+    ratings = Ratings.objects.all()
+    comments = Comments.objects.filter(is_approved=True)
+    contributions = Contributions.objects.all()
+    if model_ids is not None:
+        ratings = ratings.filter(model_id__in=model_ids)
+        comments = comments.filter(model_id__in=model_ids)
+        contributions = contributions.filter(model_id__in=model_ids)
+
+    rows = {model_id: {} for model_id in model_ids or []}
+    for row in ratings.values('model_id').annotate(
+        rating_count=Count('rating_id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{value}': Count('rating_id', filter=Q(rating=value)) for value in RATING_VALUES}
+    ).iterator(chunk_size=settings.DB_ITERATOR_CHUNK_SIZE):
+        rows.setdefault(row.pop('model_id'), {}).update(row)
+    for row in comments.values('model_id').annotate(approved_comment_count=Count('comment_id')).iterator(
+        chunk_size=settings.DB_ITERATOR_CHUNK_SIZE
+    ):
+        rows.setdefault(row.pop('model_id'), {}).update(row)
+    for row in contributions.exclude(model_id=None).values('model_id').annotate(
+        **{_status_field(s): Count('contribution_id', filter=Q(status=s)) for s in CONTRIBUTION_STATUSES}
+    ).iterator(chunk_size=settings.DB_ITERATOR_CHUNK_SIZE):
+        rows.setdefault(row.pop('model_id'), {}).update(row)
+
+    empty = {field: 0 for field in ModelStats.COUNTER_FIELDS}
+    with transaction.atomic():
+        if model_ids is None:
+            ModelStats.objects.exclude(model_id__in=rows).delete()
+        for model_id, counters in rows.items():
+            ModelStats.objects.update_or_create(
+                model_id=model_id,
+                defaults={**empty, **counters, 'updated_at': timezone.now()}
+            )
+    return len(rows)
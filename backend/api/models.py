@@ -106,6 +106,16 @@ class NotificationToUser(models.Model):
         db_table = 'notificationtouser'
         unique_together = (('notification', 'user'),)
 
+class NotificationAudience(models.Model):
+    id = models.AutoField(primary_key=True)
+    notification = models.ForeignKey(Notifications, models.DO_NOTHING, db_column='notification_id', related_name='audience')
+    role = models.ForeignKey(Roles, models.DO_NOTHING, db_column='role_id')
+
+    class Meta:
+        managed = False
+        db_table = 'notification_audience'
+        unique_together = (('notification', 'role'),)
+
 class FAQ(models.Model):
     faq_id = models.AutoField(primary_key=True)
     question = models.TextField()
@@ -115,4 +125,73 @@ class FAQ(models.Model):
     
     class Meta:
         managed = False
-        db_table = 'faq'
\ No newline at end of file
+        db_table = 'faq'
+
+class Jobs(models.Model):
+    job_id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, default='queued')  # queued, running, completed, failed
+    progress = models.JSONField(default=dict)
+    result = models.JSONField(null=True)
+    error = models.TextField(null=True)
+    created_by = models.ForeignKey(Users, models.DO_NOTHING, db_column='created_by', null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    heartbeat_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    
+    class Meta:
+        managed = False
+        db_table = 'jobs'
+
+class ModelStats(models.Model):
+    """Per-model counters kept up to date by api.model_stats"""
+    COUNTER_FIELDS = [
+        'rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+        'approved_comment_count',
+        'contributions_pending', 'contributions_approved', 'contributions_rejected', 'contributions_aggregated',
+    ]
+
+    model = models.OneToOneField(Models, models.DO_NOTHING, db_column='model_id', primary_key=True, related_name='stats')
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+    approved_comment_count = models.IntegerField(default=0)
+    contributions_pending = models.IntegerField(default=0)
+    contributions_approved = models.IntegerField(default=0)
+    contributions_rejected = models.IntegerField(default=0)
+    contributions_aggregated = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        managed = False
+        db_table = 'model_stats'
+
+class PointsLedger(models.Model):
+    """One row per points award; Users.total_points is their running sum"""
+    entry_id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(Users, models.DO_NOTHING, db_column='user_id', related_name='points_entries')
+    contribution = models.ForeignKey(Contributions, models.DO_NOTHING, db_column='contribution_id', null=True, blank=True)
+    points = models.IntegerField()
+    reason = models.CharField(max_length=50)
+    awarded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'points_ledger'
+
+class WeightBlob(models.Model):
+    """Float32 weight blob referenced by a tensor-blob manifest, see api.weight_store"""
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    nbytes = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'weight_blobs'
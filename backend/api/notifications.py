@@ -0,0 +1,101 @@
+# api/notifications.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import NotificationAudience, NotificationToUser, Notifications, Roles
+
+
+def notify_users(message, user_ids):
+    """
+    Send a notification to a list of users.
+
+    One row is written per recipient, in batches of NOTIFICATION_BATCH_SIZE.
+    Use broadcast() for messages to everyone with a role.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return None
+    with transaction.atomic():
+        notification = Notifications.objects.create(message=message)
+        NotificationToUser.objects.bulk_create(
+            (NotificationToUser(notification=notification, user_id=user_id, is_read=False) for user_id in user_ids),
+            batch_size=settings.NOTIFICATION_BATCH_SIZE
+        )
+    return notification
+
+
+def broadcast(message, role_names):
+    """
+    Send a notification to every user with one of `role_names`.
+
+    Only the notification and its audience are written, so the cost does not
+    grow with the number of users. Users see broadcasts sent after they
+    joined; a per-user row is only written when they mark one read.
+    """
+    with transaction.atomic():
+        notification = Notifications.objects.create(message=message)
+        NotificationAudience.objects.bulk_create(
+            NotificationAudience(notification=notification, role_id=role_id)
+            for role_id in Roles.objects.filter(role_name__in=role_names).values_list('role_id', flat=True)
+        )
+    return notification
+
+
+def _broadcasts_for(user):
+    """Broadcast notifications addressed to `user`'s role since they joined"""
+    return Q(
+        Exists(NotificationAudience.objects.filter(notification_id=OuterRef('notification_id'), role_id=user.role_id)),
+        sent_date__gte=user.created_at
+    )
+
+
+def feed(user):
+    """
+    All notifications visible to `user` as values() rows with `is_read`,
+    both delivered and broadcast ones.
+    """
+    deliveries = NotificationToUser.objects.filter(notification_id=OuterRef('notification_id'), user_id=user.user_id)
+    return Notifications.objects.filter(
+        Q(Exists(deliveries)) | _broadcasts_for(user)
+    ).annotate(
+        is_read=Exists(deliveries.filter(is_read=True))
+    ).values('notification_id', 'message', 'sent_date', 'is_read')
+
+
+def _unread_broadcasts(user):
+    read = NotificationToUser.objects.filter(notification_id=OuterRef('notification_id'), user_id=user.user_id)
+    return Notifications.objects.filter(_broadcasts_for(user)).exclude(Exists(read))
+
+
+def unread_count(user):
+    """Number of unread notifications, delivered and broadcast"""
+    delivered = NotificationToUser.objects.filter(user_id=user.user_id, is_read=False).count()
+    return delivered + _unread_broadcasts(user).count()
+
+
+def _record_reads(user, notification_ids):
+    # Read state of broadcasts is only written once they are read
+    NotificationToUser.objects.bulk_create(
+        (NotificationToUser(notification_id=notification_id, user_id=user.user_id, is_read=True)
+         for notification_id in notification_ids),
+        batch_size=settings.NOTIFICATION_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def mark_read(user, notification_id):
+    """Mark one notification read. Returns False if `user` cannot see it."""
+    if NotificationToUser.objects.filter(notification_id=notification_id, user_id=user.user_id).update(is_read=True):
+        return True
+    if not _unread_broadcasts(user).filter(notification_id=notification_id).exists():
+        return False
+    _record_reads(user, [notification_id])
+    return True
+
+
+def mark_all_read(user):
+    """Mark every notification visible to `user` read"""
+    with transaction.atomic():
+        NotificationToUser.objects.filter(user_id=user.user_id, is_read=False).update(is_read=True)
+        _record_reads(user, list(_unread_broadcasts(user).values_list('notification_id', flat=True)))
@@ -0,0 +1,134 @@
+# api/pagination.py
+import base64
+import datetime
+import decimal
+import json
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were not produced by encode_cursor"""
+
+
+def page_limit(request):
+    """Read the `limit` query parameter, clamped to API_MAX_PAGE_SIZE"""
+    try:
+        limit = int(request.query_params.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        limit = settings.API_PAGE_SIZE
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def _cursor_value(value):
+    # Keep full microsecond precision, DjangoJSONEncoder would round datetimes
+    # to milliseconds and break equality with the stored value
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f'Cannot use {type(value).__name__} in a cursor')
+
+
+def encode_cursor(values):
+    """Encode the ordering values of the last row of a page as an opaque cursor"""
+    raw = json.dumps(list(values), default=_cursor_value)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """Decode a cursor into one value per ordering field"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def row_value(row, field):
+    """Read an ordering field (e.g. `notification__sent_date`) from a values() dict or model instance"""
+    if isinstance(row, dict):
+        return row[field]
+    return reduce(getattr, field.split('__'), row)
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the filter selecting rows that come after `values` in `ordering`.
+
+    For ordering (-a, -b) and values (x, y) this is a < x OR (a = x AND b < y).
+    The last ordering field must be unique so that rows are never skipped or
+    repeated between pages.
+    """
+    condition = Q()
+    for index in reversed(range(len(ordering))):
+        field = ordering[index].lstrip('-')
+        lookup = 'lt' if ordering[index].startswith('-') else 'gt'
+        after = Q(**{f'{field}__{lookup}': values[index]})
+        condition = after if index == len(ordering) - 1 else after | (Q(**{field: values[index]}) & condition)
+    return condition
+
+
+def keyset_page(queryset, ordering, limit, cursor=None):
+    """
+    Return (rows, next_cursor) for one page of a queryset in keyset order.
+
+    `next_cursor` is None on the last page. One extra row is fetched to tell
+    whether another page follows, so no COUNT query is needed.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, ordering)
+        try:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        except (TypeError, ValueError, ValidationError) as e:
+            # A value the ordering field cannot hold, e.g. a string for an ID
+            raise InvalidCursor('Invalid cursor') from e
+
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(row_value(rows[-1], field.lstrip('-')) for field in ordering)
+
+
+def requested_fields(request):
+    """Read the `fields` query parameter (comma separated) into a list, or None for all fields"""
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def paginated_response(request, queryset, ordering, serializer_class, **extra):
+    """
+    Respond with one keyset page of a queryset.
+
+    Reads the `limit`, `cursor` and `fields` query parameters; `fields` is
+    passed on to the serializer, which must accept it (see
+    SparseFieldsMixin). A serializer's `setup_eager_loading(queryset)`, if it
+    has one, adds the joins its related fields need. The body is
+    {"results": [...], "next_cursor": ...} plus any `extra` keys.
+    """
+    if hasattr(serializer_class, 'setup_eager_loading'):
+        queryset = serializer_class.setup_eager_loading(queryset)
+
+    try:
+        rows, next_cursor = keyset_page(
+            queryset,
+            ordering,
+            page_limit(request),
+            request.query_params.get('cursor')
+        )
+    except InvalidCursor as e:
+        return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = serializer_class(rows, many=True, fields=requested_fields(request))
+    return Response({'results': serializer.data, 'next_cursor': next_cursor, **extra})
@@ -0,0 +1,50 @@
+# api/points.py
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import PointsLedger, Users
+
+
+def award(awards, reason):
+    """
+    Award points, given as (user_id, contribution_id, points) tuples.
+
+    Each award gets a ledger row and is added to Users.total_points with an
+    F() expression, so concurrent awards to the same user never overwrite
+    each other. Users with the same total are updated with one query.
+    """
+    awards = [(user_id, contribution_id, points) for user_id, contribution_id, points in awards if points]
+    if not awards:
+        return
+
+    totals = defaultdict(int)
+    for user_id, _, points in awards:
+        totals[user_id] += points
+    users_by_total = defaultdict(list)
+    for user_id, total in totals.items():
+        users_by_total[total].append(user_id)
+
+    with transaction.atomic():
+        PointsLedger.objects.bulk_create(
+            PointsLedger(user_id=user_id, contribution_id=contribution_id, points=points, reason=reason)
+            for user_id, contribution_id, points in awards
+        )
+        for total, user_ids in users_by_total.items():
+            Users.objects.filter(user_id__in=user_ids).update(total_points=F('total_points') + total)
+
+
+def reconcile(user_ids=None):
+    """
+    Recompute Users.total_points from the ledger in one UPDATE, for some
+    users or all of them. Returns the number of users updated.
+    """
+    ledger_total = PointsLedger.objects.filter(user_id=OuterRef('user_id')).values('user_id').annotate(
+        total=Sum('points')
+    ).values('total')
+    users = Users.objects.all()
+    if user_ids is not None:
+        users = users.filter(user_id__in=user_ids)
+    return users.update(total_points=Coalesce(Subquery(ledger_total), Value(0)))
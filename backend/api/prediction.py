@@ -0,0 +1,137 @@
+# api/prediction.py
+"""
+Prediction input and output handling that does not need TensorFlow, shared
+by in-process inference and the inference service client.
+"""
+import io
+
+import numpy as np
+
+# Prediction labels by output index
+PREDICTION_LABELS = {
+    0: "glioma",
+    1: "meningioma",
+    2: "no tumor",
+    3: "pituitary"
+}
+NO_TUMOR = "no tumor"
+
+# Model input size (width, height) and channel layout
+IMAGE_SIZE = (128, 128)
+IMAGE_MODE = 'RGB'
+IMAGE_CHANNELS = 3
+
+# Modes with more than 8 bits per pixel, e.g. 16-bit grayscale MRI exports
+HIGH_DEPTH_MODES = ('I', 'I;16', 'I;16B', 'I;16L', 'I;16N', 'F')
+
+
+def _to_8bit(image):
+    """Convert any PIL image to 8-bit grayscale ('L') or RGB"""
+    from PIL import Image
+
+    if image.mode in HIGH_DEPTH_MODES:
+        # Stretch the used intensity range to 8 bits instead of clipping it
+        pixels = np.asarray(image, dtype=np.float32)
+        low, high = float(pixels.min()), float(pixels.max())
+        scale = 255 / (high - low) if high > low else 0
+        image = Image.fromarray(((pixels - low) * scale).astype(np.uint8))
+    if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        # Transparent areas become black, like the background of a scan
+        background = Image.new('RGBA', image.size, (0, 0, 0, 255))
+        image = Image.alpha_composite(background, image.convert('RGBA'))
+    return image if image.mode in ('L', IMAGE_MODE) else image.convert(IMAGE_MODE)
+
+
+def image_into(image, out):
+    """
+    Convert a PIL image into `out`, a (height, width, 3) uint8 array.
+
+    RGB images are resized exactly as the models were trained (Pillow's
+    default bicubic filter on the fully decoded image), so their inputs do not
+    change with this pipeline.
+    """
+    from PIL import Image
+
+    # Resize before expanding grayscale to three channels
+    image = _to_8bit(image)
+    if image.size != IMAGE_SIZE:
+        image = image.resize(IMAGE_SIZE, Image.Resampling.BICUBIC)
+    pixels = np.asarray(image)
+    out[...] = pixels[:, :, np.newaxis] if pixels.ndim == 2 else pixels
+
+
+def decode_image_into(data, out):
+    """Decode encoded image bytes into `out`, a (height, width, 3) uint8 array"""
+    from PIL import Image
+
+    image_into(Image.open(io.BytesIO(data)), out)
+
+
+def _batch_buffer(count):
+    return np.empty((count, IMAGE_SIZE[1], IMAGE_SIZE[0], IMAGE_CHANNELS), dtype=np.uint8)
+
+
+def load_image_batch(image_files):
+    """
+    Decode uploaded images into one (n, 128, 128, 3) float32 array.
+
+    Every image is decoded into its slot of a preallocated uint8 buffer and
+    the whole batch is converted to float32 in one operation.
+    """
+    buffer = _batch_buffer(len(image_files))
+    for index, image_file in enumerate(image_files):
+        decode_image_into(image_file.read(), buffer[index])
+    return buffer.astype(np.float32)
+
+
+def load_slice_batch(slices):
+    """Like load_image_batch, for slices from api.series"""
+    buffer = _batch_buffer(len(slices))
+    for index, slice_ in enumerate(slices):
+        image_into(slice_.read(), buffer[index])
+    return buffer.astype(np.float32)
+
+
+def load_image_array(image_file):
+    """Decode an uploaded image into a (128, 128, 3) float32 array"""
+    return load_image_batch([image_file])[0]
+
+
+def format_prediction(scores):
+    """Turn one row of model output into the prediction response payload"""
+    predicted_class = int(np.argmax(scores))
+
+    # Get confidence scores
+    confidence_scores = {
+        label: float(score)
+        for label, score in zip(PREDICTION_LABELS.values(), scores)
+    }
+
+    return {
+        'prediction': PREDICTION_LABELS[predicted_class],
+        'confidence_scores': confidence_scores
+    }
+
+
+def format_study(slice_scores):
+    """
+    Aggregate the slice predictions of one study.
+
+    A tumor usually shows in only some slices, so the study is predicted as
+    the tumor type found in the most slices, and as 'no tumor' only if no
+    slice shows one. `confidence_scores` are the slice scores averaged and
+    `slice_counts` the number of slices predicted as each label.
+    """
+    scores = np.asarray(slice_scores)
+    predicted = scores.argmax(axis=1)
+    slice_counts = {label: int((predicted == index).sum()) for index, label in PREDICTION_LABELS.items()}
+    tumor_counts = {label: count for label, count in slice_counts.items() if label != NO_TUMOR and count}
+
+    return {
+        'prediction': max(tumor_counts, key=tumor_counts.get) if tumor_counts else NO_TUMOR,
+        'confidence_scores': {
+            label: float(score)
+            for label, score in zip(PREDICTION_LABELS.values(), scores.mean(axis=0))
+        },
+        'slice_counts': slice_counts
+    }
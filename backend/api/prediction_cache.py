@@ -0,0 +1,96 @@
+# api/prediction_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def digest_upload(upload):
+    """sha256 of an uploaded file's bytes; the file is rewound for reading"""
+    sha256 = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha256.update(chunk)
+    upload.seek(0)
+    return sha256.hexdigest()
+
+
+class PredictionCache:
+    """
+    Process-wide LRU cache of prediction results.
+
+    Entries are keyed by (model_id, weights_key, image digest), expire `ttl`
+    seconds after they were stored and are evicted least recently used first
+    beyond `max_entries`. A `max_entries` or `ttl` of 0 disables the cache.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (result, expires)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, model_obj, digest):
+        """Return the cached result for an image, or None"""
+        if not self.enabled:
+            return None
+        key = (model_obj.model_id, model_obj.weights_key, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, model_obj, digest, result):
+        if not self.enabled:
+            return
+        key = (model_obj.model_id, model_obj.weights_key, digest)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (result, time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model_id):
+        """Drop the results of a model, e.g. to free them after it was deleted"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == int(model_id)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Hit and miss counts since this process started"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+            }
+
+
+prediction_cache = PredictionCache(
+    max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES,
+    ttl=settings.PREDICTION_CACHE_TTL,
+)
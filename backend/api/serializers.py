@@ -1,25 +1,40 @@
 # api/serializers.py
+from django.db import transaction
 from rest_framework import serializers
 from .models import *
+from .weight_store import has_inline_weights, to_manifest
+
+class SparseFieldsMixin:
+    """Serializer mixin accepting `fields=[...]` to serialize only those fields (unknown names are ignored)"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 class RoleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Roles
         fields = '__all__'
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Users
         fields = ['user_id', 'username', 'email', 'role', 'created_at', 'total_points', 'is_active']
         read_only_fields = ['user_id', 'created_at']
 
-class ModelListSerializer(serializers.ModelSerializer):
+class ModelListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for listing models without weights"""
     class Meta:
         model = Models
         exclude = ('weights',)
         read_only_fields = ['model_id', 'published_date', 'created_date']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.defer('weights')
+
 class ModelDetailSerializer(serializers.ModelSerializer):
     """Serializer for model creation and full detail"""
     class Meta:
@@ -27,7 +42,23 @@ class ModelDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['model_id', 'published_date', 'created_date']
 
-class ContributionListSerializer(serializers.ModelSerializer):
+    # Inline float lists are moved to the weight store, only the manifest is
+    # kept. The blob is stored in the same transaction as the row
+    def create(self, validated_data):
+        with transaction.atomic():
+            return super().create(self._store_weights(validated_data))
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            return super().update(instance, self._store_weights(validated_data))
+
+    @staticmethod
+    def _store_weights(validated_data):
+        if has_inline_weights(validated_data.get('weights')):
+            validated_data['weights'] = to_manifest(validated_data['weights'])
+        return validated_data
+
+class ContributionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for listing contributions without weights"""
     researcher_name = serializers.CharField(source='researcher.username', read_only=True)
     model_details = ModelListSerializer(source='model', read_only=True)
@@ -37,6 +68,11 @@ class ContributionListSerializer(serializers.ModelSerializer):
         exclude = ('weights',)
         read_only_fields = ['contribution_id', 'upload_date']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Researcher names and model details come from the same query
+        return queryset.select_related('researcher', 'model').defer('weights', 'model__weights')
+
 class ContributionDetailSerializer(serializers.ModelSerializer):
     """Serializer for contribution creation and full detail"""
     researcher_name = serializers.CharField(source='researcher.username', read_only=True)
@@ -64,6 +100,25 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['comment_id', 'comment_date']
 
+class CommentUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Users
+        fields = ['user_id', 'username']
+
+class CommentListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for listing comments with their author"""
+    user = CommentUserSerializer(read_only=True)
+    model_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Comments
+        fields = ['comment_id', 'user', 'model_id', 'comment_text', 'comment_date', 'is_approved']
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('user')
+
 class NotificationSerializer(serializers.ModelSerializer):
     is_read = serializers.BooleanField(source='notificationtouser.is_read', read_only=True)
 
@@ -72,12 +127,45 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ['notification_id', 'message', 'sent_date', 'is_read']
         read_only_fields = ['notification_id', 'sent_date']
 
-class FAQSerializer(serializers.ModelSerializer):
+class FAQSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = FAQ
         fields = '__all__'
         read_only_fields = ['faq_id', 'created_date']
 
+class ModelStatsSerializer(serializers.ModelSerializer):
+    """Serializer for a model's rating, comment and contribution counters"""
+    model_id = serializers.IntegerField(read_only=True)
+    average_rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
+    contributions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ModelStats
+        fields = ['model_id', 'rating_count', 'average_rating', 'rating_histogram',
+                  'approved_comment_count', 'contributions', 'updated_at']
+        read_only_fields = fields
+
+    def get_average_rating(self, obj):
+        return round(obj.rating_sum / obj.rating_count, 2) if obj.rating_count else None
+
+    def get_rating_histogram(self, obj):
+        return {str(value): getattr(obj, f'rating_{value}') for value in range(1, 6)}
+
+    def get_contributions(self, obj):
+        return {
+            'pending': obj.contributions_pending,
+            'approved': obj.contributions_approved,
+            'rejected': obj.contributions_rejected,
+            'aggregated': obj.contributions_aggregated,
+        }
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Jobs
+        fields = ['job_id', 'kind', 'status', 'progress', 'result', 'error', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+        read_only_fields = fields
+
 # Custom serializers for login and role checking
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField(max_length=50)
@@ -0,0 +1,232 @@
+# api/series.py
+"""
+Reading uploaded DICOM files, zipped series and plain images as the slices
+of one or more studies.
+
+Headers are read first so that slices can be ordered and counted; pixel
+data is only decoded when a slice is read, batch by batch. DICOM support
+needs the optional pydicom package.
+"""
+import io
+import os
+import zipfile
+from collections import namedtuple
+from collections.abc import Sequence
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+from django.conf import settings
+
+# `read()` returns the slice as a PIL image
+Slice = namedtuple('Slice', ['filename', 'study_uid', 'series_uid', 'instance_number', 'frame', 'read'])
+
+
+class SeriesError(ValueError):
+    """An upload that cannot be read as slices"""
+
+
+def _pydicom():
+    try:
+        import pydicom
+    except ImportError as e:
+        raise SeriesError('DICOM files are not supported on this server (pydicom is not installed)') from e
+    return pydicom
+
+
+def is_dicom(head):
+    """DICOM Part 10 files have 'DICM' after a 128 byte preamble"""
+    return len(head) >= 132 and head[128:132] == b'DICM'
+
+
+def _first(value):
+    # Window and position tags may hold several values
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return value[0] if len(value) else None
+    return value
+
+
+def window(pixels, dataset):
+    """
+    Map stored DICOM pixel values to 8-bit intensities.
+
+    Applies the rescale slope and intercept, then the window given by
+    WindowCenter/WindowWidth, or the 0.5-99.5 percentile range when the file
+    has no window. MONOCHROME1 images are inverted so that higher is brighter.
+    """
+    values = pixels.astype(np.float32)
+    values = values * float(dataset.get('RescaleSlope', 1) or 1) + float(dataset.get('RescaleIntercept', 0) or 0)
+
+    center, width = _first(dataset.get('WindowCenter')), _first(dataset.get('WindowWidth'))
+    if center is not None and width:
+        low, high = float(center) - float(width) / 2, float(center) + float(width) / 2
+    else:
+        low, high = np.percentile(values, (0.5, 99.5))
+
+    if high > low:
+        scaled = (np.clip(values, low, high) - low) * (255 / (high - low))
+    else:
+        scaled = np.zeros_like(values)
+    if dataset.get('PhotometricInterpretation') == 'MONOCHROME1':
+        scaled = 255 - scaled
+    return scaled.astype(np.uint8)
+
+
+class _DecodedFile:
+    """The decoded pixels of one multi-frame file, replaced by the next one"""
+
+    def __init__(self):
+        self.clear()
+
+    def get(self, key, decode):
+        if self.key is not key:
+            # Release the previous file before decoding the next
+            self.clear()
+            self.value = decode()
+            self.key = key
+        return self.value
+
+    def clear(self):
+        self.key = self.value = None
+
+
+def _dicom_slices(filename, default_study, open_file, decoded):
+    """
+    Slices of one DICOM file; `open_file()` returns a binary file object.
+
+    Single-frame pixels are decoded on every read and released with the
+    slice. Frames of a multi-frame file are read one after the other, so
+    the file is decoded once and kept in `decoded` until the next file.
+    """
+    pydicom = _pydicom()
+    try:
+        with open_file() as f:
+            header = pydicom.dcmread(f, stop_before_pixels=True)
+    except Exception as e:
+        raise SeriesError(f'{filename} is not a readable DICOM file') from e
+
+    def pixels():
+        with open_file() as f:
+            dataset = pydicom.dcmread(f)
+        try:
+            return dataset, dataset.pixel_array
+        except Exception as e:
+            raise SeriesError(f'{filename} has no readable pixel data') from e
+
+    frames = int(header.get('NumberOfFrames', 1) or 1)
+    key = object()
+
+    def reader(frame):
+        def read():
+            from PIL import Image
+            if frames > 1:
+                dataset, array = decoded.get(key, pixels)
+                array = array[frame]
+            else:
+                dataset, array = pixels()
+            if int(dataset.get('SamplesPerPixel', 1) or 1) == 3:
+                return Image.fromarray(array.astype(np.uint8), 'RGB')
+            return Image.fromarray(window(array, dataset), 'L')
+        return read
+
+    study_uid = str(header.get('StudyInstanceUID') or default_study)
+    series_uid = str(header.get('SeriesInstanceUID') or '')
+    instance_number = header.get('InstanceNumber')
+    instance_number = int(instance_number) if instance_number is not None else None
+    # ImagePositionPatient is (x, y, z); z orders axial slices without instance numbers
+    position = header.get('ImagePositionPatient')
+    z = float(position[2]) if position is not None and len(position) == 3 else 0.0
+    return [
+        (
+            (study_uid, series_uid, instance_number or 0, z, filename, frame),
+            Slice(filename, study_uid, series_uid, instance_number, frame if frames > 1 else None, reader(frame))
+        )
+        for frame in range(frames)
+    ]
+
+
+def _image_slice(filename, study_uid, open_file):
+    def read():
+        from PIL import Image, UnidentifiedImageError
+        with open_file() as f:
+            data = f.read()
+        try:
+            return Image.open(io.BytesIO(data))
+        except UnidentifiedImageError as e:
+            raise SeriesError(f'{filename} is not a DICOM file, zip archive or supported image') from e
+
+    return [((study_uid, '', 0, 0.0, filename, 0), Slice(filename, study_uid, '', None, None, read))]
+
+
+def _upload_slices(upload, decoded):
+    head = upload.read(132)
+    upload.seek(0)
+    name = os.path.basename(upload.name or 'upload')
+
+    def open_upload():
+        # Read from the upload itself (memory or temporary file) without closing it
+        upload.seek(0)
+        return nullcontext(upload)
+
+    if is_dicom(head):
+        return _dicom_slices(name, name, open_upload, decoded), None
+    if not zipfile.is_zipfile(upload):
+        upload.seek(0)
+        return _image_slice(name, name, open_upload), None
+
+    upload.seek(0)
+    archive = zipfile.ZipFile(upload)
+    try:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not os.path.basename(info.filename).startswith('.')
+            and not info.filename.startswith('__MACOSX/')
+        ]
+        # Checked before anything is decompressed
+        if sum(info.file_size for info in members) > settings.PREDICT_SERIES_MAX_BYTES:
+            raise SeriesError(f'{name} is too large when uncompressed')
+
+        slices = []
+        for info in members:
+            with archive.open(info) as f:
+                member_head = f.read(132)
+            filename = f'{name}/{info.filename}'
+            open_member = (lambda info: lambda: archive.open(info))(info)
+            if is_dicom(member_head):
+                slices.extend(_dicom_slices(filename, name, open_member, decoded))
+            else:
+                slices.extend(_image_slice(filename, name, open_member))
+    except Exception:
+        archive.close()
+        raise
+    return slices, archive
+
+
+@contextmanager
+def read_slices(uploads):
+    """
+    Yield the slices of all uploads ordered by study, series and position.
+
+    Each upload can be a DICOM file, a plain image or a zip of either.
+    DICOM files without a study UID are grouped by upload name, as are
+    plain images. Raises SeriesError for unreadable uploads and when there
+    are more than PREDICT_SERIES_MAX_SLICES slices.
+    """
+    archives = []
+    decoded = _DecodedFile()
+    try:
+        keyed = []
+        for upload in uploads:
+            slices, archive = _upload_slices(upload, decoded)
+            if archive is not None:
+                archives.append(archive)
+            keyed.extend(slices)
+            if len(keyed) > settings.PREDICT_SERIES_MAX_SLICES:
+                raise SeriesError(f'Too many slices. Maximum is {settings.PREDICT_SERIES_MAX_SLICES}')
+        if not keyed:
+            raise SeriesError('No slices found')
+        keyed.sort(key=lambda item: item[0])
+        yield [slice_ for _, slice_ in keyed]
+    finally:
+        decoded.clear()
+        for archive in archives:
+            archive.close()
@@ -0,0 +1,190 @@
+# api/tasks.py
+import os
+import threading
+import time
+from collections import Counter
+
+from django.db import transaction
+
+from .aggregation import aggregate_contributions
+from .download_pipeline import prefetch_contributions
+from .gdrive_helper import GoogleDriveHelper
+from .jobs import job_handler, set_progress
+from . import model_stats, notifications, points
+from .models import *
+from .serializers import ContributionDetailSerializer, ModelDetailSerializer
+
+
+def _gdrive_for(user):
+    gdrive = GoogleDriveHelper(
+        user.gdrive.get('client_id'),
+        user.gdrive.get('client_secret'),
+        user.gdrive.get('refresh_token')
+    )
+    gdrive.authenticate()
+    return gdrive
+
+
+def _upload_spooled_file(job, user, folder_url):
+    """Upload a job's spooled file to Google Drive (run_job removes it afterwards)"""
+    path = job.payload['path']
+    set_progress(job, stage='uploading', bytes_total=os.path.getsize(path))
+    with open(path, 'rb') as f:
+        return _gdrive_for(user).upload_file(f, job.payload['filename'], folder_url)
+
+
+@job_handler('upload_contribution')
+def upload_contribution(job):
+    researcher = Users.objects.get(user_id=job.payload['researcher_id'])
+    weights_url = _upload_spooled_file(job, researcher, researcher.gdrive.get('contributions_url'))
+
+    # Create contribution with Google Drive URL
+    with transaction.atomic():
+        contribution = Contributions.objects.create(
+            researcher_id=researcher.user_id,
+            model_id=job.payload['model_id'],
+            weights=weights_url,
+            status='pending'
+        )
+        model_stats.record_contribution_status(contribution.model_id, None, 'pending')
+    set_progress(job, stage='done')
+    return ContributionDetailSerializer(contribution).data
+
+
+@job_handler('upload_model_weights')
+def upload_model_weights(job):
+    admin = Users.objects.get(user_id=job.payload['admin_id'])
+    result = _upload_spooled_file(job, admin, admin.gdrive['models_url'])
+    if not result or 'weights_url' not in result:
+        raise ValueError('Failed to upload to Google Drive')
+    set_progress(job, stage='done')
+    return result
+
+
+def _record_aggregation(exp_model, contribution_ids, points_per_contribution):
+    """
+    Link a round's contributions to the model built from them, mark them
+    aggregated and reward their researchers, in a constant number of queries.
+    Contributions that were already aggregated are linked but not rewarded again.
+    """
+    ContributionToModel.objects.bulk_create(
+        [ContributionToModel(model=exp_model, contribution_id=contribution_id) for contribution_id in contribution_ids],
+        ignore_conflicts=True
+    )
+
+    # Lock the rows so a concurrent status change cannot be rewarded twice
+    rewarded = list(
+        Contributions.objects.select_for_update()
+        .filter(contribution_id__in=contribution_ids)
+        .exclude(status='aggregated')
+        .values('contribution_id', 'researcher_id', 'model_id', 'status')
+    )
+    if not rewarded:
+        return
+    Contributions.objects.filter(contribution_id__in=[c['contribution_id'] for c in rewarded]).update(
+        status='aggregated',
+        points_earned=points_per_contribution
+    )
+
+    points.award(
+        [(c['researcher_id'], c['contribution_id'], points_per_contribution) for c in rewarded],
+        reason='aggregated'
+    )
+
+    for (model_id, previous_status), count in Counter((c['model_id'], c['status']) for c in rewarded).items():
+        model_stats.record_contribution_status(model_id, previous_status, 'aggregated', count=count)
+
+    # One notification for the round, delivered to each rewarded researcher once
+    notifications.notify_users(
+        f"Your contribution was aggregated into experimental model v{exp_model.version}. You earned {points_per_contribution} points!",
+        [c['researcher_id'] for c in rewarded]
+    )
+
+
+def _download_reporter(job, downloads):
+    """
+    Progress callback for the download pipeline that records each item in
+    `downloads` and on the job, at most once a second and on every status change
+    """
+    last_report = [0.0]
+    lock = threading.Lock()
+
+    def report(contribution_id, item):
+        with lock:
+            status_changed = downloads.get(contribution_id, {}).get('status') != item['status']
+            downloads[contribution_id] = {'status': item['status'], 'bytes': item['bytes']}
+            if status_changed or time.monotonic() - last_report[0] >= 1:
+                last_report[0] = time.monotonic()
+                set_progress(job, stage='downloading', downloads=dict(downloads))
+    return report
+
+
+@job_handler('prefetch_contribution_weights')
+def prefetch_contribution_weights(job):
+    admin = Users.objects.get(user_id=job.payload['admin_id'])
+    contributions = list(Contributions.objects.filter(contribution_id__in=job.payload['contribution_ids']))
+
+    downloads = {}
+    items = prefetch_contributions(contributions, admin.gdrive, progress=_download_reporter(job, downloads))
+    set_progress(job, stage='done', downloads=dict(downloads))
+    return {
+        'results': [
+            {
+                'contribution_id': contribution_id,
+                'status': item['status'],
+                'bytes': item['bytes'],
+                'error': item.get('error')
+            }
+            for contribution_id, item in items.items()
+        ]
+    }
+
+
+@job_handler('create_experimental_model')
+def create_experimental_model(job):
+    payload = job.payload
+    admin = Users.objects.get(user_id=payload['admin_id'])
+    model_name = payload.get('model_name')
+    points_per_contribution = payload.get('points_per_contribution', 10)
+
+    target_model = Models.objects.get(model_id=payload['target_model_id'])
+    contributions = list(Contributions.objects.filter(contribution_id__in=payload['contribution_ids']))
+    if not contributions:
+        raise ValueError('No contributions to aggregate')
+
+    # Aggregate the contribution weights on the server with FedAvg
+    downloads = {}
+    aggregated_path = aggregate_contributions(
+        contributions,
+        admin.gdrive,
+        payload.get('contribution_weights'),
+        progress=_download_reporter(job, downloads)
+    )
+
+    try:
+        # Upload aggregated weights to Google Drive
+        set_progress(job, stage='uploading', downloads=dict(downloads))
+        filename = f"model_{model_name}_v{target_model.version + 1}.h5"
+        with open(aggregated_path, 'rb') as f:
+            weights_url = _gdrive_for(admin).upload_file(
+                f,
+                filename,
+                admin.gdrive.get('models_url')
+            )
+    finally:
+        os.remove(aggregated_path)
+
+    with transaction.atomic():
+        # Create experimental model with Google Drive URL
+        exp_model = Models.objects.create(
+            model_name=model_name,
+            model_description=payload.get('model_description'),
+            version=target_model.version + 1,
+            status='experimental',
+            weights=weights_url,
+            metrics=target_model.metrics
+        )
+        _record_aggregation(exp_model, [c.contribution_id for c in contributions], points_per_contribution)
+
+    set_progress(job, stage='done')
+    return ModelDetailSerializer(exp_model).data
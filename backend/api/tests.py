@@ -1,3 +1,1492 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import Listener
+
+import h5py
+import numpy as np
+from PIL import Image
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import aggregation, model_stats, notifications, points, prediction, series, weight_cache, weight_store
+from .batching import MicroBatcher, _Batch
+from .jobs import _Heartbeat, reap_stale_jobs, run_worker
+from .tasks import _record_aggregation
+from .auth_helpers import clear_role_cache
+from .model_cache import ModelCache, model_cache
+from .prediction_cache import PredictionCache, prediction_cache
+from .inference_service import (
+    InferenceClient, InferenceServer, InferenceUnavailable, ModelBuildError, check_worker_memory, service_authkey
+)
+from .models import *
+from .pagination import encode_cursor
+from .serializers import ModelDetailSerializer
+from .token_cache import TokenCache, TokenRefreshError
+from .views import _not_modified, _parse_range, _serve_cached_download
+
+
+class FakeTokenHandler(BaseHTTPRequestHandler):
+    """Local stand-in for oauth2.googleapis.com/token"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        if self.server.fail:
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        body = json.dumps({
+            'access_token': f'token-{self.server.requests}',
+            'expires_in': self.server.expires_in,
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TokenCacheTests(SimpleTestCase):
+    gdrive_config = {'client_id': 'client', 'client_secret': 'secret', 'refresh_token': 'refresh'}
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTokenHandler)
+        self.server.requests = 0
+        self.server.delay = 0
+        self.server.fail = False
+        self.server.expires_in = 3600
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        token_url = f'http://127.0.0.1:{self.server.server_address[1]}/token'
+        self.cache = TokenCache(token_url=token_url, expiry_margin=60)
+
+    def test_reuses_token_until_expiry(self):
+        self.assertEqual(self.cache.get_access_token(self.gdrive_config), 'token-1')
+        self.assertEqual(self.cache.get_access_token(self.gdrive_config), 'token-1')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_refreshes_token_inside_expiry_margin(self):
+        self.server.expires_in = 30  # already inside the 60s margin
+        self.cache.get_access_token(self.gdrive_config)
+        self.assertEqual(self.cache.get_access_token(self.gdrive_config), 'token-2')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_concurrent_requests_share_one_refresh(self):
+        self.server.delay = 0.2
+        tokens = []
+        threads = [
+            threading.Thread(target=lambda: tokens.append(self.cache.get_access_token(self.gdrive_config)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(set(tokens), {'token-1'})
+
+    def test_invalidate_forces_refresh(self):
+        self.cache.get_access_token(self.gdrive_config)
+        self.cache.invalidate(self.gdrive_config)
+        self.assertEqual(self.cache.get_access_token(self.gdrive_config), 'token-2')
+
+    def test_failed_refresh_raises(self):
+        self.server.fail = True
+        with self.assertRaises(TokenRefreshError):
+            self.cache.get_access_token(self.gdrive_config)
+
+
+class StartupImportTests(SimpleTestCase):
+
+    def test_urlconf_does_not_import_tensorflow(self):
+        # A fresh interpreter, since this test process may already have loaded it
+        code = (
+            'import sys, django; django.setup();'
+            'from django.urls import get_resolver; get_resolver().url_patterns;'
+            'print("tensorflow" in sys.modules)'
+        )
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip().splitlines()[-1], 'False')
+
+
+class PreprocessingTests(SimpleTestCase):
+
+    def upload(self, image, format='PNG'):
+        buffer = io.BytesIO()
+        image.save(buffer, format)
+        buffer.seek(0)
+        return buffer
+
+    def test_color_modes_become_rgb(self):
+        batch = prediction.load_image_batch([
+            self.upload(Image.new('L', (300, 200), 100)),
+            self.upload(Image.new('RGBA', (50, 50), (255, 0, 0, 0))),
+            self.upload(Image.new('P', (64, 64))),
+            self.upload(Image.new('RGB', (2000, 1500), (10, 20, 30)), 'JPEG'),
+        ])
+        self.assertEqual(batch.shape, (4, 128, 128, 3))
+        self.assertEqual(batch.dtype, np.float32)
+        np.testing.assert_array_equal(batch[0, 0, 0], [100, 100, 100])
+        np.testing.assert_array_equal(batch[1, 0, 0], [0, 0, 0])  # transparent areas are black
+        np.testing.assert_allclose(batch[3, 64, 64], [10, 20, 30], atol=2)
+
+    def test_rgb_images_match_the_training_preprocessing(self):
+        rng = np.random.default_rng(0)
+        for size, format in [((2048, 1536), 'JPEG'), ((512, 512), 'JPEG'), ((300, 200), 'PNG'), ((64, 64), 'PNG')]:
+            with self.subTest(size=size, format=format):
+                image = Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+                data = self.upload(image, format).getvalue()
+                # The preprocessing the deployed models were trained with
+                expected = np.asarray(Image.open(io.BytesIO(data)).resize((128, 128)), dtype=np.float32)
+                np.testing.assert_array_equal(prediction.load_image_array(io.BytesIO(data)), expected)
+
+    def test_16_bit_images_use_full_range(self):
+        pixels = np.linspace(1000, 3000, 128 * 128).astype(np.uint16).reshape(128, 128)
+        image_arr = prediction.load_image_array(self.upload(Image.fromarray(pixels)))
+        self.assertEqual(image_arr.shape, (128, 128, 3))
+        self.assertEqual((image_arr.min(), image_arr.max()), (0, 255))
+
+
+class FakeBatchModel:
+    """Stands in for a Keras model, recording the batches it is given"""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        # Cleared to hold predict_on_batch until the test sets it
+        self.running = threading.Event()
+        self.running.set()
+
+    def predict_on_batch(self, inputs):
+        self.batches.append(len(inputs))
+        self.running.wait(5)
+        if self.error:
+            raise self.error
+        return inputs * 2
+
+
+class MicroBatcherTests(SimpleTestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(8)
+        self.addCleanup(self.executor.shutdown)
+
+    def predict(self, batcher, key, model, value):
+        return self.executor.submit(batcher.predict, key, model, np.full(2, value, dtype=np.float32))
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+
+    def busy_model(self, batcher, key, model):
+        """Start a batch of `model` that runs until model.running is set"""
+        model.running.clear()
+        future = self.predict(batcher, key, model, 0)
+        self.wait_for(lambda: model.batches)
+        return future
+
+    def test_a_lone_request_runs_at_once(self):
+        batcher = MicroBatcher(max_batch_size=32)
+        model = FakeBatchModel()
+        np.testing.assert_array_equal(batcher.predict('m', model, np.ones(2, dtype=np.float32)), [2, 2])
+        self.assertEqual(model.batches, [1])
+
+    def test_requests_arriving_during_a_batch_share_the_next_one(self):
+        batcher = MicroBatcher(max_batch_size=32)
+        model = FakeBatchModel()
+        first = self.busy_model(batcher, 'm', model)
+        futures = [self.predict(batcher, 'm', model, value) for value in range(1, 4)]
+        self.wait_for(lambda: len(batcher._open.get('m', _Batch()).inputs) == 3)
+
+        model.running.set()
+        self.assertEqual(first.result()[0], 0)
+        for value, future in enumerate(futures, start=1):
+            np.testing.assert_array_equal(future.result(), [value * 2, value * 2])
+        self.assertEqual(model.batches, [1, 3])
+
+    def test_full_batches_are_closed(self):
+        batcher = MicroBatcher(max_batch_size=2)
+        model = FakeBatchModel()
+        self.busy_model(batcher, 'm', model)
+        futures = [self.predict(batcher, 'm', model, value) for value in range(1, 4)]
+        self.wait_for(lambda: len(batcher._open.get('m', _Batch()).inputs) == 1)
+
+        model.running.set()
+        self.assertEqual(sorted(float(future.result()[0]) for future in futures), [2, 4, 6])
+        self.assertEqual(sorted(model.batches[1:]), [1, 2])
+
+    def test_models_are_batched_separately(self):
+        batcher = MicroBatcher(max_batch_size=32)
+        busy, idle = FakeBatchModel(), FakeBatchModel()
+        self.busy_model(batcher, 'a', busy)
+        # Another model does not wait for the busy one
+        self.assertEqual(self.predict(batcher, 'b', idle, 1).result(timeout=1)[0], 2)
+        busy.running.set()
+
+    def test_errors_reach_every_caller(self):
+        batcher = MicroBatcher(max_batch_size=32)
+        model = FakeBatchModel(error=RuntimeError('out of memory'))
+        first = self.busy_model(batcher, 'm', model)
+        futures = [self.predict(batcher, 'm', model, value) for value in range(1, 3)]
+        self.wait_for(lambda: len(batcher._open.get('m', _Batch()).inputs) == 2)
+
+        model.running.set()
+        for future in [first] + futures:
+            with self.assertRaisesMessage(RuntimeError, 'out of memory'):
+                future.result()
+        self.assertEqual(model.batches, [1, 2])
+
+        # A failed batch does not block the next one
+        model.error = None
+        np.testing.assert_array_equal(batcher.predict('m', model, np.ones(2, dtype=np.float32)), [2, 2])
+
+
+try:
+    import pydicom
+except ImportError:
+    pydicom = None
+
+
+@unittest.skipUnless(pydicom, 'pydicom is not installed')
+class SeriesTests(SimpleTestCase):
+
+    def dicom(self, pixels, study='1.2.3', instance=None, **tags):
+        from pydicom.dataset import Dataset, FileMetaDataset
+        from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+
+        ds = Dataset()
+        ds.file_meta = FileMetaDataset()
+        ds.file_meta.MediaStorageSOPClassUID = MRImageStorage
+        ds.file_meta.MediaStorageSOPInstanceUID = generate_uid()
+        ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+        ds.SOPClassUID = MRImageStorage
+        ds.SOPInstanceUID = ds.file_meta.MediaStorageSOPInstanceUID
+        ds.StudyInstanceUID = study
+        ds.SeriesInstanceUID = study + '.1'
+        if instance is not None:
+            ds.InstanceNumber = instance
+        ds.Rows, ds.Columns = pixels.shape[-2:]
+        if pixels.ndim == 3:
+            ds.NumberOfFrames = len(pixels)
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = 'MONOCHROME2'
+        ds.BitsAllocated = ds.BitsStored = 16
+        ds.HighBit = 15
+        ds.PixelRepresentation = 0
+        for name, value in tags.items():
+            setattr(ds, name, value)
+        ds.PixelData = pixels.astype(np.uint16).tobytes()
+        buffer = io.BytesIO()
+        ds.save_as(buffer, enforce_file_format=True)
+        return buffer.getvalue()
+
+    def test_window_maps_to_8_bit(self):
+        pixels = np.array([[0, 100], [200, 400]])
+        ds = pydicom.Dataset()
+        ds.WindowCenter, ds.WindowWidth = 200, 200
+        np.testing.assert_array_equal(series.window(pixels, ds), [[0, 0], [127, 255]])
+        ds.PhotometricInterpretation = 'MONOCHROME1'
+        np.testing.assert_array_equal(series.window(pixels, ds), [[255, 255], [127, 0]])
+
+    def test_zipped_series_is_ordered_by_instance(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for instance in (3, 1, 2):
+                pixels = np.full((32, 32), instance * 1000)
+                zf.writestr(
+                    f'IM{instance}.dcm',
+                    self.dicom(pixels, instance=instance, WindowCenter=1500, WindowWidth=3000)
+                )
+            zf.writestr('__MACOSX/._IM1.dcm', b'junk')
+        upload = SimpleUploadedFile('series.zip', archive.getvalue())
+
+        with series.read_slices([upload]) as slices:
+            self.assertEqual([s.instance_number for s in slices], [1, 2, 3])
+            batch = prediction.load_slice_batch(slices)
+        self.assertEqual(batch.shape, (3, 128, 128, 3))
+        np.testing.assert_array_equal(batch[:, 64, 64, 0], [85, 170, 255])
+
+    def test_files_are_grouped_by_study(self):
+        png = io.BytesIO()
+        Image.new('L', (8, 8)).save(png, 'PNG')
+        uploads = [
+            SimpleUploadedFile('a.dcm', self.dicom(np.zeros((8, 8)), study='2.1')),
+            SimpleUploadedFile('b.dcm', self.dicom(np.zeros((8, 8)), study='1.1')),
+            SimpleUploadedFile('c.png', png.getvalue()),
+        ]
+        with series.read_slices(uploads) as slices:
+            self.assertEqual([s.study_uid for s in slices], ['1.1', '2.1', 'c.png'])
+
+    def test_multi_frame_files_are_decoded_once(self):
+        frames = np.stack([np.full((8, 8), value) for value in (1000, 2000, 3000)])
+        upload = SimpleUploadedFile('cine.dcm', self.dicom(frames, WindowCenter=1500, WindowWidth=3000))
+
+        with mock.patch('pydicom.dcmread', wraps=pydicom.dcmread) as dcmread:
+            with series.read_slices([upload]) as slices:
+                self.assertEqual([s.frame for s in slices], [0, 1, 2])
+                batch = prediction.load_slice_batch(slices)
+        np.testing.assert_array_equal(batch[:, 0, 0, 0], [85, 170, 255])
+        self.assertEqual(dcmread.call_count, 2)  # the header, then the pixels once
+
+    @override_settings(PREDICT_SERIES_MAX_SLICES=1)
+    def test_limits_and_unreadable_files(self):
+        too_many = [SimpleUploadedFile(f'{i}.dcm', self.dicom(np.zeros((8, 8)))) for i in range(2)]
+        with self.assertRaisesMessage(series.SeriesError, 'Too many slices'):
+            with series.read_slices(too_many):
+                pass
+        with self.assertRaisesMessage(series.SeriesError, 'not a DICOM file'):
+            with series.read_slices([SimpleUploadedFile('notes.txt', b'hello')]) as slices:
+                slices[0].read()
+
+
+class StudyAggregationTests(SimpleTestCase):
+
+    def test_tumor_in_some_slices_decides_the_study(self):
+        study = prediction.format_study([
+            [0.1, 0.1, 0.7, 0.1],
+            [0.6, 0.1, 0.2, 0.1],
+            [0.1, 0.1, 0.7, 0.1],
+        ])
+        self.assertEqual(study['prediction'], 'glioma')
+        self.assertEqual(study['slice_counts'], {'glioma': 1, 'meningioma': 0, 'no tumor': 2, 'pituitary': 0})
+        self.assertAlmostEqual(study['confidence_scores']['no tumor'], 1.6 / 3)
+
+    def test_no_tumor_in_any_slice(self):
+        self.assertEqual(prediction.format_study([[0, 0, 1, 0]])['prediction'], 'no tumor')
+
+
+class InferenceServiceTests(SimpleTestCase):
+    """The service protocol, with requests handled by threads instead of worker processes"""
+
+    def start_server(self, handler, max_queue=4, handshake_timeout=5):
+        address = os.path.join(tempfile.mkdtemp(), 'inference.sock')
+        server = InferenceServer(
+            address, b'secret', workers=2, max_queue=max_queue,
+            handler=handler, executor=ThreadPoolExecutor(max_workers=2), handshake_timeout=handshake_timeout
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.shutdown)
+        while not os.path.exists(address):
+            time.sleep(0.01)
+        return address
+
+    def service_client(self, address, timeout=5, max_pending=4):
+        return InferenceClient(address, b'secret', timeout=timeout, max_pending=max_pending)
+
+    def test_predicts_over_socket(self):
+        address = self.start_server(lambda request: {'scores': request['images'].sum(axis=(1, 2, 3))})
+        scores = self.service_client(address).predict(1, np.ones((2, 4, 4, 3), dtype=np.float32))
+        np.testing.assert_array_equal(scores, [48, 48])
+        self.assertEqual(os.stat(address).st_mode & 0o777, 0o660)
+
+    @override_settings(INFERENCE_SERVICE_AUTHKEY='')
+    def test_tcp_requires_an_explicit_authkey(self):
+        with self.assertRaises(ImproperlyConfigured):
+            service_authkey('0.0.0.0:7000')
+        self.assertTrue(service_authkey('/run/inference.sock'))
+        with override_settings(INFERENCE_SERVICE_AUTHKEY='secret'):
+            self.assertEqual(service_authkey('127.0.0.1:7000'), b'secret')
+
+    def test_build_errors_are_reported(self):
+        address = self.start_server(lambda request: {'error': 'build', 'message': 'no weights'})
+        with self.assertRaisesMessage(ModelBuildError, 'no weights'):
+            self.service_client(address).predict(1, np.zeros((1, 4, 4, 3)))
+
+    def test_timeouts_and_full_queue_fail_fast(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        address = self.start_server(lambda request: release.wait() and {'scores': [1]}, max_queue=2)
+
+        slow = threading.Thread(target=lambda: self.service_client(address).predict(1, np.zeros(1)))
+        slow.start()
+        time.sleep(0.1)
+        # Takes the second queue slot and gives up waiting for it
+        with self.assertRaisesMessage(InferenceUnavailable, 'timed out'):
+            self.service_client(address, timeout=0.2).predict(1, np.zeros(1))
+        with self.assertRaisesMessage(InferenceUnavailable, 'busy'):
+            self.service_client(address).predict(1, np.zeros(1))
+
+        release.set()
+        slow.join()
+
+    def raw_connection(self, address):
+        sock = socket.socket(socket.AF_UNIX)
+        sock.connect(address)
+        self.addCleanup(sock.close)
+        return sock
+
+    def test_failed_accepts_do_not_stop_the_service(self):
+        accept = Listener.accept
+        failures = [ConnectionResetError('Connection reset by peer')]
+
+        def flaky_accept(listener):
+            if failures:
+                raise failures.pop()
+            return accept(listener)
+
+        with mock.patch.object(Listener, 'accept', flaky_accept):
+            address = self.start_server(lambda request: {'scores': [1]})
+            # Clients that hang up during the handshake or send garbage are dropped
+            self.raw_connection(address).close()
+            self.raw_connection(address).sendall(b'\0\0\0\4junk')
+            self.assertEqual(self.service_client(address).predict(1, np.zeros(1)), [1])
+            self.assertEqual(failures, [])
+
+    def test_slow_handshakes_do_not_block_other_clients(self):
+        address = self.start_server(lambda request: {'scores': [1]}, handshake_timeout=0.5)
+        silent = self.raw_connection(address)
+
+        start = time.monotonic()
+        self.assertEqual(self.service_client(address, timeout=0.4).predict(1, np.zeros(1)), [1])
+        self.assertLess(time.monotonic() - start, 0.4)
+
+        # The silent client is disconnected once the handshake times out
+        silent.settimeout(5)
+        while silent.recv(1024):
+            pass
+
+    @override_settings(MODEL_CACHE_MAX_BYTES=512 * 2**20, INFERENCE_SERVICE_MODEL_MEMORY=2 * 2**30)
+    def test_workers_are_capped_by_model_memory(self):
+        check_worker_memory(4)
+        with self.assertRaisesMessage(ImproperlyConfigured, 'INFERENCE_SERVICE_MODEL_MEMORY'):
+            check_worker_memory(5)
+
+    def test_unreachable_service(self):
+        with self.assertRaisesMessage(InferenceUnavailable, 'not reachable'):
+            self.service_client(os.path.join(tempfile.mkdtemp(), 'missing.sock')).predict(1, np.zeros(1))
+
+
+class UnmanagedTablesTestCase(TestCase):
+    """
+    TestCase creating the tables of the unmanaged models it uses.
+
+    The schema lives in DB.txt, so the test database has none of these
+    tables. They are created before the class transaction starts and dropped
+    after it ends.
+    """
+    unmanaged_models = [
+        Roles, Users, Models, Contributions, Comments, FAQ, Notifications, NotificationToUser, NotificationAudience,
+        PointsLedger
+    ]
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            for model in cls.unmanaged_models:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(cls.unmanaged_models):
+                editor.delete_model(model)
+
+
+class ListQueryCountTests(UnmanagedTablesTestCase):
+    """List endpoints must run the same number of queries for 1 row as for many"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for role_id, role_name in enumerate(['Visitor', 'Member', 'Researcher', 'Admin'], start=1):
+            Roles.objects.create(role_id=role_id, role_name=role_name)
+        cls.admin = Users.objects.create(username='admin', email='admin@example.com', password_hash='x', role_id=4)
+        cls.model = Models.objects.create(model_name='cnn', model_description='', version=1, weights={}, metrics={})
+
+    def setUp(self):
+        clear_role_cache()
+
+    def add_rows(self, count):
+        """Add `count` rows to every listed table, each with its own related rows"""
+        for _ in range(count):
+            n = Users.objects.count()
+            researcher = Users.objects.create(
+                username=f'researcher{n}', email=f'researcher{n}@example.com', password_hash='x', role_id=3
+            )
+            model = Models.objects.create(model_name=f'cnn{n}', model_description='', version=n, weights={}, metrics={})
+            Contributions.objects.create(researcher=researcher, model=model, weights={})
+            Contributions.objects.create(researcher=self.admin, model=model, weights={})
+            Comments.objects.create(user=researcher, model=self.model, comment_text='hi', is_approved=True)
+            FAQ.objects.create(question='q', answer='a', created_by=researcher)
+            notification = Notifications.objects.create(message='hello')
+            NotificationToUser.objects.create(notification=notification, user=self.admin)
+            notifications.broadcast('news', ['Admin'])
+
+    def assertConstantQueries(self, url):
+        self.add_rows(1)
+        clear_role_cache()
+        with CaptureQueriesContext(connection) as one_row:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.add_rows(5)
+        clear_role_cache()
+        with CaptureQueriesContext(connection) as many_rows:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.json()['results']), 1)
+        self.assertEqual(len(one_row), len(many_rows), [q['sql'] for q in many_rows])
+
+    def test_models(self):
+        self.assertConstantQueries(f"{reverse('manage_models')}?user_id={self.admin.user_id}")
+
+    def test_contributions(self):
+        self.assertConstantQueries(f"{reverse('get_contributions')}?researcher_id={self.admin.user_id}")
+
+    def test_review_contributions(self):
+        self.assertConstantQueries(f"{reverse('review_contributions')}?admin_id={self.admin.user_id}&status=all")
+
+    def test_users(self):
+        self.assertConstantQueries(f"{reverse('get_users')}?admin_id={self.admin.user_id}")
+
+    def test_faq(self):
+        self.assertConstantQueries(reverse('get_faq'))
+
+    def test_model_comments(self):
+        self.assertConstantQueries(f"{reverse('get_model_comments', args=[self.model.model_id])}?user_id={self.admin.user_id}")
+
+    def test_notifications(self):
+        self.assertConstantQueries(f"{reverse('get_notifications')}?user_id={self.admin.user_id}")
+
+
+class KeysetPaginationTests(UnmanagedTablesTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Roles.objects.create(role_id=2, role_name='Member')
+        cls.member = Users.objects.create(username='m', email='m@example.com', password_hash='x', role_id=2)
+        for n in range(3):
+            FAQ.objects.create(question=f'q{n}', answer='a', created_by=cls.member)
+
+    def setUp(self):
+        clear_role_cache()
+
+    def test_pages_follow_the_cursor(self):
+        first = self.client.get(reverse('get_faq'), {'limit': 2}).json()
+        self.assertEqual([faq['question'] for faq in first['results']], ['q0', 'q1'])
+        second = self.client.get(reverse('get_faq'), {'limit': 2, 'cursor': first['next_cursor']}).json()
+        self.assertEqual([faq['question'] for faq in second['results']], ['q2'])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_cursor_values_of_the_wrong_type_are_rejected(self):
+        for values in (['x'], [None], [[1]], [{'a': 1}]):
+            with self.subTest(values=values):
+                response = self.client.get(reverse('get_faq'), {'cursor': encode_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+
+    def test_notification_cursor_with_an_invalid_date_is_rejected(self):
+        response = self.client.get(reverse('get_notifications'), {
+            'user_id': self.member.user_id, 'cursor': encode_cursor(['yesterday', 1])
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['message'], 'Invalid cursor')
+
+    def test_garbage_cursors_are_rejected(self):
+        for cursor in ('!!!', encode_cursor([1, 2])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(reverse('get_faq'), {'cursor': cursor}).status_code, 400)
+
+
+class NotificationDeliveryTests(UnmanagedTablesTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for role_id, role_name in enumerate(['Visitor', 'Member', 'Researcher', 'Admin'], start=1):
+            Roles.objects.create(role_id=role_id, role_name=role_name)
+        cls.member = Users.objects.create(username='member', email='member@example.com', password_hash='x', role_id=2)
+        cls.visitor = Users.objects.create(username='visitor', email='visitor@example.com', password_hash='x', role_id=1)
+
+    def setUp(self):
+        clear_role_cache()
+
+    def feed(self, user):
+        response = self.client.get(reverse('get_notifications'), {'user_id': user.user_id})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_broadcast_is_not_materialized(self):
+        notifications.broadcast('v2 published', ['Member', 'Researcher'])
+        self.assertFalse(NotificationToUser.objects.exists())
+
+        feed = self.feed(self.member)
+        self.assertEqual([n['message'] for n in feed['results']], ['v2 published'])
+        self.assertEqual(feed['unread_count'], 1)
+        self.assertEqual(notifications.unread_count(self.visitor), 0)
+
+    def test_broadcast_read_state_is_recorded_lazily(self):
+        notification = notifications.broadcast('v2 published', ['Member'])
+        notifications.notify_users('approved', [self.member.user_id])
+
+        response = self.client.put(
+            reverse('mark_notification_read', args=[notification.notification_id]),
+            {'user_id': self.member.user_id},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        feed = self.feed(self.member)
+        self.assertEqual({n['message']: n['is_read'] for n in feed['results']}, {'v2 published': True, 'approved': False})
+        self.assertEqual(feed['unread_count'], 1)
+
+        notifications.mark_all_read(self.member)
+        self.assertEqual(notifications.unread_count(self.member), 0)
+        self.assertFalse(notifications.mark_read(self.visitor, notification.notification_id))
+
+
+class AggregationBookkeepingTests(UnmanagedTablesTestCase):
+    unmanaged_models = UnmanagedTablesTestCase.unmanaged_models + [ContributionToModel, Ratings, ModelStats]
+
+    @classmethod
+    def setUpTestData(cls):
+        Roles.objects.create(role_id=3, role_name='Researcher')
+        Roles.objects.create(role_id=4, role_name='Admin')
+        cls.admin = Users.objects.create(username='admin', email='admin@example.com', password_hash='x', role_id=4)
+
+    def setUp(self):
+        clear_role_cache()
+
+    def round_of(self, count):
+        """A researcher and a model with `count` pending contributions"""
+        n = Users.objects.count()
+        researcher = Users.objects.create(
+            username=f'researcher{n}', email=f'researcher{n}@example.com', password_hash='x', role_id=3
+        )
+        model = Models.objects.create(model_name='cnn', model_description='', version=1, weights={}, metrics={})
+        contributions = [
+            Contributions.objects.create(researcher=researcher, model=model, weights={}, status='pending')
+            for _ in range(count)
+        ]
+        model_stats.rebuild([model.model_id])
+        exp_model = Models.objects.create(model_name='cnn', model_description='', version=2, weights={}, metrics={})
+        return researcher, model, exp_model, [c.contribution_id for c in contributions]
+
+    def test_round_is_recorded_in_constant_queries(self):
+        small_round = self.round_of(2)
+        with CaptureQueriesContext(connection) as small:
+            _record_aggregation(small_round[2], small_round[3], 10)
+
+        researcher, model, exp_model, contribution_ids = self.round_of(8)
+        with CaptureQueriesContext(connection) as large:
+            _record_aggregation(exp_model, contribution_ids, 10)
+        self.assertEqual(len(small), len(large), [q['sql'] for q in large])
+
+        researcher.refresh_from_db()
+        self.assertEqual(researcher.total_points, 80)
+        self.assertEqual(ContributionToModel.objects.filter(model=exp_model).count(), 8)
+        self.assertFalse(Contributions.objects.filter(contribution_id__in=contribution_ids).exclude(status='aggregated').exists())
+        self.assertEqual(ModelStats.objects.get(model=model).contributions_aggregated, 8)
+        self.assertEqual(NotificationToUser.objects.filter(user=researcher).count(), 1)
+
+    def test_aggregated_contributions_are_not_rewarded_twice(self):
+        researcher, _, exp_model, contribution_ids = self.round_of(3)
+        _record_aggregation(exp_model, contribution_ids, 10)
+        _record_aggregation(exp_model, contribution_ids[:1], 10)
+        researcher.refresh_from_db()
+        self.assertEqual(researcher.total_points, 30)
+
+    def set_status(self, contribution_id, new_status, points_earned=10):
+        return self.client.put(
+            reverse('update_contribution_status', args=[contribution_id]),
+            {'admin_id': self.admin.user_id, 'status': new_status, 'points_earned': points_earned},
+            content_type='application/json'
+        )
+
+    def test_contributions_are_rewarded_once_when_approved_again(self):
+        researcher, _, exp_model, (contribution_id,) = self.round_of(1)
+        self.assertEqual(self.set_status(contribution_id, 'approved').status_code, 200)
+        self.assertEqual(self.set_status(contribution_id, 'approved', points_earned=50).status_code, 200)
+        self.assertEqual(self.set_status(contribution_id, 'aggregated').status_code, 200)
+
+        researcher.refresh_from_db()
+        self.assertEqual(researcher.total_points, 10)
+        self.assertEqual(PointsLedger.objects.filter(contribution_id=contribution_id).count(), 1)
+        self.assertEqual(NotificationToUser.objects.filter(user=researcher).count(), 1)
+        self.assertEqual(Contributions.objects.get(contribution_id=contribution_id).points_earned, 10)
+
+    def test_repeated_status_changes_keep_stats_consistent(self):
+        _, model, _, contribution_ids = self.round_of(2)
+        for contribution_id, new_status in [
+            (contribution_ids[0], 'rejected'), (contribution_ids[0], 'rejected'),
+            (contribution_ids[1], 'approved'), (contribution_ids[1], 'approved'), (contribution_ids[1], 'aggregated'),
+        ]:
+            self.assertEqual(self.set_status(contribution_id, new_status).status_code, 200)
+
+        stats = ModelStats.objects.get(model=model)
+        counters = {field: getattr(stats, field) for field in (
+            'contributions_pending', 'contributions_approved', 'contributions_rejected', 'contributions_aggregated'
+        )}
+        self.assertEqual(counters, {
+            'contributions_pending': 0, 'contributions_approved': 0,
+            'contributions_rejected': 1, 'contributions_aggregated': 1,
+        })
+        model_stats.rebuild([model.model_id])
+        stats.refresh_from_db()
+        self.assertEqual(counters, {field: getattr(stats, field) for field in counters})
+
+    def test_reconcile_recomputes_totals_from_ledger(self):
+        researcher, _, exp_model, contribution_ids = self.round_of(2)
+        _record_aggregation(exp_model, contribution_ids, 10)
+        points.award([(researcher.user_id, None, 5)], reason='bonus')
+        Users.objects.filter(user_id=researcher.user_id).update(total_points=0)
+
+        self.assertEqual(points.reconcile([researcher.user_id]), 1)
+        researcher.refresh_from_db()
+        self.assertEqual(researcher.total_points, 25)
+        self.assertEqual(PointsLedger.objects.filter(user=researcher).count(), 3)
+
+
+class ModelStatsTests(UnmanagedTablesTestCase):
+    unmanaged_models = UnmanagedTablesTestCase.unmanaged_models + [Ratings, ModelStats, ContributionToModel]
+
+    @classmethod
+    def setUpTestData(cls):
+        Roles.objects.create(role_id=4, role_name='Admin')
+        cls.admin = Users.objects.create(username='admin', email='admin@example.com', password_hash='x', role_id=4)
+        cls.model = Models.objects.create(model_name='cnn', model_description='', version=1, weights={}, metrics={})
+
+    def setUp(self):
+        clear_role_cache()
+
+    def counters(self):
+        stats = ModelStats.objects.get(model=self.model)
+        return {field: getattr(stats, field) for field in ModelStats.COUNTER_FIELDS}
+
+    def test_incremental_updates_match_rebuild(self):
+        rate_url = reverse('rate_model')
+        self.client.post(rate_url, {'user_id': self.admin.user_id, 'user': self.admin.user_id, 'model': self.model.model_id, 'rating': 4})
+        self.client.post(rate_url, {'user_id': self.admin.user_id, 'user': self.admin.user_id, 'model': self.model.model_id, 'rating': 2})
+        response = self.client.post(reverse('comment_on_model'), {
+            'user_id': self.admin.user_id, 'user': self.admin.user_id, 'model': self.model.model_id, 'comment_text': 'hi'
+        })
+        self.client.put(
+            reverse('moderate_comment', args=[response.json()['comment_id']]),
+            {'admin_id': self.admin.user_id, 'is_approved': True},
+            content_type='application/json'
+        )
+        contribution = Contributions.objects.create(researcher=self.admin, model=self.model, weights={})
+        model_stats.record_contribution_status(self.model.model_id, None, 'pending')
+        self.client.put(
+            reverse('update_contribution_status', args=[contribution.contribution_id]),
+            {'admin_id': self.admin.user_id, 'status': 'rejected'},
+            content_type='application/json'
+        )
+
+        incremental = self.counters()
+        self.assertEqual(incremental['rating_count'], 1)
+        self.assertEqual(incremental['rating_2'], 1)
+        self.assertEqual(incremental['rating_4'], 0)
+        self.assertEqual(incremental['approved_comment_count'], 1)
+        self.assertEqual(incremental['contributions_rejected'], 1)
+
+        model_stats.rebuild()
+        self.assertEqual(self.counters(), incremental)
+
+    def test_deleting_a_model_deletes_its_stats(self):
+        for view in ('manage_model_detail', 'delete_model'):
+            with self.subTest(view=view):
+                model = Models.objects.create(model_name='cnn', model_description='', version=1, weights={}, metrics={})
+                model_stats.rebuild([model.model_id])
+                response = self.client.delete(
+                    f"{reverse(view, args=[model.model_id])}?admin_id={self.admin.user_id}"
+                )
+                self.assertIn(response.status_code, (200, 204))
+                self.assertFalse(Models.objects.filter(model_id=model.model_id).exists())
+                self.assertFalse(ModelStats.objects.filter(model_id=model.model_id).exists())
+
+    def test_stats_endpoint(self):
+        Ratings.objects.create(user=self.admin, model=self.model, rating=5)
+        model_stats.rebuild([self.model.model_id])
+        response = self.client.get(
+            f"{reverse('get_model_stats', args=[self.model.model_id])}?user_id={self.admin.user_id}"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['average_rating'], 5)
+        self.assertEqual(response.json()['rating_histogram']['5'], 1)
+
+
+class AnalyticsTests(UnmanagedTablesTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for role_id, role_name in enumerate(['Visitor', 'Member', 'Researcher', 'Admin'], start=1):
+            Roles.objects.create(role_id=role_id, role_name=role_name)
+        cls.admin = Users.objects.create(username='admin', email='admin@example.com', password_hash='x', role_id=4)
+        researcher = Users.objects.create(
+            username='researcher', email='researcher@example.com', password_hash='x', role_id=3, total_points=30
+        )
+        model = Models.objects.create(model_name='cnn', model_description='', version=1, weights={}, metrics={})
+        for contribution_status in ['pending', 'approved', 'aggregated', 'rejected']:
+            Contributions.objects.create(researcher=researcher, model=model, weights={}, status=contribution_status)
+
+    def setUp(self):
+        clear_role_cache()
+        cache.clear()
+
+    def get(self, name, **params):
+        response = self.client.get(reverse(name), {'admin_id': self.admin.user_id, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_overview(self):
+        overview = self.get('analytics_overview')
+        self.assertEqual(overview['users']['Researcher'], 1)
+        self.assertEqual(overview['contributions']['total'], 4)
+        self.assertEqual(overview['contributions']['approval_rate'], round(2 / 3, 4))
+
+    def test_contribution_trend_is_bucketed_and_cached(self):
+        trend = self.get('analytics_contributions', bucket='day')
+        self.assertEqual(len(trend), 1)
+        self.assertEqual(trend[0]['total'], 4)
+        with self.assertNumQueries(1):  # only the admin's role lookup
+            clear_role_cache()
+            self.assertEqual(self.get('analytics_contributions', bucket='day'), trend)
+
+    def test_invalid_since_dates_are_rejected(self):
+        for since in ('2024-13-01', '2024-02-30', 'yesterday'):
+            with self.subTest(since=since):
+                response = self.client.get(reverse('analytics_contributions'), {
+                    'admin_id': self.admin.user_id, 'since': since
+                })
+                self.assertEqual(response.status_code, 400)
+
+    def test_top_researchers(self):
+        self.assertEqual(
+            [user['username'] for user in self.get('analytics_top_researchers', limit=3)],
+            ['researcher']
+        )
+
+
+class ModelCacheTests(UnmanagedTablesTestCase):
+    """predict_image with a small Keras model built through the model cache"""
+
+    ARCHITECTURE = json.dumps({'config': {'layers': [
+        {'class_name': 'InputLayer', 'config': {'batch_shape': [None, 128, 128, 3]}},
+        {'class_name': 'GlobalAveragePooling2D', 'config': {}},
+        {'class_name': 'Dense', 'config': {'units': 4, 'activation': 'softmax'}},
+    ]}})
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.model = Models.objects.create(
+            model_name='cnn', model_description='', version=1, metrics={}, weights=cls.weights(2)
+        )
+
+    @classmethod
+    def weights(cls, label):
+        # The bias alone decides the prediction
+        return {'architecture': cls.ARCHITECTURE, 'weights': [[[0.0] * 4] * 3, [5.0 if i == label else 0.0 for i in range(4)]]}
+
+    def setUp(self):
+        model_cache.clear()
+        self.addCleanup(model_cache.clear)
+
+    def predict(self, value):
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 32), (value, value, value)).save(buffer, 'PNG')
+        response = self.client.post(reverse('predict_image'), {
+            'model_id': self.model.model_id, 'image': SimpleUploadedFile('scan.png', buffer.getvalue())
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()['prediction']
+
+    def test_changed_weights_are_rebuilt_without_invalidation(self):
+        self.assertEqual(self.predict(1), 'no tumor')
+        self.assertEqual(self.predict(2), 'no tumor')
+        self.assertEqual(len(model_cache._entries), 1)
+
+        # As written by another process, which invalidates only its own cache
+        Models.objects.filter(model_id=self.model.model_id).update(weights=self.weights(0))
+        self.assertEqual(self.predict(3), 'glioma')
+        self.assertEqual(len(model_cache._entries), 1)  # the old weights were dropped
+
+    def test_build_running_during_invalidation_is_not_kept(self):
+        from . import inference
+        build_model = inference.build_model
+
+        def build_and_invalidate(weights):
+            model = build_model(weights)
+            model_cache.invalidate(self.model.model_id)
+            return model
+
+        with mock.patch('api.inference.build_model', build_and_invalidate):
+            self.assertEqual(self.predict(1), 'no tumor')
+        self.assertEqual(len(model_cache._entries), 0)
+
+
+    def test_concurrent_requests_build_a_model_once(self):
+        cache = ModelCache(max_entries=2, max_bytes=10 ** 9)
+        model_obj = SimpleNamespace(model_id=1, weights_key='a', weights={})
+        builds = []
+        store = ModelCache._store
+
+        def build_model(weights):
+            builds.append(weights)
+            time.sleep(0.05)
+            return object(), 10
+
+        def checked_store(cache, key, model, nbytes):
+            # Requests arriving before the model is stored must still wait for this build
+            self.assertIn(key, cache._build_locks)
+            store(cache, key, model, nbytes)
+
+        with mock.patch('api.inference.build_model', build_model), \
+                mock.patch.object(ModelCache, '_store', checked_store), \
+                ThreadPoolExecutor(4) as executor:
+            models = list(executor.map(lambda _: cache.get(model_obj), range(4)))
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(len({id(model) for model in models}), 1)
+        self.assertEqual(cache._build_locks, {})
+
+class PredictionCacheTests(UnmanagedTablesTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Roles.objects.create(role_id=4, role_name='Admin')
+        cls.admin = Users.objects.create(username='admin', email='admin@example.com', password_hash='x', role_id=4)
+        cls.model = Models.objects.create(model_name='cnn', model_description='', version=1, weights={}, metrics={})
+
+    def setUp(self):
+        clear_role_cache()
+        prediction_cache.clear()
+        self.predicted = []
+
+        def predict(model_obj, images, merge=False):
+            self.predicted.append(len(images))
+            return np.tile([0.1, 0.2, 0.6, 0.1], (len(images), 1))
+
+        patcher = mock.patch('api.views._predict', predict)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, name, value):
+        buffer = io.BytesIO()
+        Image.new('L', (16, 16), value).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def predict_batch(self, *values):
+        response = self.client.post(reverse('predict_batch'), {
+            'model_id': self.model.model_id,
+            'images': [self.upload(f'{value}.png', value) for value in values]
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_only_new_images_are_predicted(self):
+        first = self.predict_batch(1, 2)
+        second = self.predict_batch(2, 3, 1)
+        self.assertEqual(self.predicted, [2, 1])
+        self.assertEqual(second[0]['confidence_scores'], first[1]['confidence_scores'])
+        self.assertEqual([result['filename'] for result in second], ['2.png', '3.png', '1.png'])
+
+        response = self.client.post(reverse('predict_image'), {
+            'model_id': self.model.model_id, 'image': self.upload('again.png', 3)
+        })
+        self.assertEqual(response.json()['prediction'], 'no tumor')
+        self.assertEqual(self.predicted, [2, 1])
+
+        stats = self.client.get(reverse('prediction_cache_stats'), {'admin_id': self.admin.user_id}).json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (3, 3, 3))
+
+    def test_model_update_invalidates_results(self):
+        self.predict_batch(1)
+        response = self.client.put(
+            reverse('manage_model_detail', args=[self.model.model_id]),
+            {'admin_id': self.admin.user_id, 'weights': {'weights_url': 'https://example.com/new.h5'}},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.predict_batch(1)
+        self.assertEqual(self.predicted, [1, 1])
+
+    def test_weights_changed_by_another_process_are_not_served_stale(self):
+        self.predict_batch(1)
+        Models.objects.filter(model_id=self.model.model_id).update(weights={'weights_url': 'https://example.com/new.h5'})
+        self.predict_batch(1)
+        self.assertEqual(self.predicted, [1, 1])
+
+    def test_entries_expire_and_are_evicted(self):
+        cache = PredictionCache(max_entries=2, ttl=60)
+        model_v1, model_v2 = SimpleNamespace(model_id=1, weights_key='v1'), SimpleNamespace(model_id=1, weights_key='v2')
+        with mock.patch('api.prediction_cache.time.monotonic', return_value=0):
+            cache.set(model_v1, 'a', 'result a')
+            cache.set(model_v1, 'b', 'result b')
+            self.assertIsNone(cache.get(model_v2, 'a'))
+            self.assertEqual(cache.get(model_v1, 'a'), 'result a')
+            cache.set(model_v1, 'c', 'result c')  # evicts b, the least recently used
+            self.assertIsNone(cache.get(model_v1, 'b'))
+        with mock.patch('api.prediction_cache.time.monotonic', return_value=60):
+            self.assertIsNone(cache.get(model_v1, 'c'))
+        self.assertEqual(cache.stats()['entries'], 1)
+
+
+class CachedDownloadTests(SimpleTestCase):
+    ETAG = '"abc"'
+    LAST_MODIFIED = 'Wed, 21 Oct 2015 07:28:00 GMT'
+
+    def setUp(self):
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'0123456789')
+        self.addCleanup(os.remove, path)
+        self.entry = {
+            'path': path, 'size': 10, 'digest': 'abc', 'content_type': None, 'content_disposition': None,
+            'etag': self.ETAG, 'last_modified': self.LAST_MODIFIED,
+        }
+
+    def serve(self, **headers):
+        request = RequestFactory().get('/api/proxy-download/', headers=headers)
+        response = _serve_cached_download(request, self.entry)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_parse_range(self):
+        for header, expected in [
+            ('bytes=0-4', (0, 4)),
+            ('bytes=5-', (5, 9)),
+            ('bytes=-3', (7, 9)),
+            ('bytes=-20', (0, 9)),
+            ('bytes=8-100', (8, 9)),
+            (None, None),
+            ('items=0-4', None),
+            ('bytes=0-1,4-5', None),
+            ('bytes=a-b', None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(_parse_range(header, 10), expected)
+
+    def test_parse_range_rejects_unsatisfiable_ranges(self):
+        for header in ('bytes=10-', 'bytes=5-2'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                _parse_range(header, 10)
+
+    def test_not_modified(self):
+        def not_modified(**headers):
+            request = RequestFactory().get('/', headers=headers)
+            return _not_modified(request, self.ETAG, self.LAST_MODIFIED)
+
+        self.assertFalse(not_modified())
+        self.assertTrue(not_modified(if_none_match='"xyz", W/"abc"'))
+        self.assertTrue(not_modified(if_none_match='*'))
+        self.assertFalse(not_modified(if_none_match='"xyz"'))
+        self.assertTrue(not_modified(if_modified_since=self.LAST_MODIFIED))
+        self.assertFalse(not_modified(if_modified_since='Tue, 20 Oct 2015 07:28:00 GMT'))
+        # If-None-Match takes precedence over If-Modified-Since
+        self.assertFalse(not_modified(if_none_match='"xyz"', if_modified_since=self.LAST_MODIFIED))
+
+    def test_ranges_are_served_partially(self):
+        response, body = self.serve(range='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+    def test_if_range_matching_the_validator_serves_the_range(self):
+        for if_range in (self.ETAG, self.LAST_MODIFIED):
+            with self.subTest(if_range=if_range):
+                response, body = self.serve(range='bytes=2-5', if_range=if_range)
+                self.assertEqual((response.status_code, body), (206, b'2345'))
+
+    def test_if_range_for_a_changed_file_serves_it_whole(self):
+        response, body = self.serve(range='bytes=2-5', if_range='"old"')
+        self.assertEqual((response.status_code, body), (200, b'0123456789'))
+        self.assertNotIn('Content-Range', response)
+
+    def test_unsatisfiable_ranges_get_416(self):
+        response, _ = self.serve(range='bytes=20-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_unchanged_files_get_304(self):
+        response, body = self.serve(if_none_match=self.ETAG)
+        self.assertEqual((response.status_code, body), (304, b''))
+        self.assertEqual(response['ETag'], self.ETAG)
+
+
+class FedAvgTests(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def weights_file(self, name, kernel, bias, layer='dense', steps=0):
+        """A Keras-layout .h5 file with one dense layer and an integer counter"""
+        path = os.path.join(self.dir, f'{name}.h5')
+        with h5py.File(path, 'w') as f:
+            root = f.create_group('model_weights')
+            root.attrs['layer_names'] = [layer.encode(), b'counter']
+            group = root.create_group(layer)
+            group.attrs['weight_names'] = [f'{layer}/kernel:0'.encode(), f'{layer}/bias:0'.encode()]
+            group[f'{layer}/kernel:0'] = np.asarray(kernel, dtype=np.float32)
+            group[f'{layer}/bias:0'] = np.asarray(bias, dtype=np.float32)
+            counter = root.create_group('counter')
+            counter.attrs['weight_names'] = [b'steps:0']
+            counter['steps:0'] = np.int64(steps)
+            f.create_group('optimizer_weights')['iterations:0'] = np.int64(steps)
+        return path
+
+    def test_contributions_are_weighted_by_their_coefficients(self):
+        paths = [
+            self.weights_file('a', [[1, 2]], [0], steps=7),
+            # Separately built models have different auto-generated layer names
+            self.weights_file('b', [[5, 10]], [4], layer='dense_3', steps=9),
+        ]
+        output = aggregation.fedavg(paths, [3, 1], os.path.join(self.dir, 'out.h5'))
+
+        with h5py.File(output) as f:
+            root = f['model_weights']
+            np.testing.assert_allclose(root['dense/dense/kernel:0'][...], [[2, 4]])
+            np.testing.assert_allclose(root['dense/dense/bias:0'][...], [1])
+            self.assertEqual(root['counter/steps:0'][()], 7)  # kept from the first file
+            self.assertNotIn('optimizer_weights', f)
+
+    def test_equal_coefficients_give_the_plain_mean(self):
+        paths = [self.weights_file(name, [[value]], [value]) for name, value in [('a', 1), ('b', 2), ('c', 6)]]
+        output = aggregation.fedavg(paths, [1, 1, 1], os.path.join(self.dir, 'out.h5'))
+        with h5py.File(output) as f:
+            np.testing.assert_allclose(f['model_weights/dense/dense/kernel:0'][...], [[3]])
+
+    def test_invalid_inputs_are_rejected(self):
+        a = self.weights_file('a', [[1, 2]], [0])
+        other_shape = self.weights_file('b', [[1, 2, 3]], [0])
+        output = os.path.join(self.dir, 'out.h5')
+        for paths, coefficients, message in [
+            ([a, a], [1], 'exactly one coefficient'),
+            ([a, a], [0, 0], 'sum to a positive value'),
+            ([a, other_shape], [1, 1], 'Shape mismatch'),
+        ]:
+            with self.subTest(message=message), self.assertRaisesMessage(ValueError, message):
+                aggregation.fedavg(paths, coefficients, output)
+
+    def test_contribution_weights_default_to_one(self):
+        contributions = [SimpleNamespace(contribution_id=1), SimpleNamespace(contribution_id=2)]
+        downloads = {
+            1: {'status': 'done', 'path': self.weights_file('a', [[0]], [0])},
+            2: {'status': 'done', 'path': self.weights_file('b', [[4]], [0])},
+        }
+        with mock.patch('api.aggregation.prefetch_contributions', return_value=downloads):
+            # JSON payloads carry contribution IDs as string keys
+            output = aggregation.aggregate_contributions(contributions, {}, contribution_weights={'1': 3})
+        self.addCleanup(os.remove, output)
+        with h5py.File(output) as f:
+            np.testing.assert_allclose(f['model_weights/dense/dense/kernel:0'][...], [[1]])
+
+    def test_failed_downloads_stop_the_aggregation(self):
+        contributions = [SimpleNamespace(contribution_id=1)]
+        downloads = {1: {'status': 'failed', 'error': 'quota exceeded'}}
+        with mock.patch('api.aggregation.prefetch_contributions', return_value=downloads):
+            with self.assertRaisesMessage(ValueError, 'quota exceeded'):
+                aggregation.aggregate_contributions(contributions, {})
+
+
+class WeightCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        overrider = override_settings(WEIGHT_CACHE_DIR=cache_dir, WEIGHT_CACHE_MAX_BYTES=100)
+        overrider.enable()
+        self.addCleanup(overrider.disable)
+        weight_cache._verified.clear()
+        self.addCleanup(weight_cache._verified.clear)
+
+    def store(self, url, data):
+        return b''.join(weight_cache.store(url, [data[:4], data[4:]], content_type='application/x-hdf5'))
+
+    def test_stored_files_are_found_by_url(self):
+        self.assertIsNone(weight_cache.lookup('https://drive/a'))
+        self.assertEqual(self.store('https://drive/a', b'0123456789'), b'0123456789')
+
+        entry = weight_cache.lookup('https://drive/a')
+        self.assertEqual(entry['size'], 10)
+        self.assertEqual(entry['content_type'], 'application/x-hdf5')
+        with open(entry['path'], 'rb') as f:
+            self.assertEqual(f.read(), b'0123456789')
+
+    def test_corrupted_files_are_discarded(self):
+        self.store('https://drive/a', b'0123456789')
+        path = weight_cache.lookup('https://drive/a')['path']
+        # Same size, different content, found by a process that has not hashed it yet
+        with open(path, 'wb') as f:
+            f.write(b'9876543210')
+        weight_cache._verified.clear()
+
+        self.assertIsNone(weight_cache.lookup('https://drive/a'))
+        self.assertFalse(os.path.exists(path))
+
+    def test_truncated_files_are_discarded(self):
+        self.store('https://drive/a', b'0123456789')
+        path = weight_cache.lookup('https://drive/a')['path']
+        with open(path, 'r+b') as f:
+            f.truncate(5)
+        self.assertIsNone(weight_cache.lookup('https://drive/a'))
+
+    def test_unfinished_downloads_are_not_cached(self):
+        chunks = weight_cache.store('https://drive/a', [b'01234', b'56789'])
+        next(chunks)
+        chunks.close()
+        self.assertIsNone(weight_cache.lookup('https://drive/a'))
+        self.assertEqual(os.listdir(os.path.join(settings.WEIGHT_CACHE_DIR, 'objects')), [])
+
+    def test_least_recently_used_files_are_evicted(self):
+        for mtime, url in [(100, 'https://drive/a'), (200, 'https://drive/b'), (300, 'https://drive/c')]:
+            self.store(url, url.encode()[-1:] * 10)
+            # Distinct times whatever the file system's resolution
+            os.utime(weight_cache.lookup(url)['path'], (mtime, mtime))
+        # Reading a makes it the most recently used, so b is now the oldest
+        weight_cache.lookup('https://drive/a')
+
+        with override_settings(WEIGHT_CACHE_MAX_BYTES=25):
+            weight_cache.evict()
+        self.assertIsNone(weight_cache.lookup('https://drive/b'))
+        self.assertIsNotNone(weight_cache.lookup('https://drive/a'))
+        self.assertIsNotNone(weight_cache.lookup('https://drive/c'))
+
+
+class WeightStoreTests(UnmanagedTablesTestCase):
+    unmanaged_models = UnmanagedTablesTestCase.unmanaged_models + [WeightBlob]
+
+    WEIGHTS = {'architecture': '{}', 'weights': [[[1.5, 2.0], [3.0, 4.0]], [0.25, -1.0]]}
+
+    def setUp(self):
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir, ignore_errors=True)
+        overrider = override_settings(WEIGHT_STORE_DIR=store_dir)
+        overrider.enable()
+        self.addCleanup(overrider.disable)
+
+    def create(self):
+        serializer = ModelDetailSerializer(data={
+            'model_name': 'cnn', 'model_description': 'test', 'version': 1, 'metrics': {}, 'weights': self.WEIGHTS
+        })
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_blob_is_kept_in_the_database(self):
+        model = self.create()
+        self.assertEqual(model.weights['architecture'], '{}')
+        self.assertTrue(WeightBlob.objects.filter(digest=model.weights['digest']).exists())
+
+        # A new instance starts without the local copies
+        shutil.rmtree(settings.WEIGHT_STORE_DIR)
+        arrays = weight_store.load_weights(model.weights)
+        np.testing.assert_array_equal(arrays[0], [[1.5, 2.0], [3.0, 4.0]])
+        np.testing.assert_array_equal(arrays[1], [0.25, -1.0])
+
+        WeightBlob.objects.update(data=b'corrupt')
+        self.assertFalse(weight_store.verify_blob(model.weights))
+
+    def test_failed_save_stores_no_blob(self):
+        with mock.patch('rest_framework.serializers.ModelSerializer.create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.create()
+        self.assertFalse(WeightBlob.objects.exists())
+
+    def test_weights_endpoints_return_nested_lists(self):
+        Roles.objects.create(role_id=4, role_name='Admin')
+        admin = Users.objects.create(username='admin', email='admin@example.com', password_hash='x', role_id=4)
+        clear_role_cache()
+        model = self.create()
+        contribution = Contributions.objects.create(
+            researcher=admin, model=model, weights={**weight_store.to_manifest(self.WEIGHTS), 'weights_url': 'x'}
+        )
+
+        response = self.client.get(reverse('get_model_weights', args=[model.model_id]), {'user_id': admin.user_id})
+        self.assertEqual(response.json()['weights'], self.WEIGHTS)
+        response = self.client.get(
+            reverse('get_contribution_weights', args=[contribution.contribution_id]), {'user_id': admin.user_id}
+        )
+        self.assertEqual(response.json()['weights'], {**self.WEIGHTS, 'weights_url': 'x'})
+
+    def test_migration_verifies_and_backs_up_rows(self):
+        model = Models.objects.create(model_name='cnn', model_description='', version=1, weights=self.WEIGHTS, metrics={})
+        with self.assertRaises(CommandError):
+            call_command('migrate_weights_to_blobs', stdout=io.StringIO())
+
+        backup_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, backup_dir)
+        call_command('migrate_weights_to_blobs', backup_dir=backup_dir, stdout=io.StringIO())
+        model.refresh_from_db()
+        self.assertTrue(weight_store.is_blob_manifest(model.weights))
+        with open(os.path.join(backup_dir, f'models_{model.model_id}.json')) as f:
+            self.assertEqual(json.load(f), self.WEIGHTS)
+
+
+def run_queued_jobs():
+    """Run the job worker until the queue is empty"""
+    # close_old_connections() would close the connection holding the test transaction
+    with mock.patch('api.jobs.close_old_connections'):
+        run_worker(once=True)
+
+
+class PrefetchJobTests(UnmanagedTablesTestCase):
+    unmanaged_models = UnmanagedTablesTestCase.unmanaged_models + [Jobs]
+
+    @classmethod
+    def setUpTestData(cls):
+        Roles.objects.create(role_id=4, role_name='Admin')
+        cls.admin = Users.objects.create(
+            username='admin', email='admin@example.com', password_hash='x', role_id=4,
+            gdrive={'refresh_token': 'token'}
+        )
+        cls.contribution = Contributions.objects.create(researcher=cls.admin, weights={'weights_url': 'https://drive/x'})
+
+    def setUp(self):
+        clear_role_cache()
+
+    def test_downloads_run_in_a_job_with_progress(self):
+        response = self.client.post(
+            reverse('prefetch_contribution_weights'),
+            {'admin_id': self.admin.user_id, 'contribution_ids': [self.contribution.contribution_id]},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['kind'], 'prefetch_contribution_weights')
+
+        def prefetch(contributions, gdrive_config, progress):
+            progress(contributions[0].contribution_id, {'status': 'downloading', 'bytes': 0})
+            item = {'status': 'done', 'bytes': 10, 'path': '/cache/x.h5'}
+            progress(contributions[0].contribution_id, item)
+            return {contributions[0].contribution_id: item}
+
+        with mock.patch('api.tasks.prefetch_contributions', prefetch):
+            run_queued_jobs()
+
+        job = Jobs.objects.get(job_id=response.json()['job_id'])
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.progress['downloads'], {str(self.contribution.contribution_id): {'status': 'done', 'bytes': 10}})
+        self.assertEqual(job.result['results'][0]['bytes'], 10)
+
+
+class StaleJobTests(UnmanagedTablesTestCase):
+    unmanaged_models = UnmanagedTablesTestCase.unmanaged_models + [Jobs]
+
+    @classmethod
+    def setUpTestData(cls):
+        Roles.objects.create(role_id=1, role_name='Researcher')
+        cls.user = Users.objects.create(username='r', email='r@example.com', password_hash='x', role_id=1)
+
+    def setUp(self):
+        clear_role_cache()
+
+    def _running_job(self, seconds_ago, heartbeat=True):
+        seen = timezone.now() - timedelta(seconds=seconds_ago)
+        return Jobs.objects.create(
+            kind='upload_contribution', status='running', created_by=self.user,
+            started_at=seen, heartbeat_at=seen if heartbeat else None
+        )
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_jobs_without_a_recent_heartbeat_are_failed(self):
+        dead = self._running_job(120)
+        dead_without_heartbeat = self._running_job(120, heartbeat=False)
+        alive = self._running_job(10)
+
+        self.assertEqual(reap_stale_jobs(), 2)
+        for job in (dead, dead_without_heartbeat):
+            job.refresh_from_db()
+            self.assertEqual(job.status, 'failed')
+            self.assertIsNotNone(job.finished_at)
+        alive.refresh_from_db()
+        self.assertEqual(alive.status, 'running')
+
+    def spooled_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'weights.h5')
+        with open(path, 'wb') as f:
+            f.write(b'weights')
+        return path
+
+    def test_spooled_uploads_are_removed_when_the_handler_fails(self):
+        path = self.spooled_file()
+        job = Jobs.objects.create(
+            kind='upload_contribution', created_by=self.user,
+            payload={'researcher_id': 999, 'model_id': 1, 'path': path, 'filename': 'weights.h5'}
+        )
+        run_queued_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_spooled_uploads_of_stale_jobs_are_removed(self):
+        path = self.spooled_file()
+        job = self._running_job(120)
+        Jobs.objects.filter(job_id=job.job_id).update(payload={'path': path})
+
+        self.assertEqual(reap_stale_jobs(), 1)
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(JOB_STALE_AFTER=60)
+    def test_get_job_reports_a_dead_worker(self):
+        job = self._running_job(120)
+        response = self.client.get(reverse('get_job', args=[job.job_id]), {'user_id': self.user.user_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'failed')
+
+    def test_get_job_rejects_a_non_numeric_user_id(self):
+        job = self._running_job(0)
+        response = self.client.get(reverse('get_job', args=[job.job_id]), {'user_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(JOB_HEARTBEAT_INTERVAL=0.01)
+    def test_running_jobs_send_heartbeats(self):
+        job = Jobs.objects.create(kind='upload_contribution', created_by=self.user)
+        beats = threading.Semaphore(0)
+
+        def handler(job):
+            # Blocks until the heartbeat thread has beaten twice
+            self.assertTrue(beats.acquire(timeout=5) and beats.acquire(timeout=5))
+            return {}
+
+        with mock.patch.object(_Heartbeat, 'beat', lambda heartbeat: beats.release()), \
+                mock.patch.dict('api.jobs.JOB_HANDLERS', {'upload_contribution': handler}):
+            run_queued_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+
+    def test_heartbeat_refreshes_running_jobs_only(self):
+        running = self._running_job(120)
+        finished = Jobs.objects.create(kind='upload_contribution', status='completed', created_by=self.user)
+        _Heartbeat(running).beat()
+        _Heartbeat(finished).beat()
+        running.refresh_from_db()
+        finished.refresh_from_db()
+        self.assertGreater(running.heartbeat_at, timezone.now() - timedelta(seconds=60))
+        self.assertIsNone(finished.heartbeat_at)
 
-# Create your tests here.
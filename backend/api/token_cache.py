@@ -0,0 +1,122 @@
+# api/token_cache.py
+import datetime
+import hashlib
+import threading
+import time
+
+import requests
+from django.conf import settings
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build
+
+
+class TokenRefreshError(Exception):
+    """Raised when the token endpoint refuses to issue an access token"""
+
+
+def _cache_key(gdrive_config):
+    # Never keep raw refresh tokens as dict keys
+    raw = f"{gdrive_config.get('client_id')}:{gdrive_config.get('refresh_token')}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class TokenCache:
+    """
+    Per-user cache of Google OAuth access tokens and built Drive services.
+
+    Access tokens are reused until `expiry_margin` seconds before they
+    expire. Each user has a refresh lock, so concurrent requests needing a
+    new token wait for a single refresh instead of all hitting the token
+    endpoint. Drive services are built once per user and thread, because
+    the underlying HTTP client is not thread-safe.
+    """
+
+    def __init__(self, token_url, expiry_margin):
+        self.token_url = token_url
+        self.expiry_margin = expiry_margin
+        self._tokens = {}  # key -> (access_token, expires_at)
+        self._refresh_locks = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get_access_token(self, gdrive_config):
+        """Return a valid access token for a user's Google Drive config"""
+        return self._get_entry(gdrive_config)[0]
+
+    def get_service(self, gdrive_config):
+        """Return a Drive v3 service for a user, reusing one built earlier on this thread"""
+        key = _cache_key(gdrive_config)
+        services = getattr(self._local, 'services', None)
+        if services is None:
+            services = self._local.services = {}
+
+        service = services.get(key)
+        if service is None:
+            access_token, expires_at = self._get_entry(gdrive_config)
+            creds = Credentials(
+                token=access_token,
+                refresh_token=gdrive_config['refresh_token'],
+                token_uri=self.token_url,
+                client_id=gdrive_config['client_id'],
+                client_secret=gdrive_config['client_secret'],
+                # google-auth compares expiry against naive UTC datetimes
+                expiry=datetime.datetime.utcnow() + datetime.timedelta(seconds=expires_at - time.monotonic()),
+            )
+            service = services[key] = build('drive', 'v3', credentials=creds, cache_discovery=False)
+        return service
+
+    def invalidate(self, gdrive_config):
+        """Forget a user's access token, e.g. after the API rejected it"""
+        key = _cache_key(gdrive_config)
+        with self._lock:
+            self._tokens.pop(key, None)
+        getattr(self._local, 'services', {}).pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+        self._local = threading.local()
+
+    def _get_entry(self, gdrive_config):
+        key = _cache_key(gdrive_config)
+        entry = self._cached_entry(key)
+        if entry:
+            return entry
+
+        with self._lock:
+            refresh_lock = self._refresh_locks.setdefault(key, threading.Lock())
+        with refresh_lock:
+            # Another thread may have refreshed while we were waiting
+            entry = self._cached_entry(key)
+            if entry:
+                return entry
+            return self._refresh(key, gdrive_config)
+
+    def _cached_entry(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+        if entry and entry[1] - self.expiry_margin > time.monotonic():
+            return entry
+        return None
+
+    def _refresh(self, key, gdrive_config):
+        token_response = requests.post(self.token_url, data={
+            'client_id': gdrive_config['client_id'],
+            'client_secret': gdrive_config['client_secret'],
+            'refresh_token': gdrive_config['refresh_token'],
+            'grant_type': 'refresh_token'
+        }, timeout=30)
+        if not token_response.ok:
+            raise TokenRefreshError(f'Failed to refresh access token: {token_response.status_code}')
+
+        data = token_response.json()
+        entry = (data['access_token'], time.monotonic() + int(data.get('expires_in', 3600)))
+        with self._lock:
+            self._tokens[key] = entry
+        return entry
+
+
+token_cache = TokenCache(
+    token_url=settings.GOOGLE_TOKEN_URL,
+    expiry_margin=settings.GOOGLE_TOKEN_EXPIRY_MARGIN,
+)
@@ -13,6 +13,7 @@ urlpatterns = [
     path('models/', views.manage_models, name='manage_models'),
     path('models/<int:model_id>/', views.manage_model_detail, name='manage_model_detail'),
     path('models/<int:model_id>/weights/', views.get_model_weights, name='get_model_weights'),
+    path('models/<int:model_id>/stats/', views.get_model_stats, name='get_model_stats'),
     path('models/<int:model_id>/delete/', views.delete_model, name='delete_model'),  # Add explicit delete endpoint
     path('rate-model/', views.rate_model, name='rate_model'),
     path('comment-model/', views.comment_on_model, name='comment_on_model'),
@@ -22,15 +23,19 @@ urlpatterns = [
     path('notifications/mark-all-read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
     path('faq/', views.get_faq, name='get_faq'),
     path('predict/', views.predict_image, name='predict_image'),
+    path('predict/batch/', views.predict_batch, name='predict_batch'),
+    path('predict/series/', views.predict_series, name='predict_series'),
     path('users/gdrive-setup/', views.setup_gdrive, name='setup_gdrive'),
     path('users/gdrive-config/', views.get_gdrive_config, name='get_gdrive_config'),
     path('proxy-download/', views.proxy_download, name='proxy_download'),
+    path('jobs/<int:job_id>/', views.get_job, name='get_job'),
     
     # Researcher features
     path('contributions/upload/', views.upload_contribution, name='upload_contribution'),
     path('contributions/', views.get_contributions, name='get_contributions'),
     path('contributions/<int:contribution_id>/delete/', views.delete_contribution, name='delete_contribution'),
     path('contributions/<int:contribution_id>/weights/', views.get_contribution_weights, name='get_contribution_weights'),
+    path('contributions/prefetch/', views.prefetch_contribution_weights, name='prefetch_contribution_weights'),
     path('models/upload-weights/', views.upload_model_weights, name='upload_model_weights'),
 
     # Admin features
@@ -42,4 +47,8 @@ urlpatterns = [
     path('comments/<int:comment_id>/moderate/', views.moderate_comment, name='moderate_comment'),
     path('faq/create/', views.create_faq, name='create_faq'),
     path('users/<int:user_id>/delete/', views.delete_user, name='delete_user'),
+    path('analytics/overview/', views.analytics_overview, name='analytics_overview'),
+    path('analytics/contributions/', views.analytics_contributions, name='analytics_contributions'),
+    path('analytics/top-researchers/', views.analytics_top_researchers, name='analytics_top_researchers'),
+    path('predict/cache/', views.prediction_cache_stats, name='prediction_cache_stats'),
 ]
\ No newline at end of file
@@ -4,25 +4,141 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from .models import *
 from .serializers import *
-from .auth_helpers import authenticate_user, check_permission
-import json
-import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import model_from_json
+from .auth_helpers import authenticate_user, check_permission, has_role, invalidate_user, require_user
+from django.db import transaction
 from django.utils import timezone
-from .gdrive_helper import GoogleDriveHelper
+from django.utils.dateparse import parse_datetime
+from .model_cache import invalidate_model, with_weights_key
+from .prediction_cache import digest_upload, prediction_cache
+from . import weight_cache, weight_store
+from .token_cache import TokenRefreshError, token_cache
+from .jobs import enqueue, reap_stale_jobs, spool_upload
+from .pagination import InvalidCursor, keyset_page, page_limit, paginated_response
+from . import analytics, model_stats, notifications
+from . import points as points_ledger
+from . import inference_service, prediction, series
 import time
 from django.core.files.uploadhandler import TemporaryFileUploadHandler
 from django.conf import settings
-import os
 import requests
-from django.http import StreamingHttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import parse_http_date_safe
 from urllib.parse import unquote
 from .models import Users
 
+# Upstream headers describing the body that are passed through to the client
+PROXY_RESPONSE_HEADERS = ('Content-Length', 'Content-Range', 'Accept-Ranges', 'ETag', 'Last-Modified')
+
+# Client headers forwarded to Google Drive for ranged and conditional requests
+PROXY_REQUEST_HEADERS = ('Range', 'If-Range', 'If-None-Match', 'If-Modified-Since')
+
+
+# Newest first; contribution_id keeps pages stable for equal upload dates
+CONTRIBUTION_ORDERING = ['-upload_date', '-contribution_id']
+
+def _add_download_headers(response, content_disposition=None):
+    """Add CORS and content disposition headers to a proxied download"""
+    response['Access-Control-Allow-Origin'] = '*'
+    response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
+    response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, ' + ', '.join(PROXY_REQUEST_HEADERS)
+    response['Access-Control-Expose-Headers'] = 'Content-Disposition, ' + ', '.join(PROXY_RESPONSE_HEADERS)
+
+    if content_disposition:
+        response['Content-Disposition'] = content_disposition
+    return response
+
+
+def _parse_range(header, size):
+    """
+    Parse a single `bytes=` Range header against a file size.
+
+    Returns (start, end) with an inclusive end, None if the header should be
+    ignored (missing, malformed or several ranges), or raises ValueError if
+    the range cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    try:
+        if start:
+            start, end = int(start), int(end) if end else size - 1
+        else:
+            # Suffix range: the last `end` bytes
+            start, end = max(size - int(end), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+
+def _read_file_range(path, start, length, chunk_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        # Weak comparison, as for GET requests
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag.removeprefix('W/') in tags
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    modified = parse_http_date_safe(last_modified or '')
+    return bool(if_modified_since and modified and modified <= if_modified_since)
+
+
+def _serve_cached_download(request, entry):
+    """Serve a cached file, honouring conditional and single byte-range requests"""
+    size = entry['size']
+    # Prefer the upstream validators so clients can revalidate across cache hits and misses
+    etag = entry.get('etag') or f'"{entry["digest"]}"'
+    last_modified = entry.get('last_modified')
+
+    if _not_modified(request, etag, last_modified):
+        response = HttpResponseNotModified()
+    else:
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range in (etag, last_modified):
+            try:
+                byte_range = _parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return _add_download_headers(response)
+
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(
+            _read_file_range(entry['path'], start, end - start + 1, settings.PROXY_DOWNLOAD_CHUNK_SIZE),
+            status=206 if byte_range else 200,
+            content_type=entry['content_type'] or 'application/octet-stream'
+        )
+        response['Content-Length'] = str(max(end - start + 1, 0))
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = last_modified
+    return _add_download_headers(response, entry['content_disposition'])
+
 @api_view(['GET'])
 def proxy_download(request):
-    """Proxy downloads from Google Drive to handle CORS"""
+    """
+    Proxy downloads from Google Drive to handle CORS.
+
+    Range and conditional headers are honoured, so interrupted downloads can
+    resume and browsers can revalidate unchanged weights.
+    """
     url = request.GET.get('url')
     user_id = request.GET.get('user_id')
     
@@ -37,57 +153,76 @@ def proxy_download(request):
         if not gdrive_config or not gdrive_config.get('refresh_token'):
             return Response({'message': 'Google Drive not configured for user'}, status=400)
         
-        # Get a new access token using refresh token
-        token_url = 'https://oauth2.googleapis.com/token'
-        token_data = {
-            'client_id': gdrive_config['client_id'],
-            'client_secret': gdrive_config['client_secret'],
-            'refresh_token': gdrive_config['refresh_token'],
-            'grant_type': 'refresh_token'
-        }
-        
-        token_response = requests.post(token_url, data=token_data)
-        if not token_response.ok:
-            return Response({'message': 'Failed to refresh access token'}, status=401)
-        
-        access_token = token_response.json()['access_token']
-        
         # Decode the URL if it's encoded
         decoded_url = unquote(url)
         
+        # Serve repeat downloads from the local weight cache
+        cached = weight_cache.lookup(decoded_url)
+        if cached:
+            return _serve_cached_download(request, cached)
+        
+        # Get the user's access token, refreshed only when close to expiry
+        try:
+            access_token = token_cache.get_access_token(gdrive_config)
+        except TokenRefreshError:
+            return Response({'message': 'Failed to refresh access token'}, status=401)
+        
         # Make the request to Google Drive
-        response = requests.get(
-            decoded_url,
-            stream=True,
-            headers={
-                'Authorization': f'Bearer {access_token}',
-                'Accept': 'application/json'
-            }
-        )
+        upstream_headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Accept': 'application/json'
+        }
+        for header in PROXY_REQUEST_HEADERS:
+            if header in request.headers:
+                upstream_headers[header] = request.headers[header]
+        response = requests.get(decoded_url, stream=True, headers=upstream_headers)
         
         # Check if the request was successful
-        if response.status_code != 200:
+        if response.status_code == 304:
+            not_modified = HttpResponseNotModified()
+            for header in ('ETag', 'Last-Modified'):
+                if header in response.headers:
+                    not_modified[header] = response.headers[header]
+            return _add_download_headers(not_modified)
+        if response.status_code not in (200, 206):
+            if response.status_code == 401:
+                # Token was revoked early, refresh it on the next request
+                token_cache.invalidate(gdrive_config)
+            if response.status_code == 416:
+                unsatisfiable = HttpResponse(status=416)
+                if 'Content-Range' in response.headers:
+                    unsatisfiable['Content-Range'] = response.headers['Content-Range']
+                return _add_download_headers(unsatisfiable)
             return Response(
                 {'message': f'Failed to fetch file: {response.status_code}'},
                 status=response.status_code
             )
         
-        # Create a streaming response
+        # Create a streaming response; complete files are cached while they are sent
+        content_type = response.headers.get('content-type', 'application/octet-stream')
+        content_disposition = response.headers.get('content-disposition')
+        chunks = response.iter_content(chunk_size=settings.PROXY_DOWNLOAD_CHUNK_SIZE)
+        if response.status_code == 200:
+            chunks = weight_cache.store(
+                decoded_url,
+                chunks,
+                content_type=content_type,
+                content_disposition=content_disposition,
+                etag=response.headers.get('etag'),
+                last_modified=response.headers.get('last-modified')
+            )
         streaming_response = StreamingHttpResponse(
-            response.iter_content(chunk_size=8192),
-            content_type=response.headers.get('content-type', 'application/octet-stream')
+            chunks,
+            status=response.status_code,
+            content_type=content_type
         )
-        
-        # Add CORS headers
-        streaming_response['Access-Control-Allow-Origin'] = '*'
-        streaming_response['Access-Control-Allow-Methods'] = 'GET, OPTIONS'
-        streaming_response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        
-        # Add content disposition header if available
-        if 'content-disposition' in response.headers:
-            streaming_response['Content-Disposition'] = response.headers['content-disposition']
-        
-        return streaming_response
+        for header in PROXY_RESPONSE_HEADERS:
+            # iter_content decodes compressed bodies, so their length would not match
+            if header == 'Content-Length' and 'content-encoding' in response.headers:
+                continue
+            if header in response.headers:
+                streaming_response[header] = response.headers[header]
+        return _add_download_headers(streaming_response, content_disposition)
         
     except Users.DoesNotExist:
         return Response({'message': 'User not found'}, status=404)
@@ -161,25 +296,27 @@ def get_users(request):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
         # Get all users except the requesting admin
-        users = Users.objects.exclude(user_id=admin_id).order_by('username')
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        users = Users.objects.exclude(user_id=admin_id)
+        return paginated_response(request, users, ['username', 'user_id'], UserSerializer)
     except Exception as e:
         return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['POST'])
 def upload_model_weights(request):
     """Handle model file upload to Google Drive"""
+    # Use TemporaryFileUploadHandler so the upload never sits in memory
+    request.upload_handlers = [TemporaryFileUploadHandler()]
+    
     admin_id = request.query_params.get('admin_id')
     if not admin_id:
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
@@ -190,14 +327,6 @@ def upload_model_weights(request):
         if not gdrive_config or not gdrive_config.get('models_url'):
             return Response({'message': 'Google Drive models folder not configured'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Initialize Google Drive helper
-        gdrive = GoogleDriveHelper(
-            client_id=gdrive_config['client_id'],
-            client_secret=gdrive_config['client_secret'],
-            refresh_token=gdrive_config['refresh_token']
-        )
-        gdrive.authenticate()
-
         # Get the uploaded file
         if 'file' not in request.FILES:
             return Response({'message': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
@@ -208,17 +337,14 @@ def upload_model_weights(request):
         if not file.name.endswith('.h5'):
             return Response({'message': 'Invalid file format. Must be .h5'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Upload to Google Drive and get shared URL
-        result = gdrive.upload_file(
-            file_content=file.read(),
-            filename=f'model_{int(time.time())}.h5',
-            folder_url=gdrive_config['models_url']
-        )
+        # Hand the upload to the job worker, the client polls the job for the URL
+        job = enqueue('upload_model_weights', {
+            'admin_id': admin.user_id,
+            'path': spool_upload(file),
+            'filename': f'model_{int(time.time())}.h5'
+        }, user_id=admin.user_id)
 
-        if not result or 'weights_url' not in result:
-            return Response({'message': 'Failed to upload to Google Drive'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        return Response(result, status=status.HTTP_200_OK)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
 
     except Users.DoesNotExist:
         return Response({'message': 'Admin not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -234,7 +360,7 @@ def get_model(request, model_id=None):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be at least Member)
-    if not check_permission(user_id, 'Member'):
+    if not check_permission(user_id, 'Member', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     # Get specific model if model_id provided, otherwise get all models
@@ -260,12 +386,13 @@ def get_model_weights(request, model_id):
     if not user_id:
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if not check_permission(user_id, 'Member'):
+    if not check_permission(user_id, 'Member', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
         model = Models.objects.get(model_id=model_id)
-        return Response({'weights': model.weights})
+        # Migrated rows hold a blob manifest; clients expect nested float lists
+        return Response({'weights': weight_store.to_inline(model.weights)})
     except Models.DoesNotExist:
         return Response({'message': 'Model not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
@@ -278,14 +405,13 @@ def review_contributions(request):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
         # Get all contributions without filtering
-        contributions = Contributions.objects.all().order_by('-upload_date')
-        serializer = ContributionListSerializer(contributions, many=True)
-        return Response(serializer.data)
+        contributions = Contributions.objects.all()
+        return paginated_response(request, contributions, CONTRIBUTION_ORDERING, ContributionListSerializer)
     except Exception as e:
         return Response(
             {'message': f'Failed to fetch contributions: {str(e)}'},
@@ -300,7 +426,7 @@ def delete_model(request, model_id):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
@@ -322,9 +448,13 @@ def delete_model(request, model_id):
             # Delete associated ratings
             Ratings.objects.filter(model=model).delete()
             
+            # Delete the model's statistics
+            ModelStats.objects.filter(model=model).delete()
+            
             # Finally delete the model
             model.delete()
         
+        invalidate_model(model_id)
         return Response({'message': 'Model deleted successfully'}, status=status.HTTP_200_OK)
     except Models.DoesNotExist:
         return Response({'message': 'Model not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -342,7 +472,7 @@ def rate_model(request):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be at least Member)
-    if not check_permission(user_id, 'Member'):
+    if not check_permission(user_id, 'Member', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     serializer = RatingSerializer(data=request.data)
@@ -355,13 +485,18 @@ def rate_model(request):
         
         if existing_rating:
             # Update existing rating
+            previous_rating = existing_rating.rating
             existing_rating.rating = serializer.validated_data['rating']
-            existing_rating.save()
+            with transaction.atomic():
+                existing_rating.save()
+                model_stats.record_rating(existing_rating.model_id, existing_rating.rating, previous_rating)
             updated_serializer = RatingSerializer(existing_rating)
             return Response(updated_serializer.data, status=status.HTTP_200_OK)
         else:
             # Create new rating
-            serializer.save()
+            with transaction.atomic():
+                rating = serializer.save()
+                model_stats.record_rating(rating.model_id, rating.rating)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -372,58 +507,48 @@ def comment_on_model(request):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be at least Member)
-    if not check_permission(user_id, 'Member'):
+    if not check_permission(user_id, 'Member', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     serializer = CommentSerializer(data=request.data)
     if serializer.is_valid():
-        serializer.save()
+        with transaction.atomic():
+            comment = serializer.save()
+            model_stats.record_comment_approval(comment.model_id, False, comment.is_approved)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
+@require_user('user_id')
 def get_model_comments(request, model_id):
     """
     Get all comments for a specific model.
     For regular users, only return approved comments.
     For admins, return all comments.
     """
-    user_id = request.query_params.get('user_id')
-    if not user_id:
-        return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
-    
     try:
-        # Check if user exists and is active
-        user = Users.objects.get(user_id=user_id, is_active=True)
-        
         # Get comments for the model
-        if user.role_id == 4:  # Admin
+        if has_role(request.resolved_user, 'Admin'):
             comments = Comments.objects.filter(model_id=model_id)
         else:  # Regular users only see approved comments
             comments = Comments.objects.filter(model_id=model_id, is_approved=True)
         
-        # Include user information in the response
-        comments_data = []
-        for comment in comments:
-            comment_data = {
-                'comment_id': comment.comment_id,
-                'user': {
-                    'user_id': comment.user.user_id,
-                    'username': comment.user.username
-                },
-                'model_id': comment.model_id,
-                'comment_text': comment.comment_text,
-                'comment_date': comment.comment_date,
-                'is_approved': comment.is_approved
-            }
-            comments_data.append(comment_data)
-        
-        return Response(comments_data)
-    except Users.DoesNotExist:
-        return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+        return paginated_response(request, comments, ['comment_date', 'comment_id'], CommentListSerializer)
     except Exception as e:
         return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+@api_view(['GET'])
+@require_user('user_id', 'Member')
+def get_model_stats(request, model_id):
+    """Get a model's rating, approved comment and contribution counters"""
+    stats = ModelStats.objects.filter(model_id=model_id).first()
+    if stats is None:
+        if not Models.objects.filter(model_id=model_id).exists():
+            return Response({'message': 'Model not found'}, status=status.HTTP_404_NOT_FOUND)
+        # Nothing has been recorded for this model yet
+        stats = ModelStats(model_id=model_id)
+    return Response(ModelStatsSerializer(stats).data)
+
 @api_view(['GET', 'PUT', 'DELETE'])
 def manage_model_detail(request, model_id):
     """Handle GET, PUT and DELETE requests for a specific model"""
@@ -437,7 +562,7 @@ def manage_model_detail(request, model_id):
         if not user_id:
             return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not check_permission(user_id, 'Member'):
+        if not check_permission(user_id, 'Member', request):
             return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
         
         serializer = ModelDetailSerializer(model)
@@ -448,12 +573,13 @@ def manage_model_detail(request, model_id):
         if not admin_id:
             return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not check_permission(admin_id, 'Admin'):
+        if not check_permission(admin_id, 'Admin', request):
             return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
         
         serializer = ModelDetailSerializer(model, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            invalidate_model(model_id)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -462,15 +588,45 @@ def manage_model_detail(request, model_id):
         if not admin_id:
             return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not check_permission(admin_id, 'Admin'):
+        if not check_permission(admin_id, 'Admin', request):
             return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
         
-        model.delete()
+        with transaction.atomic():
+            # The statistics row references the model
+            ModelStats.objects.filter(model=model).delete()
+            model.delete()
+        invalidate_model(model_id)
         return Response({'message': 'Model deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
+def _inference_unavailable(message='Predictions are not served by this server'):
+    return Response({'message': message}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+def _predict(model_obj, images, merge=False):
+    """
+    Model output for a stack of preprocessed images, computed by the inference
+    service or in this process depending on INFERENCE_MODE. `merge` lets a
+    single in-process prediction share a batch with concurrent requests.
+    """
+    if settings.INFERENCE_MODE == 'service':
+        return inference_service.get_client().predict(model_obj.model_id, images)
+
+    # Loads TensorFlow on the first prediction served by this process
+    from . import inference
+
+    try:
+        model = inference.get_model(model_obj)
+    except Exception as e:
+        raise inference_service.ModelBuildError(str(e)) from e
+    if merge:
+        return [inference.predict_one(model_obj, model, images[0])]
+    return inference.predict_many(model, images)
+
 @api_view(['POST'])
 def predict_image(request):
     """Process image and return prediction"""
+    if not settings.INFERENCE_ENABLED:
+        return _inference_unavailable()
+
     try:
         # Get model ID from request
         model_id = request.data.get('model_id')
@@ -482,83 +638,181 @@ def predict_image(request):
         if not image_file:
             return Response({'message': 'Image file required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get the model
+        # Get the model (weights are only loaded if the model is not cached)
         try:
-            model_obj = Models.objects.get(model_id=model_id)
+            model_obj = with_weights_key(Models.objects).get(model_id=model_id)
         except Models.DoesNotExist:
             return Response({'message': 'Model not found'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Convert image to array
-        import tensorflow as tf
-        import numpy as np
-        from PIL import Image
-        import io
+        # Re-submitted scans are answered without preprocessing or inference
+        digest = digest_upload(image_file)
+        cached = prediction_cache.get(model_obj, digest)
+        if cached is not None:
+            return Response(cached)
 
-        # Read image file
-        image = Image.open(io.BytesIO(image_file.read()))
-        
-        # Resize and convert to array
-        image = image.resize((128, 128))
-        image_arr = tf.keras.preprocessing.image.img_to_array(image)
-        image_arr = np.array([image_arr])  # Add batch dimension
+        # Convert image to array
+        image_arr = prediction.load_image_array(image_file)
 
-        # Get model data
-        model_data = model_obj.weights
-        
+        # Make prediction, merged with concurrent requests for the same model
         try:
-            # Create a Sequential model with the layers from the config
-            model = tf.keras.Sequential()
-            
-            # Add layers based on the architecture
-            config = json.loads(model_data['architecture'])
-            for layer_config in config['config']['layers']:
-                if layer_config['class_name'] == 'InputLayer':
-                    continue  # Skip input layer as it's implicit
-                
-                # Get layer class from tf.keras.layers
-                layer_class = getattr(tf.keras.layers, layer_config['class_name'])
-                # Create and add layer
-                layer = layer_class.from_config(layer_config['config'])
-                model.add(layer)
-
-            # Load weights
-            weights = [np.array(w) for w in model_data['weights']]
-            model.set_weights(weights)
-
-        except Exception as e:
+            scores = _predict(model_obj, image_arr[None], merge=True)[0]
+        except inference_service.ModelBuildError as e:
             print(f"Error building model: {str(e)}")
             return Response(
                 {'message': 'Error building model'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        except inference_service.InferenceUnavailable as e:
+            return _inference_unavailable(str(e))
 
-        # Make prediction
-        prediction = model.predict(image_arr)
-        predicted_class = np.argmax(prediction[0])
+        result = prediction.format_prediction(scores)
+        prediction_cache.set(model_obj, digest, result)
+        return Response(result)
 
-        # Define labels
-        labels = {
-            0: "glioma",
-            1: "meningioma", 
-            2: "no tumor",
-            3: "pituitary"
-        }
+    except Exception as e:
+        print(f"Error processing image: {str(e)}")
+        return Response(
+            {'message': 'Error processing image'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
 
-        # Get confidence scores
-        confidence_scores = {
-            label: float(score) 
-            for label, score in zip(labels.values(), prediction[0])
-        }
+@api_view(['POST'])
+def predict_batch(request):
+    """Process several images with one model and return a prediction per image"""
+    if not settings.INFERENCE_ENABLED:
+        return _inference_unavailable()
 
-        return Response({
-            'prediction': labels[predicted_class],
-            'confidence_scores': confidence_scores
-        })
+    try:
+        model_id = request.data.get('model_id')
+        if not model_id:
+            return Response({'message': 'Model ID required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        image_files = request.FILES.getlist('images')
+        if not image_files:
+            return Response({'message': 'Image files required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(image_files) > settings.PREDICT_BATCH_MAX_IMAGES:
+            return Response(
+                {'message': f'Too many images. Maximum is {settings.PREDICT_BATCH_MAX_IMAGES}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            model_obj = with_weights_key(Models.objects).get(model_id=model_id)
+        except Models.DoesNotExist:
+            return Response({'message': 'Model not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Only images without a cached result are decoded and predicted
+        digests = [digest_upload(image_file) for image_file in image_files]
+        cached = [prediction_cache.get(model_obj, digest) for digest in digests]
+        missing = [index for index, result in enumerate(cached) if result is None]
+
+        if missing:
+            images = prediction.load_image_batch([image_files[index] for index in missing])
+
+            # Run the images through the model in batches of bounded size
+            try:
+                predictions = _predict(model_obj, images)
+            except inference_service.ModelBuildError as e:
+                print(f"Error building model: {str(e)}")
+                return Response(
+                    {'message': 'Error building model'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            except inference_service.InferenceUnavailable as e:
+                return _inference_unavailable(str(e))
+
+            for index, scores in zip(missing, predictions):
+                cached[index] = prediction.format_prediction(scores)
+                prediction_cache.set(model_obj, digests[index], cached[index])
+
+        results = [
+            {'filename': image_file.name, **result}
+            for image_file, result in zip(image_files, cached)
+        ]
+        return Response({'model_id': model_obj.model_id, 'results': results})
 
     except Exception as e:
-        print(f"Error processing image: {str(e)}")
+        print(f"Error processing images: {str(e)}")
         return Response(
-            {'message': 'Error processing image'},
+            {'message': 'Error processing images'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@require_user('admin_id', 'Admin')
+def prediction_cache_stats(request):
+    """Get the prediction cache hit and miss counts of the process serving the request"""
+    return Response(prediction_cache.stats())
+
+@api_view(['POST'])
+def predict_series(request):
+    """
+    Predict every slice of uploaded DICOM files, zipped series or images and
+    aggregate the slice predictions per study
+    """
+    if not settings.INFERENCE_ENABLED:
+        return _inference_unavailable()
+
+    try:
+        model_id = request.data.get('model_id')
+        if not model_id:
+            return Response({'message': 'Model ID required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        files = request.FILES.getlist('files')
+        if not files:
+            return Response({'message': 'Files required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            model_obj = with_weights_key(Models.objects).get(model_id=model_id)
+        except Models.DoesNotExist:
+            return Response({'message': 'Model not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        studies = {}
+        try:
+            with series.read_slices(files) as slices:
+                # Decode and predict one batch at a time, so that a large
+                # series never has all of its pixels in memory
+                step = settings.PREDICT_BATCH_MAX_SIZE
+                for start in range(0, len(slices), step):
+                    chunk = slices[start:start + step]
+                    scores = _predict(model_obj, prediction.load_slice_batch(chunk))
+                    for slice_, slice_scores in zip(chunk, scores):
+                        studies.setdefault(slice_.study_uid, []).append((slice_, slice_scores))
+        except series.SeriesError as e:
+            return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except inference_service.ModelBuildError as e:
+            print(f"Error building model: {str(e)}")
+            return Response(
+                {'message': 'Error building model'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        except inference_service.InferenceUnavailable as e:
+            return _inference_unavailable(str(e))
+
+        results = []
+        for study_uid, predicted in studies.items():
+            results.append({
+                'study_uid': study_uid,
+                'slice_count': len(predicted),
+                **prediction.format_study([slice_scores for _, slice_scores in predicted]),
+                'slices': [
+                    {
+                        'filename': slice_.filename,
+                        'series_uid': slice_.series_uid,
+                        'instance_number': slice_.instance_number,
+                        'frame': slice_.frame,
+                        **prediction.format_prediction(slice_scores)
+                    }
+                    for slice_, slice_scores in predicted
+                ]
+            })
+        return Response({'model_id': model_obj.model_id, 'studies': results})
+
+    except Exception as e:
+        print(f"Error processing series: {str(e)}")
+        return Response(
+            {'message': 'Error processing series'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
@@ -569,27 +823,30 @@ def get_notifications(request):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be at least Member)
-    if not check_permission(user_id, 'Member'):
+    if not check_permission(user_id, 'Member', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
+    # Newest first; notification_id breaks ties between notifications sent together
+    ordering = ['-sent_date', '-notification_id']
+    
     try:
-        # Get notifications for the user through the junction table
-        notifications = Notifications.objects.filter(
-            notificationtouser__user_id=user_id
-        ).order_by('-sent_date')
-        
-        # Get read status for each notification
-        notifications_data = []
-        for notification in notifications:
-            notification_user = NotificationToUser.objects.get(
-                notification=notification,
-                user_id=user_id
-            )
-            notification_data = NotificationSerializer(notification).data
-            notification_data['is_read'] = notification_user.is_read
-            notifications_data.append(notification_data)
+        user = Users.objects.only('user_id', 'role_id', 'created_at').get(user_id=user_id)
+        
+        # Delivered and broadcast notifications with the user's read state in one query
+        rows, next_cursor = keyset_page(
+            notifications.feed(user),
+            ordering,
+            page_limit(request),
+            request.query_params.get('cursor')
+        )
         
-        return Response(notifications_data)
+        return Response({
+            'results': rows,
+            'next_cursor': next_cursor,
+            'unread_count': notifications.unread_count(user)
+        })
+    except InvalidCursor as e:
+        return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -616,12 +873,9 @@ def mark_notification_read(request, notification_id):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        notification_user = NotificationToUser.objects.get(
-            notification_id=notification_id,
-            user_id=user_id
-        )
-        notification_user.is_read = True
-        notification_user.save()
+        user = Users.objects.only('user_id', 'role_id', 'created_at').get(user_id=user_id)
+        if not notifications.mark_read(user, notification_id):
+            return Response({'message': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
         
         # Return updated notification data
         notification = Notifications.objects.get(notification_id=notification_id)
@@ -629,8 +883,8 @@ def mark_notification_read(request, notification_id):
         notification_data['is_read'] = True
         
         return Response(notification_data)
-    except NotificationToUser.DoesNotExist:
-        return Response({'message': 'Notification not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Users.DoesNotExist:
+        return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
 @api_view(['PUT'])
 def mark_all_notifications_read(request):
@@ -663,16 +917,17 @@ def mark_all_notifications_read(request):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        NotificationToUser.objects.filter(user_id=user_id).update(is_read=True)
+        user = Users.objects.only('user_id', 'role_id', 'created_at').get(user_id=user_id)
+        notifications.mark_all_read(user)
         return Response({'message': 'All notifications marked as read'})
+    except Users.DoesNotExist:
+        return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 def get_faq(request):
-    faqs = FAQ.objects.all()
-    serializer = FAQSerializer(faqs, many=True)
-    return Response(serializer.data)
+    return paginated_response(request, FAQ.objects.all(), ['faq_id'], FAQSerializer)
 
 @api_view(['POST'])
 def upload_contribution(request):
@@ -684,7 +939,7 @@ def upload_contribution(request):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Researcher or higher)
-    if not check_permission(user_id, 'Researcher'):
+    if not check_permission(user_id, 'Researcher', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
@@ -701,48 +956,15 @@ def upload_contribution(request):
         if not file.name.endswith('.h5'):
             return Response({'message': 'Invalid file format. Must be .h5'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Upload weights to Google Drive
-        gdrive = GoogleDriveHelper(
-            researcher.gdrive.get('client_id'),
-            researcher.gdrive.get('client_secret'),
-            researcher.gdrive.get('refresh_token')
-        )
-        gdrive.authenticate()
-        
-        # Create a temporary file path
-        temp_dir = '/tmp'
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, file.name)
-        
-        # Save the uploaded file temporarily
-        with open(temp_path, 'wb+') as destination:
-            for chunk in file.chunks():
-                destination.write(chunk)
-        
-        try:
-            # Upload file to Google Drive
-            filename = f"contribution_{user_id}_{model_id}_{int(time.time())}.h5"
-            with open(temp_path, 'rb') as f:
-                weights_url = gdrive.upload_file(
-                    file_content=f.read(),
-                    filename=filename,
-                    folder_url=researcher.gdrive.get('contributions_url')
-                )
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        
-        # Create contribution with Google Drive URL
-        contribution = Contributions.objects.create(
-            researcher_id=user_id,
-            model_id=model_id,
-            weights=weights_url,
-            status='pending'
-        )
+        # Hand the upload to the job worker, the client polls the job for the contribution
+        job = enqueue('upload_contribution', {
+            'researcher_id': researcher.user_id,
+            'model_id': model_id,
+            'path': spool_upload(file),
+            'filename': f"contribution_{user_id}_{model_id}_{int(time.time())}.h5"
+        }, user_id=researcher.user_id)
         
-        serializer = ContributionDetailSerializer(contribution)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
     except Exception as e:
         return Response(
             {'message': f'Failed to upload contribution: {str(e)}'},
@@ -756,12 +978,11 @@ def get_contributions(request):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Researcher or higher)
-    if not check_permission(user_id, 'Researcher'):
+    if not check_permission(user_id, 'Researcher', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
-    contributions = Contributions.objects.filter(researcher_id=user_id).order_by('-upload_date')
-    serializer = ContributionListSerializer(contributions, many=True)
-    return Response(serializer.data)
+    contributions = Contributions.objects.filter(researcher_id=user_id)
+    return paginated_response(request, contributions, CONTRIBUTION_ORDERING, ContributionListSerializer)
 
 @api_view(['GET'])
 def get_contribution_weights(request, contribution_id):
@@ -771,25 +992,56 @@ def get_contribution_weights(request, contribution_id):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be at least Admin)
-    if not check_permission(user_id, 'Admin'):
+    if not check_permission(user_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
         contribution = Contributions.objects.get(contribution_id=contribution_id)
-        return Response({'weights': contribution.weights})
+        return Response({'weights': weight_store.to_inline(contribution.weights)})
     except Contributions.DoesNotExist:
         return Response({'message': 'Contribution not found'}, status=status.HTTP_404_NOT_FOUND)
 
+@api_view(['POST'])
+def prefetch_contribution_weights(request):
+    """Queue a job downloading the weight files of several contributions into the server cache"""
+    admin_id = request.data.get('admin_id')
+    if not admin_id:
+        return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Check permissions (must be Admin)
+    if not check_permission(admin_id, 'Admin', request):
+        return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
+    
+    contribution_ids = request.data.get('contribution_ids', [])
+    if not contribution_ids:
+        return Response({'message': 'Contribution IDs required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        admin = Users.objects.get(user_id=admin_id)
+        if not admin.gdrive or not admin.gdrive.get('refresh_token'):
+            return Response({'message': 'Google Drive not configured for user'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Downloads can take minutes, the client polls the job for per-item progress
+        job = enqueue('prefetch_contribution_weights', {
+            'admin_id': admin.user_id,
+            'contribution_ids': contribution_ids
+        }, user_id=admin.user_id)
+
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+    except Users.DoesNotExist:
+        return Response({'message': 'Admin not found'}, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        print(f"Error prefetching contributions: {str(e)}")
+        return Response(
+            {'message': f'Failed to prefetch contributions: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 @api_view(['DELETE'])
+@require_user('researcher_id', 'Researcher')
 def delete_contribution(request, contribution_id):
     """Delete a specific contribution"""
-    researcher_id = request.query_params.get('researcher_id')
-    if not researcher_id:
-        return Response({'message': 'Researcher ID required'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Check permissions (must be Researcher or Admin)
-    if not check_permission(researcher_id, 'Researcher'):
-        return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
+    user = request.resolved_user
     
     try:
         # First check if the contribution exists
@@ -798,10 +1050,9 @@ def delete_contribution(request, contribution_id):
         # Only allow deletion if:
         # 1. The user is the owner and the status is 'pending'
         # 2. The user is an admin
-        user = Users.objects.get(user_id=researcher_id)
         if not (
-            (contribution.researcher_id == int(researcher_id) and contribution.status == 'pending') or 
-            user.role_id == 4  # Admin role
+            (contribution.researcher_id == user.user_id and contribution.status == 'pending') or 
+            has_role(user, 'Admin')
         ):
             return Response(
                 {'message': 'Cannot delete this contribution'},
@@ -816,13 +1067,12 @@ def delete_contribution(request, contribution_id):
             
             # Then delete the contribution
             contribution.delete()
+            model_stats.record_contribution_status(contribution.model_id, contribution.status, None)
             
         return Response({'message': 'Contribution deleted successfully'}, status=status.HTTP_200_OK)
         
     except Contributions.DoesNotExist:
         return Response({'message': 'Contribution not found'}, status=status.HTTP_404_NOT_FOUND)
-    except Users.DoesNotExist:
-        return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         print(f"Error deleting contribution: {str(e)}")
         return Response(
@@ -837,7 +1087,7 @@ def assign_role(request):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     user_id = request.data.get('user_id')
@@ -849,6 +1099,7 @@ def assign_role(request):
         
         user.role = role
         user.save()
+        invalidate_user(user.user_id)
         
         serializer = UserSerializer(user)
         return Response(serializer.data)
@@ -864,7 +1115,7 @@ def review_contributions(request):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     status_filter = request.query_params.get('status', 'pending')
@@ -872,12 +1123,11 @@ def review_contributions(request):
     try:
         # If status is 'all', don't filter by status
         if status_filter == 'all':
-            contributions = Contributions.objects.all().order_by('-upload_date')
+            contributions = Contributions.objects.all()
         else:
-            contributions = Contributions.objects.filter(status=status_filter).order_by('-upload_date')
+            contributions = Contributions.objects.filter(status=status_filter)
             
-        serializer = ContributionListSerializer(contributions, many=True)  # Use the new serializer
-        return Response(serializer.data)
+        return paginated_response(request, contributions, CONTRIBUTION_ORDERING, ContributionListSerializer)
     except Exception as e:
         return Response(
             {'message': f'Failed to fetch contributions: {str(e)}'},
@@ -892,45 +1142,48 @@ def update_contribution_status(request, contribution_id):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
+    new_status = request.data.get('status')
+    points = request.data.get('points_earned', 0)
+    
+    # Validate status
+    valid_statuses = ['pending', 'approved', 'rejected', 'aggregated']
+    if new_status not in valid_statuses:
+        return Response(
+            {'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
     try:
-        contribution = Contributions.objects.get(contribution_id=contribution_id)
-        new_status = request.data.get('status')
-        points = request.data.get('points_earned', 0)
-        
-        # Validate status
-        valid_statuses = ['pending', 'approved', 'rejected', 'aggregated']
-        if new_status not in valid_statuses:
-            return Response(
-                {'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Update contribution status
-        contribution.status = new_status
-        
-        # If changing to approved or aggregated, update points
-        if new_status in ['approved', 'aggregated']:
-            contribution.points_earned = points
+        with transaction.atomic():
+            # Lock the row so concurrent updates and aggregation see each other's status
+            contribution = Contributions.objects.select_for_update().get(contribution_id=contribution_id)
+            previous_status = contribution.status
+            if previous_status == new_status:
+                # Nothing to record, the statistics already count this status
+                return Response(ContributionListSerializer(contribution).data)
+            contribution.status = new_status
             
-            # Update researcher's total points
-            researcher = contribution.researcher
-            researcher.total_points += points
-            researcher.save()
+            # Reward a contribution only the first time it is approved or aggregated
+            if new_status in ['approved', 'aggregated'] and previous_status not in ['approved', 'aggregated']:
+                contribution.points_earned = points
+                
+                # Credit the researcher through the points ledger
+                points_ledger.award(
+                    [(contribution.researcher_id, contribution.contribution_id, points)],
+                    reason=new_status
+                )
+                
+                # Create notification for the researcher
+                notifications.notify_users(
+                    f"Your contribution has been {new_status}. You earned {points} points!",
+                    [contribution.researcher_id]
+                )
             
-            # Create notification for the researcher
-            notification = Notifications.objects.create(
-                message=f"Your contribution has been {new_status}. You earned {points} points!"
-            )
-            NotificationToUser.objects.create(
-                notification=notification,
-                user=researcher,
-                is_read=False
-            )
-        
-        contribution.save()
+            contribution.save()
+            model_stats.record_contribution_status(contribution.model_id, previous_status, new_status)
         serializer = ContributionListSerializer(contribution)
         return Response(serializer.data)
     except Contributions.DoesNotExist:
@@ -947,85 +1200,62 @@ def create_experimental_model(request):
     if not admin_id:
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
         admin = Users.objects.get(user_id=admin_id)
         contribution_ids = request.data.get('contribution_ids', [])
-        model_name = request.data.get('model_name')
-        model_description = request.data.get('model_description')
-        points_per_contribution = request.data.get('points_per_contribution', 10)
         target_model_id = request.data.get('target_model_id')
         
-        # Get target model and aggregate weights
-        target_model = Models.objects.get(model_id=target_model_id)
-        contributions = Contributions.objects.filter(contribution_id__in=contribution_ids)
+        if not contribution_ids:
+            return Response({'message': 'No contributions to aggregate'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Aggregate weights and upload to Google Drive
-        aggregated_weights = {
-            'weights': request.data.get('weights'),
-            'architecture': target_model.weights.get('architecture')
-        }
-        
-        gdrive = GoogleDriveHelper(
-            admin.gdrive.get('client_id'),
-            admin.gdrive.get('client_secret'),
-            admin.gdrive.get('refresh_token')
-        )
-        gdrive.authenticate()
-        
-        # Upload aggregated weights to Google Drive
-        filename = f"model_{model_name}_v{target_model.version + 1}.json"
-        weights_url = gdrive.upload_file(
-            aggregated_weights,
-            filename,
-            admin.gdrive.get('models_url')
-        )
-        
-        # Create experimental model with Google Drive URL
-        exp_model = Models.objects.create(
-            model_name=model_name,
-            model_description=model_description,
-            version=target_model.version + 1,
-            status='experimental',
-            weights=weights_url,
-            metrics=target_model.metrics
-        )
-        
-        # Update contributions and create links
-        for contribution in contributions:
-            ContributionToModel.objects.create(
-                model=exp_model,
-                contribution=contribution
-            )
-            
-            if contribution.status != 'aggregated':
-                contribution.status = 'aggregated'
-                contribution.points_earned = points_per_contribution
-                contribution.save()
-                
-                researcher = contribution.researcher
-                researcher.total_points += points_per_contribution
-                researcher.save()
-                
-                notification = Notifications.objects.create(
-                    message=f"Your contribution was aggregated into experimental model v{exp_model.version}. You earned {points_per_contribution} points!"
-                )
-                NotificationToUser.objects.create(
-                    notification=notification,
-                    user=researcher,
-                    is_read=False
-                )
+        if not Models.objects.filter(model_id=target_model_id).exists():
+            return Response({'message': 'Model not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = ModelDetailSerializer(exp_model)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # Aggregation, upload and bookkeeping run in the job worker
+        job = enqueue('create_experimental_model', {
+            'admin_id': admin.user_id,
+            'contribution_ids': contribution_ids,
+            'contribution_weights': request.data.get('contribution_weights'),
+            'model_name': request.data.get('model_name'),
+            'model_description': request.data.get('model_description'),
+            'points_per_contribution': request.data.get('points_per_contribution', 10),
+            'target_model_id': target_model_id
+        }, user_id=admin.user_id)
+        
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
     except Exception as e:
         return Response(
             {'message': f'Failed to create experimental model: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+def get_job(request, job_id):
+    """Get the status, progress and result of a background job"""
+    user_id = request.query_params.get('user_id')
+    if not user_id:
+        return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        return Response({'message': 'Invalid user ID'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # Fail the job here if its worker died, since no worker may be left to notice
+        reap_stale_jobs(job_ids=[job_id])
+        job = Jobs.objects.get(job_id=job_id)
+        
+        # Jobs are visible to the user who started them and to admins
+        if job.created_by_id != user_id and not check_permission(user_id, 'Admin', request):
+            return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
+        
+        return Response(JobSerializer(job).data)
+    except Jobs.DoesNotExist:
+        return Response({'message': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+
 @api_view(['POST'])
 def publish_model(request):
     """
@@ -1041,7 +1271,7 @@ def publish_model(request):
         return Response({'message': 'Model ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
@@ -1059,25 +1289,14 @@ def publish_model(request):
         model.status = 'active'
         model.published_date = timezone.now()
         model.save()
+        invalidate_model(model_id)
         
-        # Create notification for all members and researchers
-        members_and_researchers = Users.objects.filter(role_id__in=[2, 3])  # Member and Researcher roles
-        
-        notification = Notifications.objects.create(
-            message=f"New model version {model.version} has been published!"
+        # Broadcast to all members and researchers without a row per user
+        notifications.broadcast(
+            f"New model version {model.version} has been published!",
+            ['Member', 'Researcher']
         )
         
-        # Create notification-user relationships
-        notification_users = [
-            NotificationToUser(
-                notification=notification,
-                user=user,
-                is_read=False
-            )
-            for user in members_and_researchers
-        ]
-        NotificationToUser.objects.bulk_create(notification_users)
-        
         serializer = ModelDetailSerializer(model)
         return Response(serializer.data, status=status.HTTP_200_OK)
         
@@ -1097,13 +1316,11 @@ def manage_models(request):
         if not user_id:
             return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not check_permission(user_id, 'Member'):
+        if not check_permission(user_id, 'Member', request):
             return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
-            models = Models.objects.all().order_by('-version')
-            serializer = ModelListSerializer(models, many=True)
-            return Response(serializer.data)
+            return paginated_response(request, Models.objects.all(), ['-version', '-model_id'], ModelListSerializer)
         except Exception as e:
             return Response({'message': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -1112,7 +1329,7 @@ def manage_models(request):
         if not admin_id:
             return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not check_permission(admin_id, 'Admin'):
+        if not check_permission(admin_id, 'Admin', request):
             return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
         
         try:
@@ -1175,13 +1392,16 @@ def moderate_comment(request, comment_id):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
         comment = Comments.objects.get(comment_id=comment_id)
+        was_approved = comment.is_approved
         comment.is_approved = request.data.get('is_approved', False)
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            model_stats.record_comment_approval(comment.model_id, was_approved, comment.is_approved)
         
         serializer = CommentSerializer(comment)
         return Response(serializer.data)
@@ -1195,7 +1415,7 @@ def create_faq(request):
         return Response({'message': 'Admin ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     serializer = FAQSerializer(data=request.data)
@@ -1211,7 +1431,7 @@ def delete_user(request, user_id):
         return Response({'message': 'User ID required'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Check permissions (must be Admin)
-    if not check_permission(admin_id, 'Admin'):
+    if not check_permission(admin_id, 'Admin', request):
         return Response({'message': 'Insufficient permissions'}, status=status.HTTP_403_FORBIDDEN)
     
     try:
@@ -1221,6 +1441,55 @@ def delete_user(request, user_id):
         
         user = Users.objects.get(user_id=user_id)
         user.delete()
+        invalidate_user(user_id)
         return Response({'message': 'User deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
     except Users.DoesNotExist:
-        return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        return Response({'message': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+
+@api_view(['GET'])
+@require_user('admin_id', 'Admin')
+def analytics_overview(request):
+    """Get platform totals of users, contributions and models"""
+    return Response(analytics.cached('overview', analytics.overview))
+
+@api_view(['GET'])
+@require_user('admin_id', 'Admin')
+def analytics_contributions(request):
+    """Get contribution counts and approval rates per day, week or month"""
+    bucket = request.query_params.get('bucket', 'month')
+    if bucket not in analytics.BUCKETS:
+        return Response(
+            {'message': f'Invalid bucket. Must be one of: {", ".join(analytics.BUCKETS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    since = request.query_params.get('since')
+    if since:
+        try:
+            since = parse_datetime(since) or parse_datetime(f'{since}T00:00:00')
+        except ValueError:
+            # Well formed but impossible dates, e.g. 2024-13-01
+            since = None
+        if since is None:
+            return Response({'message': 'Invalid since date'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    
+    return Response(analytics.cached(
+        f'contributions:{bucket}:{since}',
+        lambda: analytics.contribution_trend(bucket, since)
+    ))
+
+@api_view(['GET'])
+@require_user('admin_id', 'Admin')
+def analytics_top_researchers(request):
+    """Get the users with the most points"""
+    try:
+        limit = min(max(int(request.query_params.get('limit', 5)), 1), settings.API_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'message': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(analytics.cached(
+        f'top-researchers:{limit}',
+        lambda: analytics.top_researchers(limit)
+    ))
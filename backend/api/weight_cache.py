@@ -0,0 +1,202 @@
+# api/weight_cache.py
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+
+import requests
+from django.conf import settings
+
+# Digests whose file content has been verified by this process
+_verified = set()
+_verified_lock = threading.Lock()
+
+
+def _objects_dir():
+    return os.path.join(settings.WEIGHT_CACHE_DIR, 'objects')
+
+
+def _index_dir():
+    return os.path.join(settings.WEIGHT_CACHE_DIR, 'urls')
+
+
+def object_path(digest):
+    # Cached files are Keras .h5 weight files, keep the extension for loaders
+    return os.path.join(_objects_dir(), f'{digest}.h5')
+
+
+def _index_path(url):
+    return os.path.join(_index_dir(), hashlib.sha1(url.encode()).hexdigest() + '.json')
+
+
+def lookup(url):
+    """
+    Return the cache entry for a URL, or None if it is not cached.
+
+    The entry is a dict with the `path`, `digest`, `size`, `content_type`,
+    `content_disposition`, `etag` and `last_modified` of the cached file. A file whose content does not
+    match its digest is discarded and treated as a miss.
+    """
+    try:
+        with open(_index_path(url)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    path = object_path(entry['digest'])
+    try:
+        if os.path.getsize(path) != entry['size'] or not _verify(path, entry['digest']):
+            os.remove(path)
+            return None
+        # Mark as recently used for eviction
+        os.utime(path)
+    except OSError:
+        return None
+
+    entry['path'] = path
+    return entry
+
+
+def store(url, chunks, content_type=None, content_disposition=None, etag=None, last_modified=None):
+    """
+    Write an iterable of byte chunks into the cache under its sha256 digest.
+
+    Chunks are yielded back unchanged, so an upstream download can be
+    streamed to a client and cached at the same time. The entry is only
+    committed once the iterable is fully consumed. The upstream `etag` and
+    `last_modified` headers are kept so cached responses validate the same
+    way as the original.
+    """
+    os.makedirs(_objects_dir(), exist_ok=True)
+    os.makedirs(_index_dir(), exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=_objects_dir(), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+        digest = digest.hexdigest()
+        os.replace(temp_path, object_path(digest))
+        with _verified_lock:
+            _verified.add(digest)
+        _write_index(url, {
+            'digest': digest,
+            'size': size,
+            'content_type': content_type,
+            'content_disposition': content_disposition,
+            'etag': etag,
+            'last_modified': last_modified,
+        })
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    evict()
+
+
+def fetch(url, headers=None, session=None, progress=None):
+    """
+    Return the cache entry for a URL, downloading the file on a miss.
+
+    `session` lets callers reuse pooled connections across downloads and
+    `progress`, if given, is called with the number of bytes received so far.
+    """
+    entry = lookup(url)
+    if entry is not None:
+        return entry
+
+    response = (session or requests).get(url, headers=headers or {}, stream=True, timeout=60)
+    response.raise_for_status()
+    received = 0
+    for chunk in store(
+        url,
+        response.iter_content(chunk_size=settings.PROXY_DOWNLOAD_CHUNK_SIZE),
+        content_type=response.headers.get('content-type'),
+        content_disposition=response.headers.get('content-disposition'),
+        etag=response.headers.get('etag'),
+        last_modified=response.headers.get('last-modified'),
+    ):
+        received += len(chunk)
+        if progress:
+            progress(received)
+
+    entry = lookup(url)
+    if entry is None:
+        raise IOError(f'Failed to cache {url}')
+    return entry
+
+
+def open_mapped(path):
+    """
+    Memory-map a cached file read-only.
+
+    The mapping shares the OS page cache, so several worker processes reading
+    the same weights do not each hold a private copy. The returned object
+    supports read/seek/tell and can be passed to h5py.File directly.
+    """
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def evict():
+    """Remove least recently used files until the cache fits its size limit"""
+    try:
+        names = os.listdir(_objects_dir())
+    except OSError:
+        return
+
+    files = []
+    for name in names:
+        if name.endswith('.tmp'):
+            continue
+        try:
+            stat = os.stat(os.path.join(_objects_dir(), name))
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, name in sorted(files):
+        if total <= settings.WEIGHT_CACHE_MAX_BYTES:
+            break
+        try:
+            # Readers that already opened the file keep a valid handle
+            os.remove(os.path.join(_objects_dir(), name))
+        except OSError:
+            continue
+        with _verified_lock:
+            _verified.discard(os.path.splitext(name)[0])
+        total -= size
+
+
+def _write_index(url, entry):
+    fd, temp_path = tempfile.mkstemp(dir=_index_dir(), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(entry, f)
+    os.replace(temp_path, _index_path(url))
+
+
+def _verify(path, digest):
+    # Hash each file once per process, later lookups only check the size
+    with _verified_lock:
+        if digest in _verified:
+            return True
+
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    if sha256.hexdigest() != digest:
+        return False
+
+    with _verified_lock:
+        _verified.add(digest)
+    return True
@@ -0,0 +1,147 @@
+# api/weight_store.py
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+from django.conf import settings
+
+from .models import WeightBlob
+
+BLOB_FORMAT = 'tensor-blob'
+
+# Tensor offsets inside a blob are aligned so every view is properly aligned
+ALIGNMENT = 64
+
+
+def is_blob_manifest(weights):
+    """Return True if a weights JSON value points at a binary blob"""
+    return isinstance(weights, dict) and weights.get('format') == BLOB_FORMAT
+
+
+def has_inline_weights(weights):
+    """Return True if a weights JSON value still holds nested float lists"""
+    return isinstance(weights, dict) and isinstance(weights.get('weights'), list)
+
+
+def blob_path(digest):
+    """Local copy of a blob, memory-mapped when the weights are loaded"""
+    return os.path.join(settings.WEIGHT_STORE_DIR, f'{digest}.bin')
+
+
+def save_weights(arrays):
+    """
+    Store a list of arrays as one raw blob in the weight_blobs table.
+
+    Returns the manifest describing the blob: its sha256 digest plus the
+    shape, dtype and byte offset of every tensor. Call it inside the
+    transaction that saves the manifest, so a failed save stores nothing.
+    """
+    tensors = []
+    data = bytearray()
+    for array in arrays:
+        array = np.require(array, dtype=np.float32, requirements='C')
+        data += b'\0' * (-len(data) % ALIGNMENT)
+        tensors.append({
+            'shape': list(array.shape),
+            'dtype': array.dtype.str,
+            'offset': len(data),
+        })
+        if array.nbytes:
+            data += memoryview(array.reshape(-1)).cast('B')
+
+    digest = hashlib.sha256(data).hexdigest()
+    # Blobs are content addressed, so an identical blob may already exist
+    WeightBlob.objects.bulk_create(
+        [WeightBlob(digest=digest, data=data, nbytes=len(data))], ignore_conflicts=True
+    )
+    _write_local(digest, data)
+    return {
+        'format': BLOB_FORMAT,
+        'digest': digest,
+        'nbytes': len(data),
+        'tensors': tensors,
+    }
+
+
+def load_weights(manifest):
+    """
+    Return the tensors of a stored blob as read-only arrays.
+
+    The local copy of the blob is memory-mapped, so every array is a view
+    onto the page cache rather than a copy. A missing or truncated local
+    copy is fetched from the database first.
+    """
+    if manifest['nbytes'] == 0:
+        return []
+
+    path = blob_path(manifest['digest'])
+    try:
+        cached = os.path.getsize(path) == manifest['nbytes']
+    except OSError:
+        cached = False
+    if not cached:
+        _write_local(manifest['digest'], _fetch(manifest))
+
+    buffer = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = []
+    for tensor in manifest['tensors']:
+        dtype = np.dtype(tensor['dtype'])
+        count = int(np.prod(tensor['shape'], dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=tensor['offset'])
+        arrays.append(array.reshape(tensor['shape']))
+    return arrays
+
+
+def verify_blob(manifest):
+    """Check that the database holds the blob of a manifest, intact"""
+    try:
+        _fetch(manifest)
+    except ValueError:
+        return False
+    return True
+
+
+def _fetch(manifest):
+    data = WeightBlob.objects.filter(digest=manifest['digest']).values_list('data', flat=True).first()
+    if data is None:
+        raise ValueError(f"Weight blob {manifest['digest']} is missing")
+    if len(data) != manifest['nbytes'] or hashlib.sha256(data).hexdigest() != manifest['digest']:
+        raise ValueError(f"Weight blob {manifest['digest']} is truncated or corrupt")
+    return data
+
+
+def _write_local(digest, data):
+    os.makedirs(settings.WEIGHT_STORE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=settings.WEIGHT_STORE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, blob_path(digest))
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def to_manifest(weights):
+    """
+    Convert a weights JSON value holding nested float lists into a blob
+    manifest. Any other keys (e.g. `architecture`) are kept alongside it.
+    """
+    manifest = {key: value for key, value in weights.items() if key != 'weights'}
+    manifest.update(save_weights(np.asarray(w, dtype=np.float32) for w in weights['weights']))
+    return manifest
+
+
+def to_inline(weights):
+    """
+    Inverse of to_manifest: turn a blob manifest back into the weights JSON
+    value with nested float lists that API clients expect. Other values are
+    returned unchanged.
+    """
+    if not is_blob_manifest(weights):
+        return weights
+    inline = {key: value for key, value in weights.items() if key not in ('format', 'digest', 'nbytes', 'tensors')}
+    inline['weights'] = [array.tolist() for array in load_weights(weights)]
+    return inline
@@ -1,6 +1,8 @@
 # federated_learning_platform/settings.py
 import os
 from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -69,9 +71,123 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # Keep connections open between requests, checking them before reuse
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        # Server-side cursors stream QuerySet.iterator() results in chunks.
+        # Disable them behind a transaction-pooling PgBouncer.
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_SERVER_SIDE_CURSORS', 'true').lower() != 'true',
+        'OPTIONS': {},
     }
 }
 
+# Connection handling (DB_POOL_MODE):
+#   persistent - one connection per worker thread kept for DB_CONN_MAX_AGE seconds
+#   none       - a new connection per request
+# To share connections between processes, point DB_HOST/DB_PORT at a
+# transaction-pooling PgBouncer (see pgbouncer.ini) or the Supabase pooler.
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'persistent')
+if DB_POOL_MODE == 'none':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+elif DB_POOL_MODE != 'persistent':
+    raise ImproperlyConfigured(
+        f'Unknown DB_POOL_MODE {DB_POOL_MODE!r}: use "persistent" or "none", and PgBouncer for pooling'
+    )
+
+# Rows fetched per round trip when iterating large querysets
+DB_ITERATOR_CHUNK_SIZE = int(os.getenv('DB_ITERATOR_CHUNK_SIZE', 2000))
+
+# Seconds a user's resolved role is reused by permission checks. Role changes
+# made through other processes take at most this long to apply.
+ROLE_CACHE_TTL = int(os.getenv('ROLE_CACHE_TTL', 60))
+
+# Google OAuth token endpoint; access tokens are reused until
+# GOOGLE_TOKEN_EXPIRY_MARGIN seconds before they expire
+GOOGLE_TOKEN_URL = os.getenv('GOOGLE_TOKEN_URL', 'https://oauth2.googleapis.com/token')
+GOOGLE_TOKEN_EXPIRY_MARGIN = int(os.getenv('GOOGLE_TOKEN_EXPIRY_MARGIN', 300))
+
+# Resumable Google Drive uploads send files in chunks of this size
+# (must be a multiple of 256 KB)
+GDRIVE_UPLOAD_CHUNK_SIZE = int(os.getenv('GDRIVE_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+
+# Proxied and cached weight downloads are streamed in chunks of this size
+PROXY_DOWNLOAD_CHUNK_SIZE = int(os.getenv('PROXY_DOWNLOAD_CHUNK_SIZE', 1024 * 1024))
+
+# Uploaded files waiting for the background job worker
+JOB_SPOOL_DIR = os.getenv('JOB_SPOOL_DIR', os.path.join(BASE_DIR, 'job_spool'))
+
+# Running jobs record a heartbeat every JOB_HEARTBEAT_INTERVAL seconds; jobs
+# without one for JOB_STALE_AFTER seconds are failed as their worker died
+JOB_HEARTBEAT_INTERVAL = int(os.getenv('JOB_HEARTBEAT_INTERVAL', 15))
+JOB_STALE_AFTER = int(os.getenv('JOB_STALE_AFTER', 120))
+
+# Local copies of the weight blobs stored in the weight_blobs table, which are
+# memory-mapped when models are built; missing copies are fetched again
+WEIGHT_STORE_DIR = os.getenv('WEIGHT_STORE_DIR', os.path.join(BASE_DIR, 'weight_store'))
+
+# Local content-addressed cache of .h5 weight files downloaded from Google Drive
+WEIGHT_CACHE_DIR = os.getenv('WEIGHT_CACHE_DIR', os.path.join(BASE_DIR, 'weight_cache'))
+WEIGHT_CACHE_MAX_BYTES = int(os.getenv('WEIGHT_CACHE_MAX_BYTES', 5 * 1024 * 1024 * 1024))
+
+# Concurrent downloads when collecting a round of contribution weight files
+DOWNLOAD_MAX_WORKERS = int(os.getenv('DOWNLOAD_MAX_WORKERS', 8))
+
+# Inference model cache (built Keras models kept in memory per process)
+MODEL_CACHE_MAX_ENTRIES = int(os.getenv('MODEL_CACHE_MAX_ENTRIES', 4))
+MODEL_CACHE_MAX_BYTES = int(os.getenv('MODEL_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# Prediction results per API process, keyed by the model's stored weights and
+# the image content, so a changed model never answers from old results.
+# Entries expire after PREDICTION_CACHE_TTL seconds; 0 in either disables it
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', 10000))
+PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 600))
+
+# Serve the prediction endpoints from this process. Workers that set this to
+# false never load TensorFlow and answer predictions with 503
+INFERENCE_ENABLED = os.getenv('INFERENCE_ENABLED', 'true').lower() == 'true'
+
+# Where predictions run: 'local' in the API worker, or 'service' in the
+# worker pool started with `manage.py run_inference_service`, listening on
+# INFERENCE_SERVICE_ADDRESS (a Unix socket path or host:port)
+INFERENCE_MODE = os.getenv('INFERENCE_MODE', 'local')
+INFERENCE_SERVICE_ADDRESS = os.getenv('INFERENCE_SERVICE_ADDRESS', str(BASE_DIR / 'inference.sock'))
+# Connections carry pickled data, so a host:port address requires an explicit
+# key. A Unix socket is only reachable by its owner and group and falls back
+# to SECRET_KEY
+INFERENCE_SERVICE_AUTHKEY = os.getenv('INFERENCE_SERVICE_AUTHKEY', '')
+# Every service worker keeps its own model cache (up to MODEL_CACHE_MAX_BYTES),
+# so the service refuses to start more workers than fit in
+# INFERENCE_SERVICE_MODEL_MEMORY bytes
+INFERENCE_SERVICE_WORKERS = int(os.getenv('INFERENCE_SERVICE_WORKERS', 2))
+INFERENCE_SERVICE_MODEL_MEMORY = int(os.getenv('INFERENCE_SERVICE_MODEL_MEMORY', 2 * 1024 * 1024 * 1024))
+# Seconds an API request waits for a prediction before giving up
+INFERENCE_SERVICE_TIMEOUT = float(os.getenv('INFERENCE_SERVICE_TIMEOUT', 30))
+# Predictions in flight per API process, and queued in the service, before
+# further requests are refused with 503
+INFERENCE_SERVICE_MAX_PENDING = int(os.getenv('INFERENCE_SERVICE_MAX_PENDING', 8))
+INFERENCE_SERVICE_MAX_QUEUE = int(os.getenv('INFERENCE_SERVICE_MAX_QUEUE', 32))
+
+# Prediction batching: single-image requests that arrive while the same model
+# is predicting are merged into batches of up to PREDICT_BATCH_MAX_SIZE
+PREDICT_BATCH_MAX_SIZE = int(os.getenv('PREDICT_BATCH_MAX_SIZE', 32))
+PREDICT_BATCH_MAX_IMAGES = int(os.getenv('PREDICT_BATCH_MAX_IMAGES', 256))
+
+# Limits of one DICOM/zip series prediction request: slices in total, and
+# uncompressed bytes per zip archive
+PREDICT_SERIES_MAX_SLICES = int(os.getenv('PREDICT_SERIES_MAX_SLICES', 2000))
+PREDICT_SERIES_MAX_BYTES = int(os.getenv('PREDICT_SERIES_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Page size of list endpoints, overridable per request with `limit` up to
+# API_MAX_PAGE_SIZE
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 20))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 100))
+
+# Seconds analytics results are served from the cache before being recomputed
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 60))
+
+# Rows per INSERT when delivering a notification to a list of users
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 1000))
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, restrict in production
 
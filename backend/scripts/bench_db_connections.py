@@ -0,0 +1,96 @@
+"""
+Benchmark request latency for each database connection mode.
+
+Sends the same lightweight API request repeatedly through Django's test
+client, closing expired connections around each request the way the WSGI
+handler does, and reports the latency for:
+
+- none:       a new connection per request (CONN_MAX_AGE=0)
+- persistent: connections reused with health checks (CONN_MAX_AGE > 0)
+
+Run from the backend directory against a local Postgres with the schema
+from DB.txt, using the usual DB_* environment variables:
+
+    python scripts/bench_db_connections.py --requests 200 --path /api/faq/
+
+To measure PgBouncer, run it again with DB_PORT pointing at PgBouncer and
+DB_SERVER_SIDE_CURSORS=false.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'federated_learning_platform.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import close_old_connections, connections  # noqa: E402
+from django.test import Client  # noqa: E402
+
+MODES = {
+    'none': {'CONN_MAX_AGE': 0},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def configure(mode):
+    """Switch the default connection to `mode`, dropping any open connection"""
+    connections.close_all()
+    connections['default'].settings_dict.update(MODES[mode])
+
+
+def request(client, path):
+    # The test client skips close_old_connections, which the WSGI handler
+    # runs on request_started and request_finished
+    close_old_connections()
+    try:
+        return client.get(path)
+    finally:
+        close_old_connections()
+
+
+def run(mode, path, requests_count, warmup):
+    configure(mode)
+    client = Client(HTTP_HOST='localhost')
+    for _ in range(warmup):
+        request(client, path)
+
+    timings = []
+    for _ in range(requests_count):
+        start = time.perf_counter()
+        response = request(client, path)
+        timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{path} returned {response.status_code}')
+    connections.close_all()
+
+    timings.sort()
+    return {
+        'mean': statistics.mean(timings),
+        'p50': timings[len(timings) // 2],
+        'p95': timings[int(len(timings) * 0.95) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', default='/api/faq/', help='endpoint to request (default: %(default)s)')
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per mode (default: %(default)s)')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per mode (default: %(default)s)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+
+    print(f'{args.requests} requests to {args.path} per mode')
+    print(f"{'mode':<12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode in args.modes:
+        result = run(mode, args.path, args.requests, args.warmup)
+        print(f"{mode:<12}{result['mean']:>10.2f}{result['p50']:>10.2f}{result['p95']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
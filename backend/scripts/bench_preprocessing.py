@@ -0,0 +1,87 @@
+"""
+Microbenchmark of prediction image preprocessing.
+
+Compares api.prediction.load_image_batch with the previous per-image
+pipeline (PIL decode, default resize, conversion to float32 with
+img_to_array, np.stack) on synthetic uploads:
+
+- jpeg-large: 2048x2048 RGB JPEG, typical of photographed or exported scans
+- png-gray:   512x512 8-bit grayscale PNG
+- png-small:  128x128 RGB PNG, already at model input size
+
+Run from the backend directory:
+
+    python scripts/bench_preprocessing.py --batch 32 --repeat 5
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.prediction import load_image_batch  # noqa: E402
+
+
+def _encode(image, format):
+    buffer = io.BytesIO()
+    image.save(buffer, format, quality=90) if format == 'JPEG' else image.save(buffer, format)
+    return buffer.getvalue()
+
+
+def _scan(size, mode):
+    # Smooth gradients with noise, so that the encoded size is realistic
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size]
+    pixels = (127 + 100 * np.sin(x / 40) * np.cos(y / 55) + rng.normal(0, 8, (size, size))).clip(0, 255)
+    image = Image.fromarray(pixels.astype(np.uint8), 'L')
+    return image.convert(mode)
+
+
+SAMPLES = {
+    'jpeg-large': lambda: _encode(_scan(2048, 'RGB'), 'JPEG'),
+    'png-gray': lambda: _encode(_scan(512, 'L'), 'PNG'),
+    'png-small': lambda: _encode(_scan(128, 'RGB'), 'PNG'),
+}
+
+
+def legacy_batch(files):
+    """The pipeline predict_image used before (img_to_array is a float32 np.asarray)"""
+    arrays = []
+    for f in files:
+        image = Image.open(io.BytesIO(f.read()))
+        image = image.resize((128, 128))
+        arrays.append(np.asarray(image, dtype=np.float32))
+    return np.stack(arrays)
+
+
+def bench(func, data, batch, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        files = [io.BytesIO(data) for _ in range(batch)]
+        start = time.perf_counter()
+        func(files)
+        best = min(best, time.perf_counter() - start)
+    return best / batch * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch', type=int, default=32, help='images per batch (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5, help='batches per measurement, best is kept (default: %(default)s)')
+    args = parser.parse_args()
+
+    print(f"{'sample':<12}{'legacy ms/img':>15}{'current ms/img':>16}{'speedup':>10}")
+    for name, make in SAMPLES.items():
+        data = make()
+        legacy = bench(legacy_batch, data, args.batch, args.repeat)
+        current = bench(load_image_batch, data, args.batch, args.repeat)
+        print(f"{name:<12}{legacy:>15.2f}{current:>16.2f}{legacy / current:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
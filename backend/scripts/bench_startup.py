@@ -0,0 +1,78 @@
+"""
+Benchmark API worker startup time and memory.
+
+Each measurement runs in a fresh interpreter that does what a WSGI worker
+does on boot (django.setup() and loading the URL configuration) and reports
+the wall time and peak RSS. Modes:
+
+- lazy:      the current startup, TensorFlow is not imported
+- eager:     startup plus importing TensorFlow, as every worker did when
+             api/views.py imported it at module level
+- inference: startup plus api.inference, the cost paid by the first
+             prediction a worker serves
+
+Run from the backend directory:
+
+    python scripts/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, os, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+for module in {imports!r}:
+    __import__(module)
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'tensorflow': 'tensorflow' in sys.modules,
+}}))
+"""
+
+MODES = {
+    'lazy': [],
+    'eager': ['tensorflow'],
+    'inference': ['api.inference'],
+}
+
+
+def measure(mode, settings_module):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module, TF_CPP_MIN_LOG_LEVEL='3')
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(imports=MODES[mode])],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh processes per mode (default: %(default)s)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--settings', default='federated_learning_platform.settings', help='DJANGO_SETTINGS_MODULE')
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'startup s':>12}{'peak RSS MB':>14}{'tensorflow':>12}")
+    for mode in args.modes:
+        results = [measure(mode, args.settings) for _ in range(args.runs)]
+        print(
+            f"{mode:<12}"
+            f"{statistics.median(r['seconds'] for r in results):>12.2f}"
+            f"{statistics.median(r['rss_mb'] for r in results):>14.0f}"
+            f"{str(results[-1]['tensorflow']):>12}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -13,7 +13,7 @@ function classNames(...classes) {
 export default function Layout() {
   const location = useLocation();
   const { user, logout } = useAuthStore();
-  const { notifications, markAllAsRead } = useNotificationStore();
+  const { notifications, unreadCount, markAllAsRead } = useNotificationStore();
   const [showNotifications, setShowNotifications] = useState(false);
 
   const navigation = [
@@ -34,10 +34,6 @@ export default function Layout() {
     { name: "Sign out", href: "#", onClick: logout },
   ];
 
-  const unreadCount = Array.isArray(notifications)
-    ? notifications.filter((n) => !n.is_read).length
-    : 0;
-
   const handleMarkAllAsRead = async () => {
     if (!Array.isArray(notifications) || notifications.length === 0) return;
 
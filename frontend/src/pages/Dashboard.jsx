@@ -15,7 +15,7 @@ import {
 export default function Dashboard() {
   const user = useAuthStore((state) => state.user);
   const { models, fetchModels } = useModelStore();
-  const { notifications, fetchNotifications } = useNotificationStore();
+  const { unreadCount, fetchNotifications } = useNotificationStore();
   const { contributions, fetchContributions } = useProfileStore();
 
   useEffect(() => {
@@ -51,7 +51,7 @@ export default function Dashboard() {
     },
     {
       name: "Unread Notifications",
-      value: notifications.filter((n) => !n.is_read).length,
+      value: unreadCount,
     },
     {
       name: "Your Role",
@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { useAuthStore } from "../stores/authStore";
 import axios from "axios";
+import { fetchAllPages } from "../utils/pagination";
 import Pagination from "../components/Pagination";
 
 const ITEMS_PER_PAGE = 10;
@@ -19,8 +20,7 @@ export default function FAQ() {
 
   const fetchFAQs = async () => {
     try {
-      const response = await axios.get("http://localhost:8000/api/faq/");
-      setFaqs(response.data);
+      setFaqs(await fetchAllPages("http://localhost:8000/api/faq/"));
       setIsLoading(false);
     } catch (error) {
       console.error("Failed to fetch FAQs:", error);
@@ -15,8 +15,10 @@ export default function ModelDetails() {
   const { id } = useParams();
   const {
     selectedModel,
+    modelStats,
     modelComments,
     fetchModelById,
+    fetchModelStats,
     fetchModelComments,
     rateModel,
     commentOnModel,
@@ -31,7 +33,7 @@ export default function ModelDetails() {
   useEffect(() => {
     const loadModelData = async () => {
       await fetchModelById(id);
-      await fetchModelComments(id);
+      await Promise.all([fetchModelComments(id), fetchModelStats(id)]);
     };
     loadModelData();
   }, [id]);
@@ -90,6 +92,7 @@ export default function ModelDetails() {
     const success = await rateModel(id, value);
     if (success) {
       setRating(value);
+      fetchModelStats(id);
       toast.success("Rating submitted successfully");
     } else {
       toast.error("Failed to submit rating");
@@ -210,6 +213,15 @@ export default function ModelDetails() {
                   />
                 ))}
               </div>
+              {modelStats && (
+                <p className="mt-1 text-sm text-gray-500">
+                  {modelStats.average_rating
+                    ? `Average ${modelStats.average_rating} from ${modelStats.rating_count} rating${
+                        modelStats.rating_count === 1 ? "" : "s"
+                      }`
+                    : "No ratings yet"}
+                </p>
+              )}
             </div>
           </div>
         </div>
@@ -7,8 +7,16 @@ import Pagination from "../components/Pagination";
 const ITEMS_PER_PAGE = 10;
 
 export default function Notifications() {
-  const { notifications, fetchNotifications, markAllAsRead, isLoading } =
-    useNotificationStore();
+  const {
+    notifications,
+    unreadCount,
+    nextCursor,
+    fetchNotifications,
+    loadMoreNotifications,
+    markAllAsRead,
+    isLoading,
+    isLoadingMore,
+  } = useNotificationStore();
   const [currentPage, setCurrentPage] = useState(1);
 
   useEffect(() => {
@@ -34,8 +42,7 @@ export default function Notifications() {
     );
   }
 
-  const hasUnreadNotifications =
-    Array.isArray(notifications) && notifications.some((n) => !n.is_read);
+  const hasUnreadNotifications = unreadCount > 0;
 
   // Pagination logic
   const startIndex = (currentPage - 1) * ITEMS_PER_PAGE;
@@ -135,6 +142,17 @@ export default function Notifications() {
                 />
               </div>
             )}
+          {nextCursor && (
+            <div className="border-t border-gray-200 p-4 text-center">
+              <button
+                onClick={loadMoreNotifications}
+                disabled={isLoadingMore}
+                className="text-sm font-medium text-indigo-600 hover:text-indigo-500 disabled:opacity-50"
+              >
+                {isLoadingMore ? "Loading..." : "Load older notifications"}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
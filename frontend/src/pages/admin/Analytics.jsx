@@ -30,8 +30,7 @@ ChartJS.register(
 
 export default function Analytics() {
   const { models, fetchModels } = useModelStore();
-  const { users, contributions, fetchUsers, fetchContributions } =
-    useAdminStore();
+  const { analytics, fetchAnalytics } = useAdminStore();
   const [timeRange, setTimeRange] = useState("month");
   const [isLoading, setIsLoading] = useState(true);
   const [selectedModelName, setSelectedModelName] = useState("");
@@ -42,7 +41,7 @@ export default function Analytics() {
     const loadData = async () => {
       setIsLoading(true);
       try {
-        await Promise.all([fetchModels(), fetchUsers(), fetchContributions()]);
+        await Promise.all([fetchModels(), fetchAnalytics(timeRange)]);
       } finally {
         setIsLoading(false);
       }
@@ -50,6 +49,12 @@ export default function Analytics() {
     loadData();
   }, []);
 
+  // Only the trend depends on the bucket size
+  const handleTimeRangeChange = (value) => {
+    setTimeRange(value);
+    fetchAnalytics(value);
+  };
+
   // Get all unique model names
   const modelNames = useMemo(() => {
     const names = new Set();
@@ -113,16 +118,47 @@ export default function Analytics() {
     });
   }, [models, selectedModelName, selectedStatus]);
 
-  // Calculate statistics
-  const totalUsers = users.length;
-  const activeUsers = users.filter((user) => user.is_active).length;
-  const totalResearchers = users.filter((user) => user.role === 3).length;
-  const totalContributions = contributions.length;
-  const approvedContributions = contributions.filter(
-    (c) => c.status === "approved" || c.status === "aggregated"
-  ).length;
-  const totalModels = models.length;
-  const activeModels = models.filter((m) => m.status === "active").length;
+  // Platform statistics are aggregated by the server
+  const userCounts = analytics?.overview.users || {};
+  const contributionCounts = analytics?.overview.contributions || {};
+  const modelCounts = analytics?.overview.models || {};
+  const totalUsers = userCounts.total || 0;
+  const activeUsers = userCounts.active || 0;
+  const totalResearchers = userCounts.Researcher || 0;
+  const totalContributions = contributionCounts.total || 0;
+  const approvedContributions =
+    (contributionCounts.approved || 0) + (contributionCounts.aggregated || 0);
+  const totalModels = modelCounts.total || 0;
+  const activeModels = modelCounts.active || 0;
+  const trend = analytics?.trend || [];
+  const topResearchers = analytics?.topResearchers || [];
+
+  const periodLabel = (period) => {
+    const date = new Date(period);
+    return timeRange === "month"
+      ? date.toLocaleDateString(undefined, { year: "numeric", month: "short" })
+      : date.toLocaleDateString();
+  };
+
+  const trendChartData = {
+    labels: trend.map((row) => periodLabel(row.period)),
+    datasets: [
+      {
+        label: "Contributions",
+        data: trend.map((row) => row.total),
+        borderColor: "rgb(79, 70, 229)",
+        backgroundColor: "rgba(79, 70, 229, 0.5)",
+        tension: 0.1,
+      },
+      {
+        label: "Accepted",
+        data: trend.map((row) => row.approved + row.aggregated),
+        borderColor: "rgb(75, 192, 192)",
+        backgroundColor: "rgba(75, 192, 192, 0.5)",
+        tension: 0.1,
+      },
+    ],
+  };
 
   // Model Performance Chart Data
   const performanceChartData = {
@@ -340,6 +376,34 @@ export default function Analytics() {
         </div>
       </div>
 
+      {/* Contribution Trend */}
+      <div className="bg-white shadow rounded-lg p-6">
+        <div className="flex items-center justify-between mb-4">
+          <h3 className="text-lg font-medium leading-6 text-gray-900">
+            Contribution Trend
+          </h3>
+          <select
+            value={timeRange}
+            onChange={(e) => handleTimeRangeChange(e.target.value)}
+            className="block rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500 sm:text-sm"
+          >
+            <option value="day">Daily (last 30 days)</option>
+            <option value="week">Weekly (last 26 weeks)</option>
+            <option value="month">Monthly (last 12 months)</option>
+          </select>
+        </div>
+        <div className="h-80">
+          <Line
+            data={trendChartData}
+            options={{
+              responsive: true,
+              maintainAspectRatio: false,
+              scales: { y: { beginAtZero: true } },
+            }}
+          />
+        </div>
+      </div>
+
       {/* Charts */}
       <div className="grid grid-cols-1 gap-6 lg:grid-cols-2">
         <div className="bg-white shadow rounded-lg p-6">
@@ -420,14 +484,10 @@ export default function Analytics() {
                 datasets: [
                   {
                     data: [
-                      contributions.filter((c) => c.status === "pending")
-                        .length,
-                      contributions.filter((c) => c.status === "approved")
-                        .length,
-                      contributions.filter((c) => c.status === "rejected")
-                        .length,
-                      contributions.filter((c) => c.status === "aggregated")
-                        .length,
+                      contributionCounts.pending || 0,
+                      contributionCounts.approved || 0,
+                      contributionCounts.rejected || 0,
+                      contributionCounts.aggregated || 0,
                     ],
                     backgroundColor: [
                       "rgb(255, 205, 86)",
@@ -459,10 +519,10 @@ export default function Analytics() {
                 datasets: [
                   {
                     data: [
-                      users.filter((user) => user.role === 1).length,
-                      users.filter((user) => user.role === 2).length,
-                      users.filter((user) => user.role === 3).length,
-                      users.filter((user) => user.role === 4).length,
+                      userCounts.Visitor || 0,
+                      userCounts.Member || 0,
+                      userCounts.Researcher || 0,
+                      userCounts.Admin || 0,
                     ],
                     backgroundColor: [
                       "rgb(255, 99, 132)",
@@ -487,36 +547,32 @@ export default function Analytics() {
           </h3>
           <div className="flow-root">
             <ul role="list" className="divide-y divide-gray-200">
-              {users
-                .filter((user) => user.total_points > 0)
-                .sort((a, b) => b.total_points - a.total_points)
-                .slice(0, 5)
-                .map((user, index) => (
-                  <li key={user.user_id} className="py-4">
-                    <div className="flex items-center space-x-4">
-                      <div className="flex-shrink-0">
-                        <span className="inline-flex items-center justify-center h-8 w-8 rounded-full bg-indigo-100">
-                          <span className="text-sm font-medium leading-none text-indigo-700">
-                            {index + 1}
-                          </span>
+              {topResearchers.map((user, index) => (
+                <li key={user.user_id} className="py-4">
+                  <div className="flex items-center space-x-4">
+                    <div className="flex-shrink-0">
+                      <span className="inline-flex items-center justify-center h-8 w-8 rounded-full bg-indigo-100">
+                        <span className="text-sm font-medium leading-none text-indigo-700">
+                          {index + 1}
                         </span>
-                      </div>
-                      <div className="min-w-0 flex-1">
-                        <p className="text-sm font-medium text-gray-900 truncate">
-                          {user.username}
-                        </p>
-                        <p className="text-sm text-gray-500 truncate">
-                          {user.role === 3 ? "Researcher" : "Member"}
-                        </p>
-                      </div>
-                      <div>
-                        <span className="inline-flex items-center rounded-full bg-green-50 px-2 py-1 text-xs font-medium text-green-700 ring-1 ring-inset ring-green-600/20">
-                          {user.total_points} points
-                        </span>
-                      </div>
+                      </span>
                     </div>
-                  </li>
-                ))}
+                    <div className="min-w-0 flex-1">
+                      <p className="text-sm font-medium text-gray-900 truncate">
+                        {user.username}
+                      </p>
+                      <p className="text-sm text-gray-500 truncate">
+                        {user.role_id === 3 ? "Researcher" : "Member"}
+                      </p>
+                    </div>
+                    <div>
+                      <span className="inline-flex items-center rounded-full bg-green-50 px-2 py-1 text-xs font-medium text-green-700 ring-1 ring-inset ring-green-600/20">
+                        {user.total_points} points
+                      </span>
+                    </div>
+                  </div>
+                </li>
+              ))}
             </ul>
           </div>
         </div>
@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 import { useModelStore } from "../../stores/modelStore";
 import { useAuthStore } from "../../stores/authStore";
+import { useJobStore } from "../../stores/jobStore";
 import toast from "react-hot-toast";
 import { Dialog } from "@headlessui/react";
 import { TrashIcon, PlusIcon, PencilIcon } from "@heroicons/react/24/outline";
@@ -18,6 +19,7 @@ export default function ManageModels() {
     createModel,
     editModel,
   } = useModelStore();
+  const waitForJob = useJobStore((state) => state.waitForJob);
   const user = useAuthStore((state) => state.user);
   const [modelStatus, setModelStatus] = useState("all");
   const [isCreateModalOpen, setIsCreateModalOpen] = useState(false);
@@ -107,7 +109,9 @@ export default function ManageModels() {
         }
       );
 
-      if (!uploadResponse.data.weights_url) {
+      // The Google Drive upload finishes in a background job
+      const uploadResult = await waitForJob(uploadResponse.data.job_id);
+      if (!uploadResult?.weights_url) {
         throw new Error("Failed to get weights URL");
       }
 
@@ -115,7 +119,7 @@ export default function ManageModels() {
       const success = await createModel({
         model_name: newModel.model_name,
         model_description: newModel.model_description,
-        weights: { weights_url: uploadResponse.data.weights_url },
+        weights: { weights_url: uploadResult.weights_url },
         metrics: {
           accuracy: 0,
           precision: 0,
@@ -22,7 +22,15 @@ const ROLE_NAMES = {
 
 export default function ManageUsers() {
   const [selectedRole, setSelectedRole] = useState("all");
-  const { users, fetchUsers, assignRole, deleteUser } = useAdminStore();
+  const {
+    users,
+    usersCursor,
+    isLoadingMore,
+    fetchUsers,
+    loadMoreUsers,
+    assignRole,
+    deleteUser,
+  } = useAdminStore();
   const [filteredUsers, setFilteredUsers] = useState([]);
   const [currentPage, setCurrentPage] = useState(1);
 
@@ -196,6 +204,17 @@ export default function ManageUsers() {
                   currentPage={currentPage}
                   onPageChange={setCurrentPage}
                 />
+                {usersCursor && (
+                  <div className="border-t border-gray-200 p-4 text-center">
+                    <button
+                      onClick={loadMoreUsers}
+                      disabled={isLoadingMore}
+                      className="text-sm font-medium text-indigo-600 hover:text-indigo-500 disabled:opacity-50"
+                    >
+                      {isLoadingMore ? "Loading..." : "Load more users"}
+                    </button>
+                  </div>
+                )}
               </div>
             </div>
           </div>
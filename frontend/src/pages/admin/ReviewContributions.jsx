@@ -20,9 +20,13 @@ const STATUS_COLORS = {
 export default function ReviewContributions() {
   const {
     contributions,
+    contributionsCursor,
+    isLoadingMore,
     fetchContributions,
+    loadMoreContributions,
     updateContributionStatus,
     fetchContributionWeights,
+    prefetchContributions,
     deleteContribution,
   } = useAdminStore();
   const { models, fetchModels } = useModelStore();
@@ -37,11 +41,17 @@ export default function ReviewContributions() {
   const [deleteConfirmationId, setDeleteConfirmationId] = useState(null);
 
   useEffect(() => {
-    loadData();
+    fetchModels();
   }, []);
 
+  // The status filter is applied by the server, one page at a time
+  useEffect(() => {
+    fetchContributions(statusFilter);
+    setCurrentPage(1);
+  }, [statusFilter]);
+
   const loadData = async () => {
-    await Promise.all([fetchContributions(), fetchModels()]);
+    await Promise.all([fetchContributions(statusFilter), fetchModels()]);
   };
 
   // Convert Google Drive view URL to direct download URL
@@ -64,6 +74,22 @@ export default function ReviewContributions() {
       // Create a directory picker dialog
       const dirHandle = await window.showDirectoryPicker();
 
+      // Let the server collect all selected files in parallel first, so each
+      // download below is served from its local cache
+      setDownloadingIds(selectedContributions);
+      const prefetchToast = toast.loading("Preparing files on the server...");
+      await prefetchContributions(selectedContributions, (job) => {
+        const items = Object.values(job.progress?.downloads || {});
+        const ready = items.filter((item) =>
+          ["cached", "done", "failed"].includes(item.status)
+        ).length;
+        toast.loading(
+          `Preparing files on the server: ${ready}/${selectedContributions.length}`,
+          { id: prefetchToast }
+        );
+      });
+      toast.dismiss(prefetchToast);
+
       // Download each selected contribution
       for (const contributionId of selectedContributions) {
         setDownloadingIds((prev) => [...prev, contributionId]);
@@ -530,6 +556,17 @@ export default function ReviewContributions() {
                   currentPage={currentPage}
                   onPageChange={setCurrentPage}
                 />
+                {contributionsCursor && (
+                  <div className="border-t border-gray-200 p-4 text-center">
+                    <button
+                      onClick={loadMoreContributions}
+                      disabled={isLoadingMore}
+                      className="text-sm font-medium text-indigo-600 hover:text-indigo-500 disabled:opacity-50"
+                    >
+                      {isLoadingMore ? "Loading..." : "Load more contributions"}
+                    </button>
+                  </div>
+                )}
               </div>
             </div>
           </div>
@@ -1,38 +1,103 @@
 import { create } from "zustand";
 import axios from "axios";
+import { fetchPage } from "../utils/pagination";
 import { useAuthStore } from "./authStore";
+import { useJobStore } from "./jobStore";
 
 export const useAdminStore = create((set, get) => ({
   contributions: [],
+  contributionsStatus: "all",
+  contributionsCursor: null,
   users: [],
+  usersCursor: null,
+  analytics: null,
   isLoading: false,
+  isLoadingMore: false,
   error: null,
 
+  // Only the first page is loaded, later ones come from loadMoreUsers
   fetchUsers: async () => {
     const user = useAuthStore.getState().user;
     set({ isLoading: true });
     try {
-      const response = await axios.get(
-        `http://localhost:8000/api/users/?admin_id=${user.user_id}`
-      );
-      set({ users: response.data, isLoading: false });
+      const page = await fetchPage("http://localhost:8000/api/users/", {
+        admin_id: user.user_id,
+      });
+      set({
+        users: page.results,
+        usersCursor: page.nextCursor,
+        isLoading: false,
+      });
     } catch (error) {
       set({ error: "Failed to fetch users", isLoading: false });
     }
   },
 
-  fetchContributions: async () => {
+  loadMoreUsers: async () => {
     const user = useAuthStore.getState().user;
-    set({ isLoading: true });
+    const { usersCursor, isLoadingMore } = get();
+    if (!usersCursor || isLoadingMore) return;
+
+    set({ isLoadingMore: true });
+    try {
+      const page = await fetchPage(
+        "http://localhost:8000/api/users/",
+        { admin_id: user.user_id },
+        usersCursor
+      );
+      set((state) => ({
+        users: [...state.users, ...page.results],
+        usersCursor: page.nextCursor,
+        isLoadingMore: false,
+      }));
+    } catch (error) {
+      set({ error: "Failed to fetch users", isLoadingMore: false });
+    }
+  },
+
+  // Loads the first page of contributions with `status` ("all" for every
+  // status, the last one used by default); later pages come from
+  // loadMoreContributions
+  fetchContributions: async (status = get().contributionsStatus) => {
+    const user = useAuthStore.getState().user;
+    set({ isLoading: true, contributionsStatus: status });
     try {
-      const url = `http://localhost:8000/api/contributions/review/?admin_id=${user.user_id}&status=all`;
-      const response = await axios.get(url);
-      set({ contributions: response.data, isLoading: false });
+      const page = await fetchPage(
+        "http://localhost:8000/api/contributions/review/",
+        { admin_id: user.user_id, status }
+      );
+      set({
+        contributions: page.results,
+        contributionsCursor: page.nextCursor,
+        isLoading: false,
+      });
     } catch (error) {
       set({ error: "Failed to fetch contributions", isLoading: false });
     }
   },
 
+  loadMoreContributions: async () => {
+    const user = useAuthStore.getState().user;
+    const { contributionsCursor, contributionsStatus, isLoadingMore } = get();
+    if (!contributionsCursor || isLoadingMore) return;
+
+    set({ isLoadingMore: true });
+    try {
+      const page = await fetchPage(
+        "http://localhost:8000/api/contributions/review/",
+        { admin_id: user.user_id, status: contributionsStatus },
+        contributionsCursor
+      );
+      set((state) => ({
+        contributions: [...state.contributions, ...page.results],
+        contributionsCursor: page.nextCursor,
+        isLoadingMore: false,
+      }));
+    } catch (error) {
+      set({ error: "Failed to fetch contributions", isLoadingMore: false });
+    }
+  },
+
   fetchContributionWeights: async (contributionId) => {
     const user = useAuthStore.getState().user;
     try {
@@ -46,6 +111,53 @@ export const useAdminStore = create((set, get) => ({
     }
   },
 
+  // Collect the files in the server cache. The job reports per-contribution
+  // progress to `onProgress` while it runs
+  prefetchContributions: async (contributionIds, onProgress) => {
+    const user = useAuthStore.getState().user;
+    try {
+      const response = await axios.post(
+        "http://localhost:8000/api/contributions/prefetch/",
+        {
+          admin_id: user.user_id,
+          contribution_ids: contributionIds,
+        }
+      );
+      const result = await useJobStore
+        .getState()
+        .waitForJob(response.data.job_id, onProgress);
+      return result.results;
+    } catch (error) {
+      console.error("Error prefetching contributions:", error);
+      return null;
+    }
+  },
+
+  fetchAnalytics: async (bucket = "month") => {
+    const user = useAuthStore.getState().user;
+    const params = { admin_id: user.user_id };
+    try {
+      const [overview, trend, topResearchers] = await Promise.all([
+        axios.get("http://localhost:8000/api/analytics/overview/", { params }),
+        axios.get("http://localhost:8000/api/analytics/contributions/", {
+          params: { ...params, bucket },
+        }),
+        axios.get("http://localhost:8000/api/analytics/top-researchers/", {
+          params: { ...params, limit: 5 },
+        }),
+      ]);
+      set({
+        analytics: {
+          overview: overview.data,
+          trend: trend.data,
+          topResearchers: topResearchers.data,
+        },
+      });
+    } catch (error) {
+      set({ error: "Failed to fetch analytics" });
+    }
+  },
+
   deleteContribution: async (contributionId) => {
     const user = useAuthStore.getState().user;
 
@@ -145,6 +257,9 @@ export const useAdminStore = create((set, get) => ({
         }
       );
 
+      // Aggregation and upload finish in a background job
+      await useJobStore.getState().waitForJob(response.data.job_id);
+
       // Refresh contributions after successful creation
       await get().fetchContributions();
       return true;
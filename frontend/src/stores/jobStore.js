@@ -0,0 +1,42 @@
+// frontend/src/stores/jobStore.js
+import { create } from "zustand";
+import axios from "axios";
+import { useAuthStore } from "./authStore";
+
+const POLL_INTERVAL = 2000;
+// Give up on jobs that have not finished after this long, e.g. because no
+// worker is running to pick them up
+const JOB_TIMEOUT = 30 * 60 * 1000;
+
+export const useJobStore = create((set) => ({
+  jobs: {},
+
+  // Poll a background job until it finishes. Resolves with the job's result
+  // and rejects with the job's error message if it failed or with a timeout
+  // error once `timeout` milliseconds have passed.
+  waitForJob: async (jobId, onProgress, timeout = JOB_TIMEOUT) => {
+    const user = useAuthStore.getState().user;
+    const deadline = Date.now() + timeout;
+
+    while (true) {
+      const response = await axios.get(
+        `http://localhost:8000/api/jobs/${jobId}/?user_id=${user.user_id}`
+      );
+      const job = response.data;
+      set((state) => ({ jobs: { ...state.jobs, [jobId]: job } }));
+      if (onProgress) onProgress(job);
+
+      if (job.status === "completed") return job.result;
+      if (job.status === "failed") throw new Error(job.error || "Job failed");
+      if (Date.now() >= deadline) {
+        throw new Error(
+          job.status === "queued"
+            ? "The job was not started in time. Is the job worker running?"
+            : "Timed out waiting for the job to finish"
+        );
+      }
+
+      await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL));
+    }
+  },
+}));
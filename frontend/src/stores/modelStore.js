@@ -1,11 +1,14 @@
 import { create } from "zustand";
 import axios from "axios";
+import { fetchAllPages } from "../utils/pagination";
 import { useAuthStore } from "./authStore";
+import { useJobStore } from "./jobStore";
 
 export const useModelStore = create((set) => ({
   models: [],
   experimentalModels: [],
   selectedModel: null,
+  modelStats: null,
   modelComments: [],
   isLoading: false,
   error: null,
@@ -80,6 +83,7 @@ export const useModelStore = create((set) => ({
           ...modelData,
         }
       );
+      await useJobStore.getState().waitForJob(response.data.job_id);
       return true;
     } catch (error) {
       set({ error: "Failed to create experimental model" });
@@ -121,10 +125,10 @@ export const useModelStore = create((set) => ({
     const user = useAuthStore.getState().user;
     set({ isLoading: true });
     try {
-      const response = await axios.get(
-        `http://localhost:8000/api/models/?user_id=${user.user_id}`
-      );
-      set({ models: response.data, isLoading: false });
+      const models = await fetchAllPages("http://localhost:8000/api/models/", {
+        user_id: user.user_id,
+      });
+      set({ models, isLoading: false });
     } catch (error) {
       set({ error: "Failed to fetch models", isLoading: false });
     }
@@ -194,10 +198,11 @@ export const useModelStore = create((set) => ({
     const user = useAuthStore.getState().user;
     set({ isLoading: true });
     try {
-      const response = await axios.get(
-        `http://localhost:8000/api/models/?user_id=${user.user_id}&status=experimental`
+      const experimentalModels = await fetchAllPages(
+        "http://localhost:8000/api/models/",
+        { user_id: user.user_id, status: "experimental" }
       );
-      set({ experimentalModels: response.data, isLoading: false });
+      set({ experimentalModels, isLoading: false });
     } catch (error) {
       set({ error: "Failed to fetch experimental models", isLoading: false });
     }
@@ -219,14 +224,27 @@ export const useModelStore = create((set) => ({
     }
   },
 
+  fetchModelStats: async (modelId) => {
+    const user = useAuthStore.getState().user;
+    try {
+      const response = await axios.get(
+        `http://localhost:8000/api/models/${modelId}/stats/?user_id=${user.user_id}`
+      );
+      set({ modelStats: response.data });
+    } catch (error) {
+      set({ modelStats: null });
+    }
+  },
+
   fetchModelComments: async (modelId) => {
     const user = useAuthStore.getState().user;
     set({ isLoading: true });
     try {
-      const response = await axios.get(
-        `http://localhost:8000/api/comments/${modelId}/?user_id=${user.user_id}`
+      const modelComments = await fetchAllPages(
+        `http://localhost:8000/api/comments/${modelId}/`,
+        { user_id: user.user_id }
       );
-      set({ modelComments: response.data, isLoading: false });
+      set({ modelComments, isLoading: false });
     } catch (error) {
       set({ error: "Failed to fetch comments", isLoading: false });
     }
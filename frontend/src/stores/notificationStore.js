@@ -6,7 +6,9 @@ import { useAuthStore } from "./authStore";
 export const useNotificationStore = create((set, get) => ({
   notifications: [],
   unreadCount: 0,
+  nextCursor: null,
   isLoading: false,
+  isLoadingMore: false,
   error: null,
   lastFetched: null,
 
@@ -26,10 +28,11 @@ export const useNotificationStore = create((set, get) => ({
       const response = await axios.get(
         `http://localhost:8000/api/notifications/?user_id=${user.user_id}`
       );
-      const notifications = response.data || [];
+      // Only the newest page is loaded, older ones come from loadMoreNotifications
       set({
-        notifications,
-        unreadCount: notifications.filter((n) => !n.is_read).length,
+        notifications: response.data.results || [],
+        unreadCount: response.data.unread_count || 0,
+        nextCursor: response.data.next_cursor,
         isLoading: false,
         lastFetched: now,
         error: null,
@@ -40,6 +43,32 @@ export const useNotificationStore = create((set, get) => ({
         isLoading: false,
         notifications: [],
         unreadCount: 0,
+        nextCursor: null,
+      });
+    }
+  },
+
+  loadMoreNotifications: async () => {
+    const user = useAuthStore.getState().user;
+    const { nextCursor, isLoadingMore } = get();
+    if (!user || !nextCursor || isLoadingMore) return;
+
+    set({ isLoadingMore: true });
+    try {
+      const response = await axios.get(
+        "http://localhost:8000/api/notifications/",
+        { params: { user_id: user.user_id, cursor: nextCursor } }
+      );
+      set((state) => ({
+        notifications: [...state.notifications, ...response.data.results],
+        unreadCount: response.data.unread_count,
+        nextCursor: response.data.next_cursor,
+        isLoadingMore: false,
+      }));
+    } catch (error) {
+      set({
+        error: error.response?.data?.message || "Failed to fetch notifications",
+        isLoadingMore: false,
       });
     }
   },
@@ -53,9 +82,11 @@ export const useNotificationStore = create((set, get) => ({
       notifications: state.notifications.map((n) =>
         n.notification_id === notificationId ? { ...n, is_read: true } : n
       ),
-      unreadCount: state.notifications.filter(
-        (n) => n.notification_id !== notificationId && !n.is_read
-      ).length,
+      unreadCount: state.notifications.some(
+        (n) => n.notification_id === notificationId && !n.is_read
+      )
+        ? state.unreadCount - 1
+        : state.unreadCount,
     }));
 
     try {
@@ -82,6 +113,7 @@ export const useNotificationStore = create((set, get) => ({
 
     // Optimistically update UI
     const previousState = get().notifications;
+    const previousUnreadCount = get().unreadCount;
     set((state) => ({
       notifications: state.notifications.map((n) => ({ ...n, is_read: true })),
       unreadCount: 0,
@@ -97,7 +129,7 @@ export const useNotificationStore = create((set, get) => ({
       // Revert optimistic update on failure
       set({
         notifications: previousState,
-        unreadCount: previousState.filter((n) => !n.is_read).length,
+        unreadCount: previousUnreadCount,
         error:
           error.response?.data?.message ||
           "Failed to mark all notifications as read",
@@ -112,13 +144,16 @@ export const useNotificationStore = create((set, get) => ({
 
     // Optimistically update UI
     const previousState = get().notifications;
+    const previousUnreadCount = get().unreadCount;
     set((state) => ({
       notifications: state.notifications.filter(
         (n) => n.notification_id !== notificationId
       ),
-      unreadCount: state.notifications.filter(
-        (n) => n.notification_id !== notificationId && !n.is_read
-      ).length,
+      unreadCount: state.notifications.some(
+        (n) => n.notification_id === notificationId && !n.is_read
+      )
+        ? state.unreadCount - 1
+        : state.unreadCount,
     }));
 
     try {
@@ -131,7 +166,7 @@ export const useNotificationStore = create((set, get) => ({
       // Revert optimistic update on failure
       set({
         notifications: previousState,
-        unreadCount: previousState.filter((n) => !n.is_read).length,
+        unreadCount: previousUnreadCount,
         error: error.response?.data?.message || "Failed to delete notification",
       });
       return false;
@@ -153,7 +188,9 @@ export const useNotificationStore = create((set, get) => ({
     set({
       notifications: [],
       unreadCount: 0,
+      nextCursor: null,
       isLoading: false,
+      isLoadingMore: false,
       error: null,
       lastFetched: null,
     });
@@ -1,6 +1,8 @@
 import { create } from "zustand";
 import axios from "axios";
+import { fetchAllPages } from "../utils/pagination";
 import { useAuthStore } from "./authStore";
+import { useJobStore } from "./jobStore";
 
 export const useProfileStore = create((set) => ({
   contributions: [],
@@ -11,10 +13,11 @@ export const useProfileStore = create((set) => ({
     const user = useAuthStore.getState().user;
     set({ isLoading: true });
     try {
-      const response = await axios.get(
-        `http://localhost:8000/api/contributions/?researcher_id=${user.user_id}`
+      const contributions = await fetchAllPages(
+        "http://localhost:8000/api/contributions/",
+        { researcher_id: user.user_id }
       );
-      set({ contributions: response.data, isLoading: false });
+      set({ contributions, isLoading: false });
     } catch (error) {
       console.error("Error fetching contributions:", error);
       set({
@@ -55,9 +58,14 @@ export const useProfileStore = create((set) => ({
         }
       );
 
+      // The upload to Google Drive finishes in a background job
+      const contribution = await useJobStore
+        .getState()
+        .waitForJob(response.data.job_id);
+
       // Update contributions list with new contribution
       set((state) => ({
-        contributions: [...state.contributions, response.data],
+        contributions: [...state.contributions, contribution],
         isLoading: false,
         error: null,
       }));
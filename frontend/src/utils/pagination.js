@@ -0,0 +1,26 @@
+import axios from "axios";
+
+// List endpoints return {results, next_cursor}. Lists shown to the user load
+// one page at a time with fetchPage, passing the previous page's nextCursor.
+export const fetchPage = async (url, params = {}, cursor = null) => {
+  const response = await axios.get(url, {
+    params: { ...params, ...(cursor ? { cursor } : {}) },
+  });
+  return {
+    results: response.data.results,
+    nextCursor: response.data.next_cursor,
+  };
+};
+
+// Follow the cursors until every page is loaded, for small lookups that need
+// the whole list. Pass `fields` in params to only fetch some fields.
+export const fetchAllPages = async (url, params = {}) => {
+  const results = [];
+  let cursor = null;
+  do {
+    const page = await fetchPage(url, { ...params, limit: 100 }, cursor);
+    results.push(...page.results);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return results;
+};